@@ -4,6 +4,7 @@ Filesystem API helpers
 """
 from __future__ import with_statement
 
+import calendar
 import datetime
 import errno
 import os
@@ -15,7 +16,7 @@ from ffs.nix import (cd, chmod, chown, cmp,
                      cp, cp_r,
                      getwd,
                      ln, ln_s,
-                     ls,
+                     iterentries, ls, lsentries,
                      mkdir, mkdir_p, mv,
                      pwd,
                      rm, rmdir, rm_r,
@@ -23,6 +24,11 @@ from ffs.nix import (cd, chmod, chown, cmp,
                      touch, unlink, which,
                      is_exe)
 from ffs.path import Path
+from ffs.tree import walk
+from ffs.dupes import duplicates
+from ffs.usage import du
+from ffs import query
+from ffs.query import find
 from ffs._version import __version__
 
 ts2dt = datetime.datetime.utcfromtimestamp
@@ -38,6 +44,7 @@ __all__ = [
     'exceptions',
     'formats',
     'nixargs',
+    'query',
     # Nix helpers
     'cd',
     'chmod',
@@ -46,8 +53,11 @@ __all__ = [
     'cp',
     'cp_r',
     'getwd',
+    'iterentries',
     'ln',
     'ln_s',
+    'ls',
+    'lsentries',
     'mkdir',
     'mkdir_p',
     'mv',
@@ -59,6 +69,11 @@ __all__ = [
     'touch'
     'unlink',
     'which',
+    # Trees
+    'du',
+    'duplicates',
+    'find',
+    'walk',
     # Predicates
     'is_exe',
     'is_dir',
@@ -87,12 +102,15 @@ def basen(path, num=1):
 
 def lsmtime(path, lessthan=None):
     """
-    Return a list of all files existing in `path`
-    where their mtime is less than `lessthan`.
+    Return a list of all files existing anywhere below `path`
+    where their mtime is less than `lessthan`, a UTC DateTime.
 
     The return is a list of strings which are absolute paths
     to the files.
 
+    This is a thin wrapper around ffs.find(), which is the thing to use
+    when there are too many files to want them all in a list.
+
     Arguments:
     - `path`: str
     - `lessthan`: DateTime
@@ -100,12 +118,8 @@ def lsmtime(path, lessthan=None):
     Return: [str,]
     Exceptions: None
     """
-    for base, dirs, files in os.walk(path):
-        ls = []
-        for fname in files:
-            fpath = os.path.join(base, fname)
-            # Don't rely on os.stat_float_times() == True
-            mtime = float(os.path.getmtime(fpath))
-            if ts2dt(mtime)< lessthan:
-                ls.append(fpath)
-        return ls
+    predicates = [query.type('f')]
+    if lessthan is not None:
+        epoch = calendar.timegm(lessthan.utctimetuple()) + lessthan.microsecond / 1e6
+        predicates.append(query.mtime(hi=epoch))
+    return list(find(path, *predicates))
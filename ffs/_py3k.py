@@ -1,10 +1,29 @@
 """
 Py3k system compatibilities
 """
+import sys
 
 try:
     FileKlass = file
 except NameError:
     from io import TextIOWrapper as FileKlass
 
+try:
+    from os import scandir
+except ImportError: # Python < 3.5 has the backport
+    from scandir import scandir
+
+try:
+    from itertools import accumulate
+except ImportError: # Python 2
+    def accumulate(iterable):
+        total = 0
+        for item in iterable:
+            total += item
+            yield total
 
+if sys.version_info < (3,):
+    # Python 2 mmaps only have the old buffer interface
+    bufferview = buffer
+else:
+    bufferview = memoryview
@@ -0,0 +1,150 @@
+"""
+Batched appends to a file that stays open
+"""
+from __future__ import with_statement
+
+import os
+import threading
+import time
+
+import six
+
+# How much we buffer before writing it out
+BUFFER_SIZE = 1 << 16
+
+# The most buffers we hand writev() at once - POSIX promises at least this many
+IOV_MAX = 1024
+
+class Appender(object):
+    """
+    Append records to the file at PATH through one descriptor, opened
+    O_APPEND, batching them into large writes.
+
+    Records are buffered until we have BUFFER_SIZE bytes of them, or
+    when we write one FLUSH_INTERVAL seconds or more after the last
+    flush. Then they all go out in a single writev() where we have it.
+    Because the file is opened O_APPEND, and we only ever write whole
+    records, records written by several processes at once stay whole.
+
+    If OPENER is given, we use OPENER(PATH, 'ab') to get a file-like
+    object instead, for filesystems which don't have descriptors.
+
+    Text is encoded as ENCODING. Appenders may be shared between threads.
+
+    >>> with Appender('events.log') as out:
+    ...     for event in events:
+    ...         out << event.serialise() + '\n'
+    """
+    def __init__(self, path, buffer_size=BUFFER_SIZE, flush_interval=None,
+                 encoding='utf-8', opener=None):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.encoding = encoding
+        self._fh = None
+        self._fd = None
+        if opener is None:
+            self._fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        else:
+            self._fh = opener(path, 'ab')
+        self._pending = []
+        self._size = 0
+        self._flushed = time.time()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<Appender {0}>'.format(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __lshift__(self, record):
+        self.write(record)
+        return self
+
+    @property
+    def closed(self):
+        return self._fd is None and self._fh is None
+
+    def write(self, record):
+        """
+        Append RECORD to the file, eventually.
+
+        Arguments:
+        - `record`: str or bytes
+
+        Return: None
+        Exceptions: ValueError, TypeError
+        """
+        if isinstance(record, six.text_type):
+            record = record.encode(self.encoding)
+        elif not isinstance(record, six.binary_type):
+            raise TypeError("you have to write with a stringtype Larry... ")
+        with self._lock:
+            if self.closed:
+                raise ValueError("Can't write to a closed Appender Larry... ")
+            self._pending.append(record)
+            self._size += len(record)
+            if self._size >= self.buffer_size or (
+                    self.flush_interval is not None and
+                    time.time() - self._flushed >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        """
+        Write out everything we have buffered.
+
+        Return: None
+        Exceptions: None
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """
+        Implements flush(), when we already hold our lock.
+        """
+        pending, self._pending, self._size = self._pending, [], 0
+        self._flushed = time.time()
+        if not pending:
+            return
+        if self._fh is not None:
+            self._fh.write(b''.join(pending))
+            self._fh.flush()
+            return
+        writev = getattr(os, 'writev', None)
+        for start in range(0, len(pending), IOV_MAX):
+            batch = pending[start:start + IOV_MAX]
+            if writev is None:
+                batch = [b''.join(batch)]
+                written = os.write(self._fd, batch[0])
+            else:
+                written = writev(self._fd, batch)
+            # Short writes are rare, but possible - write what's left
+            if written < sum(len(record) for record in batch):
+                rest = b''.join(batch)[written:]
+                while rest:
+                    rest = rest[os.write(self._fd, rest):]
+
+    def close(self):
+        """
+        Flush and close the file. Closing twice is harmless.
+
+        Return: None
+        Exceptions: None
+        """
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self._flush()
+            finally:
+                if self._fh is not None:
+                    self._fh.close()
+                    self._fh = None
+                else:
+                    os.close(self._fd)
+                    self._fd = None
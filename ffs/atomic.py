@@ -0,0 +1,242 @@
+"""
+Replacing files atomically and durably
+
+>>> with atomic.atomic_write('settings.json') as fh:
+...     json.dump(settings, fh)
+
+Readers see either the old file or the new one, never half of either,
+and once we're done the new one will survive a crash.
+
+Where there are many files to replace, a Batch makes that a lot
+cheaper: rather than waiting on the disk for every file in turn, we
+fsync() them all at once at the end, and each directory only once.
+
+>>> with atomic.Batch() as batch:
+...     for name, config in configs.items():
+...         with batch.write(os.path.join('conf.d', name)) as fh:
+...             fh.write(config)
+"""
+from __future__ import with_statement
+
+import binascii
+import contextlib
+import errno
+import os
+import stat
+import threading
+
+from ffs import hashing
+
+# How many fsync()s a Batch has in flight at once
+WORKERS = 16
+
+def _fsync(path):
+    """
+    Flush the file or directory at PATH to disk.
+
+    Return: None
+    Exceptions: OSError
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _unlink(path):
+    """
+    Remove PATH if it is there.
+
+    Return: None
+    Exceptions: OSError
+    """
+    try:
+        os.unlink(path)
+    except OSError as err:
+        if err.errno != errno.ENOENT:
+            raise
+
+def _inherit(fd, path):
+    """
+    Give the file open on FD the mode, and where we're allowed to, the
+    owner of the existing file at PATH - so that replacing it doesn't
+    change who can read it.
+
+    Return: None
+    Exceptions: OSError
+    """
+    try:
+        st = os.stat(path)
+    except OSError as err:
+        if err.errno != errno.ENOENT:
+            raise
+        return
+    os.fchmod(fd, stat.S_IMODE(st.st_mode))
+    if hasattr(os, 'fchown'):
+        try:
+            os.fchown(fd, st.st_uid, st.st_gid)
+        except OSError as err:
+            if err.errno != errno.EPERM:
+                raise
+
+def _create(path):
+    """
+    Create a hidden temporary file next to PATH, with the permissions
+    of the file at PATH if there is one, or honouring the umask as a
+    new file would.
+
+    Return: (int, str)
+    Exceptions: OSError
+    """
+    dirname, basename = os.path.split(path)
+    while True:
+        suffix = binascii.hexlify(os.urandom(4)).decode('ascii')
+        tmp = os.path.join(dirname, '.{0}.{1}.tmp'.format(basename, suffix))
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+            continue
+        try:
+            _inherit(fd, path)
+        except OSError:
+            os.close(fd)
+            _unlink(tmp)
+            raise
+        return fd, tmp
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', batch=None):
+    """
+    Contextmanager yielding a file opened in MODE which, once the block
+    finishes, atomically replaces the file at PATH.
+
+    We write to a temporary file next to PATH, fsync() it, rename() it
+    over PATH and fsync() the directory. If the block raises, PATH is
+    left as it was.
+
+    If BATCH is given, the syncing and renaming is left to it.
+
+    Arguments:
+    - `path`: str or Path
+    - `mode`: str
+    - `batch`: Batch
+
+    Return: file
+    Exceptions: ValueError, IOError, OSError
+    """
+    if 'w' not in mode or '+' in mode:
+        raise ValueError("Can only write atomically, not {0} Larry... ".format(mode))
+    path = str(path)
+    fd, tmp = _create(path)
+    try:
+        with os.fdopen(fd, mode) as fh:
+            yield fh
+            if batch is None:
+                fh.flush()
+                os.fsync(fh.fileno())
+    except BaseException:
+        _unlink(tmp)
+        raise
+    if batch is not None:
+        batch._add(tmp, path)
+        return
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        _unlink(tmp)
+        raise
+    _fsync(os.path.dirname(path) or os.curdir)
+
+class Batch(object):
+    """
+    A group of atomic writes which are committed together.
+
+    Files written through the batch don't replace their targets until
+    the batch is committed, at the end of its with block. Then we
+    fsync() them all on a pool of WORKERS threads - letting the
+    filesystem commit them to its journal together - rename them into
+    place, and fsync() each directory they are in just once.
+
+    If the block raises, nothing is replaced.
+    """
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<Batch of {0}>'.format(len(self._pending))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def write(self, path, mode='w'):
+        """
+        Contextmanager yielding a file opened in MODE which will replace
+        PATH when we commit.
+
+        Arguments:
+        - `path`: str or Path
+        - `mode`: str
+
+        Return: file
+        Exceptions: ValueError, IOError, OSError
+        """
+        return atomic_write(path, mode, batch=self)
+
+    def _add(self, tmp, path):
+        """
+        Replace PATH with TMP when we commit.
+        """
+        with self._lock:
+            self._pending.append((tmp, path))
+
+    def commit(self):
+        """
+        Make everything written so far durable, then put it in place.
+
+        Return: None
+        Exceptions: OSError
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            for _ in hashing._pmap(_fsync, [tmp for tmp, _ in pending], self.workers, False):
+                pass
+        except BaseException:
+            for tmp, _ in pending:
+                _unlink(tmp)
+            raise
+        dirs = set()
+        for i, (tmp, path) in enumerate(pending):
+            try:
+                os.rename(tmp, path)
+            except BaseException:
+                for tmp, _ in pending[i:]:
+                    _unlink(tmp)
+                raise
+            dirs.add(os.path.dirname(path) or os.curdir)
+        for _ in hashing._pmap(_fsync, sorted(dirs), self.workers, False):
+            pass
+
+    def abort(self):
+        """
+        Throw away everything written so far.
+
+        Return: None
+        Exceptions: None
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for tmp, _ in pending:
+            _unlink(tmp)
@@ -0,0 +1,303 @@
+"""
+Finding (and getting rid of) duplicate files
+"""
+from __future__ import with_statement
+
+import collections
+import errno
+import fcntl
+import hashlib
+from multiprocessing.pool import ThreadPool
+import os
+import shutil
+import stat
+import sys
+import tempfile
+
+import six
+
+from ffs import hashing, tree
+
+# How much of each end of a file we hash before committing to reading all of it
+EDGE_SIZE = 4096
+
+# ioctl(2) request to share the extents of one file with another (Linux)
+FICLONE = 0x40049409
+
+def _bysize(roots, min_size):
+    """
+    Return {size: [path]} for the regular files below ROOTS of at
+    least MIN_SIZE bytes, using the stat() results from the walk,
+    and {path: stat_result} with those results.
+
+    Hard links to a file we've already seen are left out - they are
+    already as deduplicated as they are ever going to be.
+
+    Return: (dict, dict)
+    Exceptions: None
+    """
+    sizes = collections.defaultdict(list)
+    stats = {}
+    seen = set()
+    for root in roots:
+        for _, dirs, files in tree._walk(str(root)):
+            for entry in files:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if st.st_size < min_size:
+                    continue
+                inode = (st.st_dev, st.st_ino)
+                if inode in seen:
+                    continue
+                seen.add(inode)
+                sizes[st.st_size].append(entry.path)
+                stats[entry.path] = st
+    return sizes, stats
+
+def _edgejob(job):
+    """
+    Hash the first and last EDGE bytes of a file for a pool, where JOB
+    is (PATH, SIZE, EDGE, ALGORITHM).
+
+    Return: str or EnvironmentError
+    Exceptions: None
+    """
+    path, size, edge, algorithm = job
+    hasher = hashlib.new(algorithm)
+    try:
+        with open(path, 'rb') as fh:
+            hasher.update(fh.read(edge))
+            if size > edge:
+                fh.seek(max(edge, size - edge))
+                hasher.update(fh.read(edge))
+    except EnvironmentError as err:
+        return err
+    return hasher.hexdigest()
+
+def _regroup(groups, jobs, func, workers, pool=None):
+    """
+    Split each of GROUPS by the result of FUNC on the JOBS(group) for its
+    members, hashing on POOL, of WORKERS threads, and return the new
+    groups which still have more than one member.
+
+    Members whose hashing failed are dropped.
+
+    Return: [[str]]
+    Exceptions: None
+    """
+    def alljobs():
+        for index, group in enumerate(groups):
+            for job in jobs(group):
+                yield index, job
+
+    indexed = list(alljobs())
+    results = hashing._pmap(func, (job for _, job in indexed), workers, False, pool)
+    split = collections.defaultdict(list)
+    for (index, job), result in zip(indexed, results):
+        if isinstance(result, EnvironmentError):
+            continue
+        split[index, result].append(job[0])
+    return [members for members in split.values() if len(members) > 1]
+
+def duplicates(*roots, **kwargs):
+    """
+    Generate lists of the paths below ROOTS with identical contents.
+
+    We go about this in stages, so that we read as little as possible:
+    first we group files by size, which the walk tells us for free.
+    Where sizes collide we hash EDGE bytes from each end of the files,
+    and only where those collide too do we hash the whole thing.
+
+    Keyword Arguments:
+    - `min_size`: ignore files smaller than this (default 1, i.e. empty files)
+    - `edge`: bytes to hash from each end of a file (default EDGE_SIZE)
+    - `algorithm`: anything hashlib.new() takes (default 'sha256')
+    - `workers`: hash on a pool of this many threads
+    - `link`: 'hardlink' or 'reflink' to replace each duplicate with a
+      link to the first in its group, as for replace(), leaving any
+      that have changed since we looked at them
+    - `onerror`: called with the error if we can't link a group
+
+    Groups are sorted, and the biggest files come first. We hash every
+    group before we generate the first one, so that one pool of
+    WORKERS can hash all of them at once.
+
+    If we can't link a group (across devices, say), we pass the error
+    to ONERROR, if we have one, and carry on - generating the group,
+    whose duplicates after the one that failed are left as they were.
+    Without one, the error ends the generator. Either way, the groups
+    generated before are linked.
+
+    Arguments:
+    - `*roots`: str or Path
+
+    Return: generator([str])
+    Exceptions: ValueError
+    """
+    min_size = kwargs.get('min_size', 1)
+    edge = kwargs.get('edge', EDGE_SIZE)
+    algorithm = kwargs.get('algorithm', 'sha256')
+    workers = kwargs.get('workers', None)
+    link = kwargs.get('link', None)
+    onerror = kwargs.get('onerror', None)
+    hashlib.new(algorithm)
+    if link not in (None, 'hardlink', 'reflink'):
+        raise ValueError("Don't know how to {0} Larry... ".format(link))
+    return _duplicates(roots, min_size, edge, algorithm, workers, link, onerror)
+
+def _duplicates(roots, min_size, edge, algorithm, workers, link, onerror):
+    """
+    Generator behind duplicates(), so that we raise before we are iterated.
+    """
+    sizes, stats = _bysize(roots, min_size)
+    size = lambda path: stats[path].st_size
+    groups = [group for group in sizes.values() if len(group) > 1]
+    pool = ThreadPool(workers) if workers else None
+    try:
+        # Files no bigger than EDGE * 2 were read whole the first time
+        groups = _regroup(
+            groups, lambda group: [(p, size(p), edge, algorithm) for p in group],
+            _edgejob, workers, pool)
+        big = [g for g in groups if size(g[0]) > edge * 2]
+        groups = [g for g in groups if size(g[0]) <= edge * 2] + _regroup(
+            big, lambda group: [(p, algorithm, hashing.BUFFER_SIZE) for p in group],
+            hashing._digestjob, workers, pool)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    groups = [sorted(g) for g in groups]
+    for group in sorted(groups, key=lambda g: (-size(g[0]), g)):
+        if link is not None:
+            try:
+                replace(group, link, stats)
+            except EnvironmentError as err:
+                if onerror is None:
+                    raise
+                onerror(err)
+        yield group
+
+def _reflink(source, target):
+    """
+    Make TARGET a copy-on-write clone of SOURCE, sharing its extents.
+
+    Return: None
+    Exceptions: IOError, OSError
+    """
+    with open(source, 'rb') as src:
+        with open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+def _lstat(path):
+    """
+    Return the lstat() of PATH if it is a regular file, else None.
+
+    Return: stat_result or None
+    Exceptions: None
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st
+
+def _stamp(st):
+    """
+    Return the (DEV, INODE, SIZE, MTIME) that tell us a file with the
+    stat() result ST has changed. (Not hashing._stamp(): on Python 2
+    the walk's stat()s have st_mtime_ns and os.lstat()'s don't.)
+
+    Return: tuple
+    Exceptions: None
+    """
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime
+
+def _owner(st):
+    """
+    Return the (UID, GID, MODE) of a file with the stat() result ST -
+    what a hard link to another file would change.
+
+    Return: tuple
+    Exceptions: None
+    """
+    return st.st_uid, st.st_gid, stat.S_IMODE(st.st_mode)
+
+def replace(group, how='hardlink', stats=None):
+    """
+    Replace all but the first path in GROUP with a link to the first,
+    either a hard link or (on filesystems like Btrfs and XFS that
+    support it) a reflink, which shares storage but stays a separate
+    file.
+
+    Files can change between being hashed and being replaced, so we
+    lstat() each path again first. If STATS, {path: stat_result}, has
+    what a path looked like when it was hashed and it has changed
+    since (size, mtime, device or inode), we leave it alone - and if
+    that path is the first, the whole group. We also leave alone any
+    duplicate with a different owner, group or mode from the first,
+    which a link would quietly change.
+
+    Each link is made under a temporary name next to the duplicate and
+    renamed over it, so nothing is ever missing. If we can't make a
+    link (across devices, or for reflinks on a filesystem that doesn't
+    support them) we raise, leaving that duplicate as it was.
+
+    Arguments:
+    - `group`: [str]
+    - `how`: str
+    - `stats`: dict
+
+    Return: [str], the duplicates we replaced
+    Exceptions: ValueError, IOError, OSError
+    """
+    if how not in ('hardlink', 'reflink'):
+        raise ValueError("Don't know how to {0} Larry... ".format(how))
+    stats = stats or {}
+
+    def unchanged(path):
+        st = _lstat(path)
+        if st is None:
+            return None
+        if path in stats and _stamp(st) != _stamp(stats[path]):
+            return None
+        return st
+
+    source = str(group[0])
+    original = unchanged(source)
+    if original is None:
+        return []
+    replaced = []
+    for duplicate in group[1:]:
+        duplicate = str(duplicate)
+        st = unchanged(duplicate)
+        if st is None or _owner(st) != _owner(original):
+            continue
+        if (st.st_dev, st.st_ino) == (original.st_dev, original.st_ino):
+            continue
+        dirname, basename = os.path.split(duplicate)
+        fd, tmp = tempfile.mkstemp(prefix='.{0}.'.format(basename), dir=dirname or '.')
+        os.close(fd)
+        try:
+            if how == 'hardlink':
+                os.unlink(tmp)
+                os.link(source, tmp)
+            else:
+                _reflink(source, tmp)
+            os.rename(tmp, duplicate)
+        except EnvironmentError:
+            # Python 2's bare raise would re-raise the unlink()'s ENOENT
+            exc_info = sys.exc_info()
+            try:
+                os.unlink(tmp)
+            except OSError as err:
+                if err.errno != errno.ENOENT:
+                    raise
+            six.reraise(*exc_info)
+        replaced.append(duplicate)
+    return replaced
@@ -6,12 +6,81 @@ filesystem-like systems with the same abstraction model.
 """
 from __future__ import with_statement
 
+import mmap
 import os
+import stat
 import tempfile
 
 from ffs import exceptions, nix, util
 from ffs.util import wraps
 
+class Snapshot(object):
+    """
+    What we know about RESOURCE on FS at one point in time.
+
+    Operations which need to ask several questions about a resource
+    (does it exist? is it a branch?) take one of these and ask it
+    instead. The generic version asks the filesystem's predicates on
+    demand, remembering the answers.
+    """
+    def __init__(self, fs, resource):
+        self.fs = fs
+        self.resource = resource
+        self._answers = {}
+
+    def _ask(self, question):
+        """
+        Ask our filesystem QUESTION about our resource, once.
+
+        Arguments:
+        - `question`: str
+
+        Return: bool
+        Exceptions: None
+        """
+        try:
+            return self._answers[question]
+        except KeyError:
+            answer = self._answers[question] = getattr(self.fs, question)(self.resource)
+            return answer
+
+    @property
+    def exists(self):
+        return self._ask('exists')
+
+    @property
+    def is_branch(self):
+        return self._ask('is_branch')
+
+    @property
+    def is_leaf(self):
+        return self._ask('is_leaf')
+
+
+class StatSnapshot(object):
+    """
+    A Snapshot taken from a single stat() result.
+
+    RESULT is None if there was nothing there to stat.
+    """
+    __slots__ = ('stat',)
+
+    def __init__(self, result):
+        self.stat = result
+
+    @property
+    def exists(self):
+        return self.stat is not None
+
+    @property
+    def is_branch(self):
+        return self.stat is not None and stat.S_ISDIR(self.stat.st_mode)
+
+    @property
+    def is_leaf(self):
+        return self.stat is not None and stat.S_ISREG(self.stat.st_mode)
+
+
 class BaseFilesystem(object):
     """
     The base class from which all filesystem implementations
@@ -20,6 +89,29 @@ class BaseFilesystem(object):
     This class is used to establish the interface, as well as provide
     some generic helper methods.
     """
+    # Flavours that keep no per-instance state can safely be shared
+    # between every Path that uses them.
+    stateless = False
+
+    @classmethod
+    def instance(klass):
+        """
+        Return a filesystem of this flavour.
+
+        Stateless flavours hand out one shared instance per class,
+        everything else gets a fresh one.
+
+        Return: BaseFilesystem
+        Exceptions: None
+        """
+        if not klass.stateless:
+            return klass()
+        # Look in our own __dict__ so subclasses don't inherit a parent's instance
+        shared = klass.__dict__.get('_shared')
+        if shared is None:
+            shared = klass()
+            klass._shared = shared
+        return shared
 
     def exists(self, resource):
         """
@@ -62,6 +154,40 @@ class BaseFilesystem(object):
         """
         raise NotImplementedError("!")
 
+    def lsentries(self, branch, all=None, sort=None, reverse=None):
+        """
+        Return a list of entries for the contents of BRANCH.
+
+        Entries have a .name, and know whether they are a branch or a
+        leaf, in the manner of os.scandir() DirEntry objects.
+
+        SORT and REVERSE order the list as for nix.ls()
+
+        Arguments:
+        - `branch`: str or Path
+        - `all`: bool
+        - `sort`: str
+        - `reverse`: bool
+
+        Return: [DirEntry]
+        Exceptions: None
+        """
+        raise NotImplementedError("!")
+
+    def iterentries(self, branch, all=None):
+        """
+        Generate entries for the contents of BRANCH as they are read,
+        rather than listing them all up front.
+
+        Arguments:
+        - `branch`: str or Path
+        - `all`: bool
+
+        Return: generator(DirEntry)
+        Exceptions: None
+        """
+        raise NotImplementedError("!")
+
     def cd(self, target):
         """
         Change the working directory to TARGET
@@ -114,6 +240,20 @@ class BaseFilesystem(object):
         """
         raise NotImplementedError("!")
 
+    def mmap(self, resource, access=mmap.ACCESS_READ):
+        """
+        Map the contents of RESOURCE into memory with ACCESS, one of the
+        mmap.ACCESS_* constants.
+
+        Arguments:
+        - `resource`: str or Path
+        - `access`: int
+
+        Return: mmap
+        Exceptions: None
+        """
+        raise NotImplementedError("!")
+
     def is_branch(self, resource):
         """
         Is RESOURCE a branch node on this filesystem?
@@ -293,6 +433,22 @@ class BaseFilesystem(object):
         """
         raise NotImplementedError("!")
 
+    def snapshot(self, resource):
+        """
+        Return a snapshot of what we know about RESOURCE right now,
+        able to answer exists, is_branch and is_leaf.
+
+        Filesystems which can answer all of these at once should
+        override this.
+
+        Arguments:
+        - `resource`: str or Path
+
+        Return: Snapshot
+        Exceptions: None
+        """
+        return Snapshot(self, resource)
+
 
 class ReadOnlyFilesystem(BaseFilesystem):
     """
@@ -332,11 +488,8 @@ class DiskFilesystem(BaseFilesystem):
     Disk based filesystem. Abstraction across implementations
     handled by Python standard library.
     """
-
-    @property
-    @wraps(BaseFilesystem.sep)
-    def sep(self):
-        return os.sep
+    stateless = True
+    sep = os.sep
 
     @wraps(BaseFilesystem.exists)
     def exists(self, resource):
@@ -350,6 +503,14 @@ class DiskFilesystem(BaseFilesystem):
     def ls(self, resource, all=None):
         return nix.ls(resource, all=all)
 
+    @wraps(BaseFilesystem.lsentries)
+    def lsentries(self, resource, all=None, sort=None, reverse=None):
+        return nix.lsentries(resource, all=all, sort=sort, reverse=reverse)
+
+    @wraps(BaseFilesystem.iterentries)
+    def iterentries(self, resource, all=None):
+        return nix.iterentries(resource, all=all)
+
     @wraps(BaseFilesystem.cd)
     def cd(self, target):
         return nix.cd(target)
@@ -374,6 +535,13 @@ class DiskFilesystem(BaseFilesystem):
     def open(self, resource, mode='r'):
         return open(self.expanduser(resource), mode)
 
+    @wraps(BaseFilesystem.mmap)
+    def mmap(self, resource, access=mmap.ACCESS_READ):
+        mode = 'r+b' if access == mmap.ACCESS_WRITE else 'rb'
+        # The mapping keeps its own descriptor, so we needn't keep ours
+        with open(self.expanduser(resource), mode) as fh:
+            return mmap.mmap(fh.fileno(), 0, access=access)
+
     @wraps(BaseFilesystem.expanduser)
     def expanduser(self, resource):
         return os.path.expanduser(resource)
@@ -416,3 +584,14 @@ class DiskFilesystem(BaseFilesystem):
     @wraps(BaseFilesystem.rm)
     def rm(self, resource, recursive=False):
         return nix.rm(resource, recursive=recursive)
+
+    @wraps(BaseFilesystem.stat)
+    def stat(self, resource):
+        return nix.stat(str(resource))
+
+    @wraps(BaseFilesystem.snapshot)
+    def snapshot(self, resource):
+        try:
+            return StatSnapshot(os.stat(resource))
+        except (OSError, ValueError):
+            return StatSnapshot(None)
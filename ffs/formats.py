@@ -1,11 +1,19 @@
 """
 ffs.formats
 """
+import codecs
 import collections
 import csv
+try:
+    import simplejson as json
+except ImportError:
+    import json
+import re
 
 from six.moves import StringIO
 
+from ffs import streams
+
 WriterType = csv.writer(StringIO()).__class__
 ReaderType = csv.reader(StringIO()).__class__
 
@@ -213,3 +221,240 @@ class CSV(object):
             raise AttributeError('Object CSV has no attribute writerows')
         self._resolve_writer()
         self.resolved.writerows(row)
+
+
+class JSONL(object):
+    """
+    A JSON Lines file - one JSON document per line.
+
+    Like the CSV, a JSONL resolves into a reader if you iterate through
+    it, or a writer if you write() to it.
+
+    Readers parse one line at a time out of large blocks, so however
+    big the file is we only hold a block and a record at once. Writers
+    buffer up to BUFFER_SIZE bytes of records between writes, and
+    replace the file unless APPEND is True.
+    """
+    def __init__(self, path, append=False, buffer_size=streams.BUFFER_SIZE):
+        self.path = path
+        self.append = append
+        self.buffer_size = buffer_size
+        self.resolved = None
+        self.fh = None
+        self._pending = []
+        self._size = 0
+
+    def __repr__(self):
+        rpr = '<{0} JSONL {1}>'.format((self.resolved or 'Unresolved').title(), self.path)
+        return rpr
+
+    def __enter__(self):
+        """
+        Pass and return self
+        """
+        return self
+
+    def __exit__(self, msg, exc, tb):
+        if self.fh:
+            self.close()
+
+    def close(self):
+        """
+        Flush anything we've buffered, and close our file.
+
+        Return: None
+        Exceptions: None
+        """
+        if self.resolved == 'writer':
+            self.flush()
+        self.fh.close()
+
+    def __iter__(self):
+        """
+        If we are unresolved, resolve to a reader, and generate the
+        documents in the file.
+        If we are resolved to a writer, raise TypeError
+
+        Return: generator
+        Exceptions: TypeError
+        """
+        if self.resolved == 'writer':
+            raise TypeError('Writer is not iterable')
+        if not self.resolved:
+            self.fh = self.path.fs.open(self.path, 'rb')
+            self.resolved = 'reader'
+        return (json.loads(line.decode('utf-8'))
+                for line in streams.lines(self.fh, self.buffer_size) if line.strip())
+
+    def write(self, document):
+        """
+        Serialise DOCUMENT as a line of the file.
+
+        If we're resolved to a reader, raise AttributeError
+
+        Arguments:
+        - `document`: object
+
+        Return: None
+        Exceptions: AttributeError, TypeError
+        """
+        if self.resolved == 'reader':
+            raise AttributeError('Object JSONL has no attribute write')
+        if not self.resolved:
+            self.fh = self.path.fs.open(self.path, 'ab' if self.append else 'wb')
+            self.resolved = 'writer'
+        line = json.dumps(document, separators=(',', ':')).encode('utf-8') + b'\n'
+        self._pending.append(line)
+        self._size += len(line)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def writeall(self, documents):
+        """
+        Serialise each of DOCUMENTS as a line of the file.
+
+        Arguments:
+        - `documents`: iterable
+
+        Return: None
+        Exceptions: AttributeError, TypeError
+        """
+        for document in documents:
+            self.write(document)
+
+    def flush(self):
+        """
+        Write out the records we've buffered.
+
+        Return: None
+        Exceptions: None
+        """
+        if self._pending:
+            self.fh.write(b''.join(self._pending))
+            self._pending, self._size = [], 0
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class _Scanner(object):
+    """
+    The text of binary file FH, decoded from ENCODING and read
+    BUFFER_SIZE bytes at a time, as raw_decode() works through it.
+    """
+    def __init__(self, fh, buffer_size, encoding):
+        self.fh = fh
+        self.buffer_size = buffer_size
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.json = json.JSONDecoder()
+        self.text = u''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """
+        Read another block, dropping what we've already been through.
+
+        Return: bool
+        Exceptions: UnicodeDecodeError
+        """
+        if self.eof:
+            return False
+        block = self.fh.read(self.buffer_size)
+        self.text = self.text[self.pos:] + self.decoder.decode(block, not block)
+        self.pos = 0
+        self.eof = not block
+        return not self.eof
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, or '' at the end.
+
+        Return: str
+        Exceptions: None
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return u''
+
+    def expect(self, char):
+        """
+        Consume CHAR, which had better be next.
+
+        Return: None
+        Exceptions: ValueError
+        """
+        if self.peek() != char:
+            raise ValueError("Expected {0} at {1} Larry... ".format(char, self.pos))
+        self.pos += 1
+
+    def value(self):
+        """
+        Parse and consume the next JSON value.
+
+        A value that runs to the end of what we've read might be cut
+        short (123 might be the start of 12345), so unless we're at the
+        end of the file we read more and try again - reading more each
+        time, so that huge values don't cost us quadratic time.
+
+        Return: object
+        Exceptions: ValueError
+        """
+        self.peek()
+        while True:
+            try:
+                document, end = self.json.raw_decode(self.text, self.pos)
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return document
+            except ValueError:
+                if self.eof:
+                    raise
+            wanted = max(len(self.text) - self.pos, 1) * 2
+            while len(self.text) - self.pos < wanted and self.more():
+                pass
+
+def json_iter(fh, prefix='', buffer_size=streams.BUFFER_SIZE, encoding='utf-8'):
+    """
+    Generate the elements of a JSON array in the binary file FH one at
+    a time, parsing the file incrementally, so that we hold only one
+    element (and a block of the file) at once.
+
+    If PREFIX is empty, the whole document is the array. Otherwise it
+    is a dotted path of keys to follow through objects to get to the
+    array: 'data.results' for {"data": {"results": [...]}}. Values we
+    pass along the way are parsed and thrown away.
+
+    Arguments:
+    - `fh`: file-like object
+    - `prefix`: str
+    - `buffer_size`: int
+    - `encoding`: str
+
+    Return: generator
+    Exceptions: ValueError
+    """
+    scanner = _Scanner(fh, buffer_size, encoding)
+    for key in prefix.split('.') if prefix else []:
+        scanner.expect(u'{')
+        while True:
+            if scanner.peek() == u'}':
+                raise ValueError("Can't find {0} Larry... ".format(prefix))
+            name = scanner.value()
+            scanner.expect(u':')
+            if name == key:
+                break
+            scanner.value()
+            if scanner.peek() == u',':
+                scanner.pos += 1
+    scanner.expect(u'[')
+    if scanner.peek() == u']':
+        return
+    while True:
+        yield scanner.value()
+        if scanner.peek() == u',':
+            scanner.pos += 1
+            continue
+        scanner.expect(u']')
+        return
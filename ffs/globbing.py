@@ -0,0 +1,266 @@
+"""
+Compiled glob patterns, matched in a single pruned traversal
+"""
+import fnmatch
+import os
+import re
+import stat
+
+from ffs._py3k import scandir
+
+_MAGIC = re.compile('[*?[]')
+
+# Kinds of pattern segment
+LITERAL, WILD, RECURSE = 'literal', 'wild', 'recurse'
+
+def expand_braces(pattern):
+    """
+    Expand the shell-style alternatives in PATTERN, so that
+    'src/{lib,test}/*.{py,pyx}' becomes four patterns.
+
+    Alternatives may nest. Braces without a comma in them are left
+    alone, as they are in the shell.
+
+    Arguments:
+    - `pattern`: str
+
+    Return: [str]
+    Exceptions: None
+    """
+    start = pattern.find('{')
+    while start != -1:
+        depth, commas = 0, []
+        for i in range(start, len(pattern)):
+            char = pattern[i]
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            elif char == ',' and depth == 1:
+                commas.append(i)
+        else:
+            return [pattern]
+        if commas:
+            head, tail = pattern[:start], pattern[i + 1:]
+            bounds = [start] + commas + [i]
+            expanded = []
+            for lo, hi in zip(bounds, bounds[1:]):
+                alternative = head + pattern[lo + 1:hi] + tail
+                expanded.extend(expand_braces(alternative))
+            return expanded
+        start = pattern.find('{', start + 1)
+    return [pattern]
+
+def _segment(text):
+    """
+    Compile one /-separated segment of a pattern into a
+    (KIND, TEXT, MATCH) triple.
+
+    Arguments:
+    - `text`: str
+
+    Return: tuple
+    Exceptions: None
+    """
+    if text == '**':
+        return RECURSE, text, None
+    if not _MAGIC.search(text):
+        return LITERAL, text, None
+    return WILD, text, re.compile(fnmatch.translate(text)).match
+
+def compile(*patterns):
+    """
+    Compile PATTERNS into the (SEGMENTS, DIRONLY) pairs that glob()
+    walks with.
+
+    Braces are expanded, each pattern is split into segments, and
+    patterns ending in a separator only match directories.
+
+    Arguments:
+    - `*patterns`: str
+
+    Return: [(tuple, bool)]
+    Exceptions: ValueError
+    """
+    compiled = []
+    for pattern in patterns:
+        for expanded in expand_braces(pattern):
+            if expanded.startswith('/'):
+                raise ValueError(
+                    "Can only glob relative patterns Larry... ({0})".format(pattern))
+            segments = tuple(_segment(s) for s in expanded.split('/') if s)
+            if segments:
+                compiled.append((segments, expanded.endswith('/')))
+    return compiled
+
+def _closure(states, compiled):
+    """
+    Add to STATES the states we reach by letting each ** match nothing.
+
+    A state is a (PATTERN INDEX, SEGMENT INDEX) pair.
+
+    Return: frozenset
+    Exceptions: None
+    """
+    closed, todo = set(), list(states)
+    while todo:
+        state = todo.pop()
+        if state in closed:
+            continue
+        closed.add(state)
+        index, pos = state
+        segments = compiled[index][0]
+        if pos < len(segments) and segments[pos][0] is RECURSE:
+            todo.append((index, pos + 1))
+    return frozenset(closed)
+
+def _step(states, compiled, name, isdir, islink):
+    """
+    Return the states that the entry NAME reaches from STATES, its
+    parent directory's states.
+
+    As with the shell, wildcards don't match names starting with '.'
+    unless the segment itself does, and ** doesn't go into hidden
+    directories or through symlinks.
+
+    Return: frozenset
+    Exceptions: None
+    """
+    reached = set()
+    hidden = name[0] == '.'
+    for index, pos in states:
+        segments = compiled[index][0]
+        if pos == len(segments):
+            continue
+        kind, text, match = segments[pos]
+        if kind is LITERAL:
+            if name == text:
+                reached.add((index, pos + 1))
+        elif kind is WILD:
+            if (not hidden or text[0] == '.') and match(name):
+                reached.add((index, pos + 1))
+        elif not hidden and (not isdir or not islink):
+            reached.add((index, pos))
+    return _closure(reached, compiled)
+
+def _literals(states, compiled):
+    """
+    If every way forward from STATES is a literal name, return those
+    names, so that we can stat them rather than list the directory.
+
+    Return: set or None
+    Exceptions: None
+    """
+    names = set()
+    for index, pos in states:
+        segments = compiled[index][0]
+        if pos == len(segments):
+            continue
+        kind, text, match = segments[pos]
+        if kind is not LITERAL:
+            return None
+        names.add(text)
+    return names
+
+def _children(path, states, compiled, scan):
+    """
+    Generate (NAME, CHILDPATH, ENTRY, ISDIR, ISLINK) for the entries of PATH
+    that STATES could possibly match.
+
+    ENTRY is the os.scandir() DirEntry when we listed PATH, or None
+    when we could stat literal names directly.
+
+    Return: generator
+    Exceptions: None
+    """
+    names = _literals(states, compiled)
+    if names is not None:
+        for name in names:
+            child = os.path.join(path, name)
+            try:
+                mode = os.lstat(child).st_mode
+            except OSError:
+                continue
+            islink = stat.S_ISLNK(mode)
+            if islink:
+                try:
+                    mode = os.stat(child).st_mode
+                except OSError:
+                    pass
+            yield name, child, None, stat.S_ISDIR(mode), islink
+        return
+
+    try:
+        entries = scan(path)
+    except OSError:
+        return
+    try:
+        for entry in entries:
+            try:
+                isdir = entry.is_dir()
+            except OSError:
+                isdir = False
+            name = entry.name
+            yield name, os.path.join(path, name), entry, isdir, entry.is_symlink()
+    finally:
+        if hasattr(entries, 'close'):
+            entries.close()
+
+def glob(root, *patterns, **kwargs):
+    """
+    Generate (PATH, ENTRY) for everything below ROOT matching any of
+    PATTERNS.
+
+    PATTERNS are relative to ROOT, and may use the fnmatch wildcards
+    within a segment, ** to match any number of directories, and
+    {a,b} alternatives. They are compiled once, and matched together
+    in one traversal that only descends into directories that could
+    still match something. Segments without wildcards are looked up
+    with a stat rather than by listing their directory.
+
+    ENTRY is the os.scandir() DirEntry for PATH where we have one,
+    otherwise None.
+
+    Each PATH is generated once, however many patterns it matches, in
+    no particular order.
+
+    Keyword Arguments:
+    - `scan`: the function to list directories with, in the manner of
+      os.scandir()
+
+    Arguments:
+    - `root`: str
+    - `*patterns`: str
+
+    Return: generator((str, DirEntry))
+    Exceptions: ValueError
+    """
+    compiled = compile(*patterns)
+    return _glob(str(root), compiled, kwargs.get('scan', scandir))
+
+def _glob(root, compiled, scan):
+    """
+    Generator behind glob(), so that bad patterns raise up front.
+    """
+    start = _closure([(i, 0) for i in range(len(compiled))], compiled)
+    todo = [(root, start)]
+    while todo:
+        path, states = todo.pop()
+        children = _children(path, states, compiled, scan)
+        for name, child, entry, isdir, islink in children:
+            reached = _step(states, compiled, name, isdir, islink)
+            if not reached:
+                continue
+            matched, descend = False, False
+            for index, pos in reached:
+                segments, dironly = compiled[index]
+                if pos < len(segments):
+                    descend = isdir
+                elif isdir or not dironly:
+                    matched = True
+            if matched:
+                yield child, entry
+            if descend:
+                todo.append((child, reached))
@@ -0,0 +1,491 @@
+"""
+Streaming file digests, and an on-disk cache of them
+"""
+from __future__ import with_statement
+
+import atexit
+import collections
+import errno
+import hashlib
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import os
+import re
+import sqlite3
+import threading
+
+from ffs import streams, tree
+
+# How much of a file we read at a time when hashing it
+BUFFER_SIZE = streams.BUFFER_SIZE
+
+# How many new digests a DigestCache records before committing them
+COMMIT_EVERY = 1000
+
+def hashfile(fh, algorithm='md5', buffer_size=BUFFER_SIZE):
+    """
+    Return the hexdigest of the rest of the open binary file FH.
+
+    We read BUFFER_SIZE bytes at a time into a single reused buffer,
+    so however large FH is, memory use stays flat.
+
+    ALGORITHM is any name that hashlib.new() knows, e.g. 'sha256' or
+    (on Python 3) 'blake2b'.
+
+    Arguments:
+    - `fh`: file-like object
+    - `algorithm`: str
+    - `buffer_size`: int
+
+    Return: str
+    Exceptions: ValueError
+    """
+    hasher = hashlib.new(algorithm)
+    for chunk in streams.chunks(fh, buffer_size):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _stamp(st):
+    """
+    Return the (DEV, INODE, SIZE, MTIME_NS) that identify the contents
+    of a file with the stat() result ST.
+
+    Return: tuple
+    Exceptions: None
+    """
+    mtime_ns = getattr(st, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(st.st_mtime * 1e9)
+    return st.st_dev, st.st_ino, st.st_size, mtime_ns
+
+class DigestCache(object):
+    """
+    A persistent record of file digests, in an sqlite database at PATH,
+    keyed by (dev, inode, size, mtime_ns) and algorithm.
+
+    As long as a file's stat() still says the same thing, its digest
+    can be had without reading it again. Instances may be shared
+    between threads.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock:
+            # A write-ahead log makes commits appends, which we needn't
+            # fsync(): at worst a crash loses the last few digests.
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,"
+                " algorithm TEXT, digest TEXT,"
+                " PRIMARY KEY (dev, ino, algorithm))")
+            self._db.commit()
+
+    def __repr__(self):
+        return '<DigestCache {0}>'.format(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, st, algorithm):
+        """
+        Return the digest we have for the file with the stat() result ST,
+        or None if we don't have one, or it is out of date.
+
+        Arguments:
+        - `st`: stat_result
+        - `algorithm`: str
+
+        Return: str or None
+        Exceptions: None
+        """
+        dev, ino, size, mtime_ns = _stamp(st)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM digests WHERE dev = ? AND ino = ?"
+                " AND algorithm = ? AND size = ? AND mtime_ns = ?",
+                (dev, ino, algorithm, size, mtime_ns)).fetchone()
+        if row is None:
+            return None
+        return str(row[0])
+
+    def put(self, st, algorithm, digest):
+        """
+        Record DIGEST for the file with the stat() result ST.
+
+        We commit every COMMIT_EVERY digests, and on flush() or close(),
+        so until then other connections to the database won't see it.
+
+        Arguments:
+        - `st`: stat_result
+        - `algorithm`: str
+        - `digest`: str
+
+        Return: None
+        Exceptions: None
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)",
+                _stamp(st) + (algorithm, digest))
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._commit()
+
+    def _commit(self):
+        """
+        Commit what we've put() since we last did. Call with our lock held.
+
+        Return: None
+        Exceptions: None
+        """
+        if self._pending:
+            self._db.commit()
+            self._pending = 0
+
+    def flush(self):
+        """
+        Commit the digests we've recorded so far.
+
+        Return: None
+        Exceptions: None
+        """
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        """
+        Commit what we have and close our database.
+
+        Return: None
+        Exceptions: None
+        """
+        with self._lock:
+            self._commit()
+            self._db.close()
+
+# The DigestCache we keep open for each database digest() is passed the
+# path of, as {path: (DigestCache, (dev, inode))}. _users counts the
+# digest() calls using each one, and _retired holds those we've stopped
+# handing out, as their file was replaced, until the last user is done.
+_shared = {}
+_users = collections.defaultdict(int)
+_retired = set()
+_sharedlock = threading.Lock()
+
+def _sharedcache(path):
+    """
+    Return the DigestCache for the database at PATH, opening it the
+    first time we're asked for it, and again if the file is replaced.
+    Hand it back to _release() when done.
+
+    Return: DigestCache
+    Exceptions: sqlite3.Error
+    """
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+        inode = (st.st_dev, st.st_ino)
+    except OSError:
+        inode = None
+    stale = None
+    with _sharedlock:
+        cache, known = _shared.get(path, (None, None))
+        if cache is None or inode is None or inode != known:
+            if cache is not None:
+                if _users[cache]:
+                    _retired.add(cache)
+                else:
+                    del _users[cache]
+                    stale = cache
+            cache = DigestCache(path)
+            st = os.stat(path)
+            _shared[path] = cache, (st.st_dev, st.st_ino)
+        _users[cache] += 1
+    if stale is not None:
+        stale.close()
+    return cache
+
+def _release(cache):
+    """
+    We're done with CACHE, from _sharedcache(): commit what we put in
+    it, and if it has been replaced, close it once nobody is using it.
+
+    Return: None
+    Exceptions: None
+    """
+    cache.flush()
+    with _sharedlock:
+        _users[cache] -= 1
+        if _users[cache] or cache not in _retired:
+            return
+        del _users[cache]
+        _retired.discard(cache)
+    cache.close()
+
+@atexit.register
+def _closeshared():
+    """
+    Close the DigestCaches that digest() opened for us.
+
+    Return: None
+    Exceptions: None
+    """
+    with _sharedlock:
+        for cache, _ in _shared.values():
+            cache.close()
+        for cache in _retired:
+            cache.close()
+        _shared.clear()
+        _retired.clear()
+        _users.clear()
+
+def digest(path, algorithm='md5', buffer_size=BUFFER_SIZE, cache=None,
+           opener=None, st=None):
+    """
+    Return the hexdigest of the file at PATH.
+
+    If CACHE is a DigestCache (or the path to one) we look there first,
+    which costs a single stat() - none if we are passed its result as
+    ST. Otherwise, or if the file has changed, we hash it and record
+    the result.
+
+    OPENER opens PATH for binary reading, defaulting to open().
+
+    Arguments:
+    - `path`: str or Path
+    - `algorithm`: str
+    - `buffer_size`: int
+    - `cache`: DigestCache or str
+    - `opener`: callable
+    - `st`: stat_result
+
+    Return: str
+    Exceptions: ValueError, IOError, OSError
+    """
+    path = str(path)
+    if opener is None:
+        opener = lambda p: open(p, 'rb')
+    if cache is None:
+        with opener(path) as fh:
+            return hashfile(fh, algorithm, buffer_size)
+
+    if not isinstance(cache, DigestCache):
+        cache = _sharedcache(str(cache))
+        try:
+            return digest(path, algorithm, buffer_size, cache, opener, st)
+        finally:
+            _release(cache)
+
+    before = st if st is not None else os.stat(path)
+    known = cache.get(before, algorithm)
+    if known is not None:
+        return known
+    with opener(path) as fh:
+        hexdigest = hashfile(fh, algorithm, buffer_size)
+    # Only remember digests for files which held still while we read them
+    if _stamp(os.stat(path)) == _stamp(before):
+        cache.put(before, algorithm, hexdigest)
+    return hexdigest
+
+def _digestjob(job):
+    """
+    Hash one file for a pool, where JOB is (PATH, ALGORITHM, BUFFER_SIZE).
+
+    Errors are returned rather than raised, so that one unreadable file
+    doesn't bring down the whole pool.
+
+    Return: str or EnvironmentError
+    Exceptions: None
+    """
+    path, algorithm, buffer_size = job
+    try:
+        return digest(path, algorithm, buffer_size)
+    except EnvironmentError as err:
+        return err
+
+def _pmap(func, items, workers, processes, pool=None):
+    """
+    Generate FUNC(item) for each of ITEMS, in order, on a pool of WORKERS
+    threads (or PROCESSES).
+
+    Unlike Pool.imap() we only ever have a few jobs per worker in flight,
+    so ITEMS can be a walk of an enormous tree.
+
+    Callers with several batches of jobs can pass a POOL of WORKERS of
+    their own to use (and terminate) rather than have us start one for
+    each batch.
+
+    Return: generator
+    Exceptions: None
+    """
+    if not workers:
+        for item in items:
+            yield func(item)
+        return
+
+    ours = pool is None
+    if ours:
+        pool = Pool(workers) if processes else ThreadPool(workers)
+    try:
+        window = collections.deque()
+        for item in items:
+            window.append(pool.apply_async(func, (item,)))
+            if len(window) >= workers * 4:
+                yield window.popleft().get()
+        while window:
+            yield window.popleft().get()
+    finally:
+        if ours:
+            pool.terminate()
+
+def _escape(name):
+    """
+    Return NAME as sha256sum writes it, and whether it needed escaping.
+
+    Return: (str, bool)
+    Exceptions: None
+    """
+    if '\\' not in name and '\n' not in name:
+        return name, False
+    return name.replace('\\', '\\\\').replace('\n', '\\n'), True
+
+def _unescape(name):
+    """
+    Undo _escape()
+
+    Return: str
+    Exceptions: None
+    """
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), name)
+
+def _reraise(err):
+    """
+    An onerror for tree._walk() that doesn't let errors pass.
+
+    Exceptions: OSError
+    """
+    raise err
+
+def _files(root):
+    """
+    Generate the relative names of the regular files below ROOT, sorted
+    a directory at a time so that manifests come out the same each time.
+
+    A directory we can't read raises rather than leaving its files out
+    of the manifest.
+
+    Return: generator(str)
+    Exceptions: OSError
+    """
+    root = str(root)
+    prefix = root if root.endswith(os.sep) else root + os.sep
+    for _, dirs, files in tree._walk(root, onerror=_reraise):
+        dirs.sort(key=lambda e: e.name)
+        for entry in sorted(files, key=lambda e: e.name):
+            if entry.is_file(follow_symlinks=False):
+                yield entry.path[len(prefix):]
+
+def manifest(root, algorithm='sha256', workers=None, processes=False,
+             buffer_size=BUFFER_SIZE):
+    """
+    Generate the lines of a manifest for the tree at ROOT, in the
+    format that sha256sum (md5sum, &c) writes and checks.
+
+    Files are hashed with ALGORITHM on a pool of WORKERS threads, or
+    processes if PROCESSES is truthy, and the lines come out in order
+    as soon as they are ready. Files or directories we can't read
+    raise, rather than being left out.
+
+    >>> with open('SHA256SUMS', 'w') as fh:
+    ...     fh.writelines(manifest('release', workers=8))
+
+    Arguments:
+    - `root`: str or Path
+    - `algorithm`: str
+    - `workers`: int
+    - `processes`: bool
+    - `buffer_size`: int
+
+    Return: generator(str)
+    Exceptions: IOError, OSError, ValueError
+    """
+    hashlib.new(algorithm)
+    root = str(root)
+    names = collections.deque()
+
+    def jobs():
+        for name in _files(root):
+            names.append(name)
+            yield os.path.join(root, name), algorithm, buffer_size
+
+    for result in _pmap(_digestjob, jobs(), workers, processes):
+        if isinstance(result, EnvironmentError):
+            raise result
+        name, escaped = _escape(names.popleft())
+        yield '{0}{1}  {2}\n'.format('\\' if escaped else '', result, name)
+
+def _parse(line):
+    """
+    Return the (DIGEST, NAME) on the manifest LINE.
+
+    Return: (str, str)
+    Exceptions: ValueError
+    """
+    line = line.rstrip('\n')
+    escaped = line.startswith('\\')
+    if escaped:
+        line = line[1:]
+    digest, sep, name = line.partition(' ')
+    if not sep or not name or name[0] not in ' *':
+        raise ValueError("Can't make sense of the manifest line {0} Larry... ".format(line))
+    name = name[1:]
+    if escaped:
+        name = _unescape(name)
+    return digest, name
+
+def verify(root, lines, algorithm='sha256', workers=None, processes=False,
+           buffer_size=BUFFER_SIZE):
+    """
+    Check the tree at ROOT against the manifest LINES, as for
+    sha256sum -c, hashing files on a pool as for manifest().
+
+    Generate (NAME, STATUS) for each file listed, where STATUS is one
+    of 'OK', 'FAILED' or 'MISSING'.
+
+    Arguments:
+    - `root`: str or Path
+    - `lines`: iterable(str)
+    - `algorithm`: str
+    - `workers`: int
+    - `processes`: bool
+    - `buffer_size`: int
+
+    Return: generator((str, str))
+    Exceptions: ValueError
+    """
+    hashlib.new(algorithm)
+    root = str(root)
+    expected = collections.deque()
+
+    def jobs():
+        for line in lines:
+            if not line.strip():
+                continue
+            digest, name = _parse(line)
+            expected.append((name, digest.lower()))
+            yield os.path.join(root, name), algorithm, buffer_size
+
+    for result in _pmap(_digestjob, jobs(), workers, processes):
+        name, digest = expected.popleft()
+        if isinstance(result, EnvironmentError):
+            status = 'MISSING' if result.errno == errno.ENOENT else 'FAILED'
+        else:
+            status = 'OK' if result == digest else 'FAILED'
+        yield name, status
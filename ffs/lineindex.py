@@ -0,0 +1,356 @@
+"""
+Indexes of where each line of a file starts, for jumping straight to line N
+
+>>> index = lineindex.get('huge.csv', persist=True)
+>>> start, stop = index.span(1000000)
+
+Indexes can be kept in a sidecar file next to the one they index. Both
+the sidecar and the last few indexes we've built are checked against
+the file's size and mtime before we trust them, and if all that has
+happened is that the file has been appended to, we only index the new
+lines.
+"""
+from __future__ import with_statement
+
+import array
+import collections
+import hashlib
+import itertools
+import operator
+import os
+import struct
+import sys
+import threading
+
+from six.moves import map
+
+from ffs import hashing
+from ffs._py3k import accumulate
+
+# How much of a file we read at a time when indexing it
+BUFFER_SIZE = 1 << 20
+
+# Sidecars are hidden files next to the file they index, with this suffix
+SUFFIX = '.lineindex'
+
+MAGIC = b'ffs-lineindex-1\n'
+
+# Size, mtime_ns, number of offsets and fingerprint, followed by the offsets
+_HEADER = struct.Struct('<QqQ20s')
+
+# How much of the end of a file we fingerprint to tell appends from rewrites
+FINGERPRINT_SIZE = 4096
+
+# How many indexes we keep in memory
+MEMO_SIZE = 16
+
+# Offsets are unsigned 64 bit integers - 'Q' where we have it, else 'L'
+try:
+    _TYPECODE = 'Q'
+    array.array(_TYPECODE)
+except ValueError: # Python 2
+    _TYPECODE = 'L'
+
+# _lock guards _memo, and only _memo: we index files and read and write
+# sidecars holding one of _keylocks, picked by the file's (dev, inode),
+# so one file is never indexed twice at once and others needn't wait.
+_memo = collections.OrderedDict()
+_lock = threading.Lock()
+_keylocks = [threading.Lock() for _ in range(MEMO_SIZE)]
+
+class LineIndex(object):
+    """
+    The offsets at which each line of a file starts, as of when it was
+    SIZE bytes long and last modified at MTIME_NS.
+
+    Offsets are kept in an array, at eight bytes a line.
+    """
+    def __init__(self, offsets=None, size=0, mtime_ns=0, fingerprint=b''):
+        if offsets is None:
+            offsets = array.array(_TYPECODE, [0])
+        self.offsets = offsets
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.fingerprint = fingerprint
+        self.persisted = False
+
+    def __repr__(self):
+        return '<LineIndex {0} lines>'.format(len(self))
+
+    def __len__(self):
+        # A newline at the very end doesn't start another line
+        count = len(self.offsets)
+        if self.offsets[-1] == self.size:
+            return count - 1
+        return count
+
+    def fresh(self, st):
+        """
+        Does this index describe the file with the stat() result ST?
+
+        Arguments:
+        - `st`: stat_result
+
+        Return: bool
+        Exceptions: None
+        """
+        return hashing._stamp(st)[2:] == (self.size, self.mtime_ns)
+
+    def offset(self, n):
+        """
+        Return the offset at which line N starts, or if there are only N
+        lines, the end of the file.
+
+        Arguments:
+        - `n`: int
+
+        Return: int
+        Exceptions: IndexError
+        """
+        if n < len(self.offsets):
+            return self.offsets[n]
+        if n == len(self):
+            return self.size
+        raise IndexError("There's no line {0} Larry... ".format(n))
+
+    def span(self, n):
+        """
+        Return the (START, STOP) offsets of line N, newline and all.
+        Negative N count back from the end, as for lists.
+
+        Arguments:
+        - `n`: int
+
+        Return: (int, int)
+        Exceptions: IndexError
+        """
+        count = len(self)
+        if n < 0:
+            n += count
+        if not 0 <= n < count:
+            raise IndexError("There's no line {0} Larry... ".format(n))
+        return self.offsets[n], self.offset(n + 1)
+
+def _fingerprint(fh, size):
+    """
+    Return a digest of the FINGERPRINT_SIZE bytes of binary FH before SIZE.
+
+    Return: bytes
+    Exceptions: None
+    """
+    start = max(0, size - FINGERPRINT_SIZE)
+    fh.seek(start)
+    return hashlib.sha1(fh.read(size - start)).digest()
+
+def _extend(index, fh, st, buffer_size):
+    """
+    Index the lines of binary FH after INDEX.size, up to the size in
+    its stat() result ST.
+
+    We find the newlines in a block by splitting it, then turn the
+    lengths of the pieces into offsets with accumulate(). split() still
+    makes a bytes object for every line, but the looping and arithmetic
+    all happen in C rather than in a Python loop over the lines.
+
+    Return: LineIndex
+    Exceptions: None
+    """
+    _, _, size, mtime_ns = hashing._stamp(st)
+    base = index.size
+    fh.seek(base)
+    while base < size:
+        block = fh.read(min(buffer_size, size - base))
+        if not block:
+            break
+        pieces = block.split(b'\n')
+        pieces.pop()
+        if pieces:
+            steps = map(operator.add, map(len, pieces), itertools.repeat(1))
+            starts = accumulate(itertools.chain([base], steps))
+            index.offsets.extend(itertools.islice(starts, 1, None))
+        base += len(block)
+    index.size, index.mtime_ns = base, mtime_ns
+    index.fingerprint = _fingerprint(fh, base)
+    index.persisted = False
+    return index
+
+def build(fh, st, buffer_size=BUFFER_SIZE):
+    """
+    Return a new index of the lines in the binary file FH, whose
+    stat() result is ST.
+
+    Arguments:
+    - `fh`: file-like object
+    - `st`: stat_result
+    - `buffer_size`: int
+
+    Return: LineIndex
+    Exceptions: None
+    """
+    return _extend(LineIndex(), fh, st, buffer_size)
+
+def update(index, fh, st, buffer_size=BUFFER_SIZE):
+    """
+    Return INDEX brought up to date with the binary file FH, whose
+    stat() result is ST.
+
+    If FH has grown, and the end of what we indexed before hasn't
+    changed, we assume it has been appended to and only index the new
+    lines. Otherwise we start again. Either way INDEX itself is left as
+    it was - a new index is returned - so anyone still holding it keeps
+    a consistent view of the file as it was.
+
+    Arguments:
+    - `index`: LineIndex
+    - `fh`: file-like object
+    - `st`: stat_result
+    - `buffer_size`: int
+
+    Return: LineIndex
+    Exceptions: None
+    """
+    if index.fresh(st):
+        return index
+    if st.st_size > index.size and _fingerprint(fh, index.size) == index.fingerprint:
+        copy = LineIndex(index.offsets[:], index.size, index.mtime_ns, index.fingerprint)
+        return _extend(copy, fh, st, buffer_size)
+    return build(fh, st, buffer_size)
+
+def dump(index, fh):
+    """
+    Write INDEX to the binary file FH.
+
+    Arguments:
+    - `index`: LineIndex
+    - `fh`: file-like object
+
+    Return: None
+    Exceptions: None
+    """
+    offsets = index.offsets
+    if sys.byteorder != 'little':
+        offsets = array.array(_TYPECODE, offsets)
+        offsets.byteswap()
+    fh.write(MAGIC)
+    fh.write(_HEADER.pack(index.size, index.mtime_ns, len(offsets), index.fingerprint))
+    fh.write(getattr(offsets, 'tobytes', getattr(offsets, 'tostring', None))())
+
+def load(fh):
+    """
+    Read an index from the binary file FH, as written by dump(), or
+    return None if FH doesn't hold one.
+
+    Arguments:
+    - `fh`: file-like object
+
+    Return: LineIndex or None
+    Exceptions: None
+    """
+    if fh.read(len(MAGIC)) != MAGIC:
+        return None
+    header = fh.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        return None
+    size, mtime_ns, count, fingerprint = _HEADER.unpack(header)
+    offsets = array.array(_TYPECODE)
+    data = fh.read(count * offsets.itemsize)
+    if len(data) != count * offsets.itemsize:
+        return None
+    getattr(offsets, 'frombytes', getattr(offsets, 'fromstring', None))(data)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return LineIndex(offsets, size, mtime_ns, fingerprint)
+
+def sidecar(path):
+    """
+    Return the path of the sidecar in which we keep the index for PATH.
+
+    Arguments:
+    - `path`: str
+
+    Return: str
+    Exceptions: None
+    """
+    dirname, basename = os.path.split(str(path))
+    return os.path.join(dirname, '.' + basename + SUFFIX)
+
+def _load(path, opener):
+    """
+    Return the index in the sidecar for PATH, if there is one.
+
+    Return: LineIndex or None
+    Exceptions: None
+    """
+    try:
+        with opener(sidecar(path), 'rb') as fh:
+            index = load(fh)
+    except EnvironmentError:
+        return None
+    if index is not None:
+        index.persisted = True
+    return index
+
+def _save(path, index, opener, rename):
+    """
+    Write INDEX to the sidecar for PATH, by way of a temporary file so
+    that nobody ever reads half of one.
+
+    Return: None
+    Exceptions: IOError, OSError
+    """
+    target = sidecar(path)
+    tmp = '{0}.{1}'.format(target, os.getpid())
+    with opener(tmp, 'wb') as fh:
+        dump(index, fh)
+    rename(tmp, target)
+    index.persisted = True
+
+def get(path, persist=False, opener=None, rename=os.rename, st=None,
+        buffer_size=BUFFER_SIZE):
+    """
+    Return an up to date index of the lines of the file at PATH.
+
+    We look for one in memory first, then in the sidecar file next to
+    PATH, and only index PATH if neither will do - and then only as
+    much of it as has been appended since. If PERSIST is truthy we
+    write the result to the sidecar.
+
+    OPENER and RENAME are used for file access, defaulting to open()
+    and os.rename(). ST is PATH's stat() result, if we have it already.
+
+    Arguments:
+    - `path`: str or Path
+    - `persist`: bool
+    - `opener`: callable
+    - `rename`: callable
+    - `st`: stat_result
+    - `buffer_size`: int
+
+    Return: LineIndex
+    Exceptions: IOError, OSError
+    """
+    path = str(path)
+    if opener is None:
+        opener = open
+    if st is None:
+        st = os.stat(path)
+    key = (st.st_dev, st.st_ino)
+    with _keylocks[hash(key) % len(_keylocks)]:
+        with _lock:
+            index = _memo.get(key)
+        if index is None:
+            index = _load(path, opener)
+        if index is None or not index.fresh(st):
+            with opener(path, 'rb') as fh:
+                if index is None:
+                    index = build(fh, st, buffer_size)
+                else:
+                    index = update(index, fh, st, buffer_size)
+        if persist and not index.persisted:
+            _save(path, index, opener, rename)
+        with _lock:
+            _memo.pop(key, None)
+            _memo[key] = index
+            while len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+    return index
@@ -7,12 +7,15 @@ import contextlib
 import errno
 import filecmp
 import grp
+import io
+import itertools
 import os
 import pwd as pwdb
 import shutil
 import sys
 
-from ffs import exceptions
+from ffs import exceptions, streams
+from ffs._py3k import scandir
 
 class cd(object):
     """
@@ -155,23 +158,40 @@ cp_r = shutil.copytree
 
 getwd = os.getcwd
 
-def head(filename, lines=10):
+def head(filename, lines=10, nbytes=None):
     """
     Python port of the *nix head command.
 
     Return the frist LINES lines of the file at FILENAME
-    Defaults to 10 lines.
+    Defaults to 10 lines. If NBYTES is given, return the frist
+    NBYTES bytes instead, as bytes, as for head -c.
+
+    We stop reading as soon as we have enough.
 
     Arguments:
     - `filename`: str or Path
     - `lines`: int
+    - `nbytes`: int
 
-    Return: str
+    Return: str, or bytes if NBYTES is given
     Exceptions: None
     """
+    if nbytes is not None:
+        with open(str(filename), 'rb') as fh:
+            return fh.read(nbytes)
     with open(str(filename)) as fh:
-        return "".join(fh.readlines()[:lines])
+        return "".join(itertools.islice(fh, lines))
 
+def _text(data):
+    """
+    Return the bytes DATA as open() would have read them in text mode.
+
+    Return: str
+    Exceptions: UnicodeDecodeError
+    """
+    if isinstance(data, str):
+        return data
+    return io.TextIOWrapper(io.BytesIO(data)).read()
 
 # ::install (FileUtils)
 
@@ -213,8 +233,104 @@ ln_s = os.symlink
 
 # ::ln_sf (FileUtils)
 
+def _entrystat(entry):
+    """
+    Return the stat result for the DirEntry ENTRY, falling back to the
+    link itself for broken symlinks.
+
+    Arguments:
+    - `entry`: DirEntry
+
+    Return: stat_result
+    Exceptions: OSError
+    """
+    try:
+        return entry.stat()
+    except OSError:
+        return entry.stat(follow_symlinks=False)
+
+def _extension(name):
+    "The bit after the last '.' in NAME, as GNU ls -X sees it"
+    if '.' not in name:
+        return ''
+    return name.rsplit('.', 1)[1]
+
+# Sort keys for ls --sort=WORD. GNU puts the newest (-t) and largest (-S)
+# first, breaking ties by name.
+_LSSORTS = {
+    'name':      lambda e: e.name,
+    'time':      lambda e: (-_entrystat(e).st_mtime, e.name),
+    'size':      lambda e: (-_entrystat(e).st_size, e.name),
+    'extension': lambda e: (_extension(e.name), e.name),
+    }
+
+def iterentries(path, all=None, almost_all=None, ignore_backups=None):
+    """
+    Generate the os.scandir() DirEntry objects for the contents of
+    PATH as the directory is read, filtering as for ls().
+
+    Nothing is sorted and nothing is kept, so this is the way to go
+    through very large directories.
+
+    Arguments:
+    - `path`: str or Path
+    - `all`: bool
+    - `almost_all`: bool
+    - `ignore_backups`: bool
+
+    Return: generator(DirEntry)
+    Exceptions: None
+    """
+    hidden = all is None and almost_all is None
+    entries = scandir(str(path))
+    try:
+        for entry in entries:
+            name = entry.name
+            if hidden and name[0] == '.':
+                continue
+            if ignore_backups and name[-1] == '~':
+                continue
+            yield entry
+    finally:
+        if hasattr(entries, 'close'):
+            entries.close()
+
+def lsentries(path, all=None, almost_all=None, ignore_backups=None,
+              sort=None, reverse=None):
+    """
+    Like ls(), but return the os.scandir() DirEntry objects for the
+    contents of PATH rather than their names.
+
+    These know the type of each entry from the directory listing
+    itself, and cache their stat() results, so asking about them
+    doesn't have to go back to the filesystem.
+
+    As there are no DirEntry objects for them, '.' and '..' are never
+    included.
+
+    Arguments:
+    - `path`: str or Path
+    - `all`: bool
+    - `almost_all`: bool
+    - `ignore_backups`: bool
+    - `sort`: str
+    - `reverse`: bool
+
+    Return: list[DirEntry]
+    Exceptions: ValueError
+    """
+    if sort is not None and sort not in _LSSORTS and sort != 'none':
+        raise ValueError("Can't sort by {0} Larry... ".format(sort))
+    entries = list(iterentries(path, all=all, almost_all=almost_all,
+                               ignore_backups=ignore_backups))
+    if sort in _LSSORTS:
+        entries.sort(key=_LSSORTS[sort])
+    if reverse:
+        entries.reverse()
+    return entries
+
 # !!! expand to include other ls flags
-def ls(path, all=None, almost_all=None, ignore_backups=None):
+def ls(path, all=None, almost_all=None, ignore_backups=None, sort=None, reverse=None):
     """
     Python translation of GNU ls
 
@@ -233,22 +349,32 @@ def ls(path, all=None, almost_all=None, ignore_backups=None):
     If IGNORE_BACKUPS is truthy, we will ignore entries starting in '~'
     IGNORE_BACKUPS takes precedence over ALL. Again, take it up with Stallman.
 
+    SORT orders the list, as for ls --sort=WORD:
+      'name'      alphabetically
+      'time'      newest first (ls -t)
+      'size'      largest first (ls -S)
+      'extension' alphabetically by extension (ls -X)
+      'none'      directory order (ls -U)
+    If REVERSE is truthy, reverse the order (ls -r)
+
+    Everything we need to sort comes from the one directory listing.
+
     Arguments:
     - `path`: str or Path
     - `all`: bool
     - `almost_all`: bool
     - `ignore_backups`: bool
+    - `sort`: str
+    - `reverse`: bool
 
     Return: list[str]
-    Exceptions:None
+    Exceptions: ValueError
     """
-    entries = os.listdir(str(path))
-    if all is None and almost_all is None:
-        entries = [f for f in entries if f[0] != '.']
+    entries = [e.name for e in lsentries(path, all=all, almost_all=almost_all,
+                                         ignore_backups=ignore_backups,
+                                         sort=sort, reverse=reverse)]
     if all:
         entries += ['.', '..']
-    if ignore_backups:
-        entries = [e for e in entries if e[-1] != '~']
     return entries
 
 # !!! Add SELinux context
@@ -376,6 +502,32 @@ rmdir = os.rmdir
 # !!! Wrap to accept Path
 stat = os.stat
 
+def tail(filename, lines=10, nbytes=None):
+    """
+    Python port of the *nix tail command.
+
+    Return the last LINES lines of the file at FILENAME.
+    Defaults to 10 lines. If NBYTES is given, return the last
+    NBYTES bytes instead, as bytes, as for tail -c.
+
+    We read backwards from the end of the file, so this is just as
+    quick for enormous files as for small ones.
+
+    Arguments:
+    - `filename`: str or Path
+    - `lines`: int
+    - `nbytes`: int
+
+    Return: str, or bytes if NBYTES is given
+    Exceptions: None
+    """
+    with open(str(filename), 'rb') as fh:
+        if nbytes is not None:
+            fh.seek(0, 2)
+            fh.seek(max(0, fh.tell() - nbytes))
+            return fh.read()
+        return _text(streams.tail(fh, lines))
+
 def touch(fname):
     """
     Python port of the Unix touch command
@@ -0,0 +1,124 @@
+"""
+Remembering what files parsed into, for as long as they don't change
+
+>>> config = Path('config.json').json_load(cache=True)
+
+Each lookup costs one stat(), which the loaders take anyway: if the
+file's device, inode, size and mtime are what they were when we parsed
+it, we hand back what we parsed last time.
+
+Cached objects are shared between everyone who loads the same file, so
+treat them as read-only.
+"""
+from __future__ import with_statement
+
+import collections
+import threading
+
+from ffs import hashing
+
+# How many parsed files a cache holds by default
+MAX_ENTRIES = 256
+
+# And how many bytes of files, by default
+MAX_BYTES = 64 << 20
+
+class ParseCache(object):
+    """
+    A least-recently-used cache of the results of parsing files.
+
+    Entries are keyed by the path parsed and the loader that parsed it,
+    and valid for as long as the file's size and mtime (and device and
+    inode) are what they were when it was parsed.
+
+    We keep at most MAX_ENTRIES results, from at most MAX_BYTES bytes
+    of files - the size of a file being a rough guide to the size of
+    what it parses into. Files bigger than that are never cached.
+
+    HITS and MISSES count lookups. Caches may be shared between threads.
+    """
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<ParseCache {0} entries, {1} bytes>'.format(len(self), self.nbytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path, st, loader, load):
+        """
+        Return what the file at PATH, whose stat() result is ST, parses
+        into with LOADER - calling LOAD() to parse it if we don't have an
+        up to date result already.
+
+        Arguments:
+        - `path`: str
+        - `st`: stat_result
+        - `loader`: hashable
+        - `load`: callable
+
+        Return: object
+        Exceptions: Whatever LOAD() raises
+        """
+        key = (str(path), loader)
+        stamp = hashing._stamp(st)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                if entry[0] == stamp:
+                    self._entries[key] = entry
+                    self.hits += 1
+                    return entry[1]
+                self.nbytes -= entry[2]
+            self.misses += 1
+        value = load()
+        if st.st_size > self.max_bytes:
+            return value
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[2]
+            self._entries[key] = (stamp, value, st.st_size)
+            self.nbytes += st.st_size
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, _, size) = self._entries.popitem(last=False)
+                self.nbytes -= size
+        return value
+
+    def clear(self):
+        """
+        Forget everything, and reset our counters.
+
+        Return: None
+        Exceptions: None
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.nbytes = 0
+
+# The cache the Path loaders use when asked for cache=True
+default = ParseCache()
+
+def resolve(cache):
+    """
+    Return the ParseCache a loader's CACHE argument asks for: the
+    default cache for True, none for False or None, or CACHE itself.
+
+    Arguments:
+    - `cache`: bool or ParseCache
+
+    Return: ParseCache or None
+    Exceptions: None
+    """
+    if cache is True:
+        return default
+    if cache is False:
+        return None
+    return cache
@@ -5,24 +5,50 @@ Pathname API
 """
 from __future__ import with_statement
 
+import codecs
 import contextlib
+import errno
 import fnmatch
-import hashlib
+import genericpath
 try:
     import simplejson as json
 except ImportError:
     import json
-import mimetypes
+import mmap
+import ntpath
 import os
-import re
+import posixpath
+import sys
 import tempfile
-import traceback
+import time
 import types
 
 import six
 
-from ffs import (exceptions, filesystem, formats, nix, is_dir, is_file, size,
-                 _path_blacklists)
+from ffs import (appender, atomic, dupes, exceptions, filesystem, formats, globbing, hashing,
+                 lineindex, nix, parsecache, pickles, query, sniff, streams, tree, usage, is_dir,
+                 is_file, size, _path_blacklists)
+from ffs._py3k import bufferview
+
+# The os.path implementations treat their arguments as plain strings, so
+# slices taken from inside them must be string slices rather than
+# component slices. We recognise them by the globals of the calling frame.
+_STRSLICERS = frozenset(id(m.__dict__) for m in (posixpath, ntpath, genericpath))
+
+# Path.here() results, keyed by the calling file's (absolute) name
+_HERES = {}
+
+# Compiled membership tests for Path.__contains__, keyed by (item, sep)
+_CONTAINS = {}
+
+# Files and directories that paths are currently managing as contextmanagers,
+# keyed by id(path). This lives out here rather than on the instances, as
+# the vast majority of paths are never used in a with block.
+_MANAGED = {}
+
+# Appenders open in Path.appender() blocks, keyed by absolute path, so
+# that << on any Path to the same file can write through them.
+_APPENDERS = {}
 
 def _stringcoll(coll):
     """
@@ -39,6 +65,104 @@ def _stringcoll(coll):
         return len([s for s in coll if isinstance(s, six.string_types)]) == len(coll)
     return False
 
+def _containsmatcher(item, sep):
+    """
+    Compile ITEM into a predicate which tells us whether a path
+    contains it as a run of whole components.
+
+    If ITEM starts with SEP it must match from the root of an absolute
+    path, otherwise it may match anywhere. Trailing separators in ITEM
+    are ignored. ITEM is compared literally - there is no pattern
+    matching here.
+
+    Matchers are cached, as the same few items tend to be tested
+    against a great many paths.
+
+    Arguments:
+    - `item`: str
+    - `sep`: str
+
+    Return: callable(Path) -> bool
+    Exceptions: None
+    """
+    try:
+        return _CONTAINS[item, sep]
+    except KeyError:
+        pass
+
+    if not item:
+        matcher = lambda path: True
+    elif item == '?':
+        matcher = lambda path: item in path._value
+    else:
+        anchored = item[0] == sep
+        needle = (item[1:] if anchored else item).split(sep)
+        while needle and not needle[-1]:
+            needle.pop()
+        needle = tuple(needle)
+        size = len(needle)
+
+        if anchored:
+            matcher = lambda path: path.is_abspath and path._parts[:size] == needle
+        elif size == 1:
+            component = needle[0]
+            matcher = lambda path: component in path._parts
+        else:
+            frist = needle[0]
+
+            def matcher(path):
+                "Look for NEEDLE as a contiguous run of PATH's components"
+                parts = path._parts
+                if parts[-size:] == needle:
+                    return True
+                start = 0
+                try:
+                    while True:
+                        start = parts.index(frist, start)
+                        if parts[start:start + size] == needle:
+                            return True
+                        start += 1
+                except ValueError:
+                    return False
+
+    if len(_CONTAINS) > 512:
+        _CONTAINS.clear()
+    _CONTAINS[item, sep] = matcher
+    return matcher
+
+def _sniffopener(fs):
+    """
+    Return the opener with which to sniff files on FS. On disk that's
+    one which won't open FIFOs, devices and so on.
+
+    Arguments:
+    - `fs`: BaseFilesystem
+
+    Return: callable
+    Exceptions: None
+    """
+    if isinstance(fs, filesystem.DiskFilesystem):
+        return lambda resource, mode: sniff._open(fs.expanduser(resource), mode)
+    return fs.open
+
+class _Blacklisted(object):
+    """
+    Descriptor that hides the str method NAME from path instances.
+
+    We blacklist string methods that are not appropriate for path
+    objects, despite inheriting from str for stdlib duck-typing
+    purposes. Doing this with descriptors rather than overriding
+    __getattribute__ keeps every other attribute lookup at full speed.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return getattr(str, self.name)
+        msg = "'path' object has no attribute '{0}'".format(self.name)
+        raise AttributeError(msg)
+
 class Pset(set):
     """
     Set subclass for representing collections of paths
@@ -54,6 +178,45 @@ class Pset(set):
         """
         return Pset(p[-1] for p in self)
 
+    def containing(self, item):
+        """
+        Return the paths in our collection which contain ITEM.
+
+        ITEM is matched exactly as for `item in path`, but is only
+        compiled once for the whole collection.
+
+        Arguments:
+        - `item`: str
+
+        Return: Pset
+        Exceptions: None
+        """
+        if not self:
+            return Pset()
+        sep = six.next(iter(self)).fs.sep
+        matches = _containsmatcher(item, sep)
+        return Pset(p for p in self if matches(p))
+
+    def mimetypes(self, workers=None):
+        """
+        Return {path: mimetype} for the paths in our collection, sniffed
+        from their contents as for Path.mimetype, on a pool of WORKERS
+        threads.
+
+        Paths we can't read, such as directories or FIFOs, have a
+        mimetype of None.
+
+        Arguments:
+        - `workers`: int
+
+        Return: dict
+        Exceptions: None
+        """
+        if not self:
+            return {}
+        opener = _sniffopener(six.next(iter(self)).fs)
+        return sniff.classify(self, workers, opener)
+
 
 # !!! Normalization to clean up ../, . && //
 
@@ -62,6 +225,14 @@ class BasePath(str):
     Base Path class from which other implementations will inherit
     """
     fsflavour = filesystem.DiskFilesystem
+    # Python 2 won't let str subclasses have non-empty __slots__, so
+    # there we fall back to an instance __dict__.
+    # _partcache holds the parsed components of _value, filled in by _parts
+    # _statcache is [ttl, snapshot, taken at] for paths from stat_cached()
+    # _entry is the os.scandir() DirEntry for paths that came from a listing
+    if six.PY3:
+        __slots__ = ('_value', 'fs', '_partcache', '_readlinegen', '_statcache',
+                     '_entry')
 
     def __new__(kls, *args, **kwargs):
         if len(args) > 0 and isinstance(args[0], six.string_types) and args[0].startswith('http://'):
@@ -75,7 +246,7 @@ class BasePath(str):
         as str objects are immutable, we must store the 'value'
         as an instance variable
         """
-        self.fs = self.fsflavour()
+        self.fs = self.fsflavour.instance()
         if value is None:
             self._value = self.fs.getwd()
         elif isinstance(value, (list, tuple)):
@@ -90,10 +261,6 @@ class BasePath(str):
             self._value = value
         else:
             raise TypeError("don't know how to initialize with {0} larry... ".format(value))
-        # these are used by contextmanagers possibly
-        self._file = None
-        self._startdir = None
-        self._readlinegen = None
         return
 
     def __repr__(self):
@@ -130,6 +297,19 @@ class BasePath(str):
         """
         return hash(self._value)
 
+    def __reduce__(self):
+        """
+        Pickle (and copy) paths by value.
+
+        What we've cached about the file - a DirEntry from a listing,
+        snapshots from stat_cached() - is left behind: DirEntries won't
+        pickle, and a stat is stale by the time it's unpickled anyway.
+
+        Return: tuple
+        Exceptions: None
+        """
+        return self.__class__, (self._value,)
+
     def __nonzero__(self):
         """
         determine whether this is a path on the current filesystem.
@@ -143,7 +323,7 @@ class BasePath(str):
         return: bool
         exceptions:
         """
-        return self.fs.exists(self._value)
+        return self._snapshot().exists
 
     # Py3k compatibility
     __bool__ = __nonzero__
@@ -155,19 +335,7 @@ class BasePath(str):
         return: int
         exceptions: none
         """
-        return len(self._split)
-
-    def __getattribute__(self, attr):
-        """
-        we override getattribute largely to allow us to blacklist
-        string methods that are not appropriate for path objects,
-        despite inheriting from str for stdlib duck-typing purposes.
-        """
-        if attr in _path_blacklists._strblacklist:
-            msg = "'path' object has no attribute '{0}'".format(attr)
-            raise AttributeError(msg)
-
-        return super(str, self).__getattribute__(attr)
+        return len(self._parts)
 
     def __getitem__(self, key):
         """
@@ -179,23 +347,26 @@ class BasePath(str):
         return: path
         exceptions: indexerror
         """
+        # os.path wants characters, not components
+        if id(sys._getframe(1).f_globals) in _STRSLICERS:
+            return str(self).__getitem__(key)
+
         Klass = self.__class__
-        # delegate to the list implementation
+        # delegate to the tuple implementation
         # we're relying on this to raise the correct exceptions
-        interesting = self._split.__getitem__(key)
+        interesting = self._parts.__getitem__(key)
 
         # if a single element, return just that
-        if isinstance(key, int):
+        if isinstance(key, six.integer_types):
             return Klass(interesting)
 
         # if we asked for [:int] and we're an abspath, prepend it
-        if isinstance(key, slice):
-            if key.start in [None, 0] and key.stop:
-                # !!! what does joining by '/' do on windoze?
-                frist = '{0}{1}'.format(self.fs.sep if self.is_abspath else '', interesting[0])
-                interesting[0] = frist
-
-        return Klass(self.fs.sep.join(interesting))
+        # !!! what does joining by '/' do on windoze?
+        sep = self.fs.sep
+        value = sep.join(interesting)
+        if key.start in [None, 0] and key.stop and self.is_abspath:
+            value = sep + value
+        return self._spawn(value, interesting, klass=Klass)
 
     def __getslice__(self, *args):
         """
@@ -203,12 +374,10 @@ class BasePath(str):
         this is a backwards compatibility hack, we just delegate to the
         more modern getitem.
 
-        Unless we're being called from os.path on a posix platform.
-        In which case we should pretend to be a string.
+        Unless we're being called from os.path, in which case we
+        should pretend to be a string.
         """
-        stack = traceback.extract_stack()
-        fname, line, fn, code = stack[-2]
-        if fname.find('posixpath') != -1 and fn == 'split':
+        if id(sys._getframe(1).f_globals) in _STRSLICERS:
             return str(self).__getitem__(slice(*args))
         return self.__getitem__(slice(*args))
 
@@ -229,7 +398,16 @@ class BasePath(str):
     # !!! this behaves differently to __iter__.
     def __contains__(self, item):
         """
-        determine if item is in the path
+        determine if item is in the path.
+
+        item matches when its components appear as a run of whole
+        components of the path. if item starts with a separator, that
+        run must start at the root.
+
+        >>> 'bar' in Path('/foo/bar/baz')
+        True
+        >>> 'ba' in Path('/foo/bar/baz')
+        False
 
         arguments:
         - `item`: str
@@ -237,15 +415,7 @@ class BasePath(str):
         return: bool
         exceptions: None
         """
-        if item == '?':
-            return item in self._value
-        if item[0] == self.fs.sep:
-            regexp = r'^{0}'.format(item)
-        else:
-            regexp = r'^{0}|(?<=/){0}'.format(item)
-        if re.search(regexp, self._value):
-            return True
-        return False
+        return _containsmatcher(item, self.fs.sep)(self)
 
     def __add__(self, other):
         """
@@ -269,7 +439,11 @@ class BasePath(str):
         if isinstance(other, Path):
             return self + other._value
         if isinstance(other, six.string_types):
-            return klass(self.fs.sep.join([self._value, other]))
+            sep = self.fs.sep
+            new = klass(sep.join([self._value, other]))
+            if self._value and isinstance(new, klass):
+                new._partcache = self._parts + tuple(other.split(sep))
+            return new
 
         # collections must be typechecked. weak runtime type safety, yes, i know.
         if isinstance(other, (list, tuple)):
@@ -311,8 +485,10 @@ class BasePath(str):
             frist = self.fs.sep
         else:
             frist = ''
-        branches = [b for b in other.split(self.fs.sep) + self._split if b]
-        return Klass('{0}{1}'.format(frist, self.fs.sep.join(branches)))
+        branches = tuple(b for b in other.split(self.fs.sep) if b)
+        branches += tuple(b for b in self._parts if b)
+        value = '{0}{1}'.format(frist, self.fs.sep.join(branches))
+        return self._spawn(value, branches, klass=Klass)
 
     def __div__(self, other):
         """
@@ -343,7 +519,27 @@ class BasePath(str):
         Exceptions: None
         """
         # !!! Windoze?
-        return self._value[0] == self.fs.sep
+        return self._value[:1] == self.fs.sep
+
+    @property
+    def _parts(self):
+        """
+        The components of our value, ignoring the leading / if it exists.
+
+        These are parsed the first time we need them and kept as an
+        immutable tuple, so that slicing, len() and joins don't have to
+        re-split the string every time.
+
+        Return: tuple(str)
+        Exceptions: None
+        """
+        parts = getattr(self, '_partcache', None)
+        if parts is None:
+            sep, value = self.fs.sep, self._value
+            if value[:1] == sep:
+                value = value[1:]
+            parts = self._partcache = tuple(value.split(sep))
+        return parts
 
     @property
     def _split(self):
@@ -353,9 +549,87 @@ class BasePath(str):
         Return: list<str>
         Exceptions: None
         """
-        if self.is_abspath:
-            return self._value[1:].split(self.fs.sep)
-        return self._value.split(self.fs.sep)
+        return list(self._parts)
+
+    def _snapshot(self):
+        """
+        Take one look at SELF on the filesystem.
+
+        Operations that need to know several things about SELF (does
+        it exist? is it a directory?) should ask a single snapshot,
+        rather than going back to the filesystem for each answer.
+
+        If we came from stat_cached(), reuse our last snapshot until it
+        is older than the TTL.
+
+        Return: Snapshot
+        Exceptions: None
+        """
+        cache = getattr(self, '_statcache', None)
+        if cache is None:
+            return self.fs.snapshot(self._value)
+        ttl, snap, taken = cache
+        now = time.time()
+        if snap is None or now - taken > ttl:
+            snap = cache[1] = self.fs.snapshot(self._value)
+            cache[2] = now
+        return snap
+
+    def _changed(self):
+        """
+        Note that we have changed SELF on the filesystem, so any
+        cached snapshot of it is out of date.
+
+        Return: None
+        Exceptions: None
+        """
+        cache = getattr(self, '_statcache', None)
+        if cache is not None:
+            cache[1] = None
+        if getattr(self, '_entry', None) is not None:
+            self._entry = None
+
+    def stat_cached(self, ttl=1.0):
+        """
+        Return a copy of SELF that shares one look at the filesystem
+        between its predicates (truthiness, is_dir, is_file) and
+        operations for up to TTL seconds.
+
+        This trades freshness for fewer stat() calls, which matters when
+        each one is a round trip to a network filesystem. Changes made
+        through the copy itself are seen straight away.
+
+        Arguments:
+        - `ttl`: float
+
+        Return: Path
+        Exceptions: None
+        """
+        cached = self._spawn(self._value, self._parts)
+        cached._statcache = [ttl, None, 0]
+        return cached
+
+    def _spawn(self, value, parts, klass=None):
+        """
+        Create a new path of KLASS (defaulting to our own class) from
+        VALUE, where we already know that VALUE splits into PARTS.
+
+        This lets derived paths skip re-parsing their components.
+
+        Arguments:
+        - `value`: str
+        - `parts`: tuple(str)
+        - `klass`: type
+
+        Return: Path
+        Exceptions: None
+        """
+        if klass is None:
+            klass = self.__class__
+        new = klass(value)
+        if parts and isinstance(new, klass):
+            new._partcache = tuple(parts)
+        return new
 
     @property
     def abspath(self):
@@ -380,6 +654,13 @@ class BasePath(str):
         Return: Path
         Exceptions: None
         """
+        parts = self._parts
+        # With a non-empty last and penultimate component, the parent is
+        # just everything up to the final separator - no need to go and
+        # ask the filesystem.
+        if len(parts) > 1 and parts[-1] and parts[-2]:
+            cut = self._value.rindex(self.fs.sep)
+            return self._spawn(self._value[:cut], parts[:-1], klass=Path)
         strself = str(self)
         parnt = self.fs.parent(strself)
         return Path(parnt)
@@ -398,51 +679,141 @@ class BasePath(str):
 
         If we have passed PATTERN, then only return such entries as match
 
+        If we have passed SORT or REVERSE, return a list ordered as for
+        nix.ls(). Otherwise the contents are an unordered Pset.
+
+        If ALL is truthy, include hidden entries, and as for nix.ls(),
+        '.' and '..' - these always come last.
+
+        The paths we return remember what the directory listing told us
+        about them, so asking for their type or stat() doesn't have to
+        go back to the filesystem.
+
         Arguments:
         - `pattern`: str
+        - `all`: bool
+        - `sort`: str
+        - `reverse`: bool
 
         Return: iterable or string
         Exceptions: DoesNotExistError
         """
-        if self.is_file:
+        snap = self._snapshot()
+        if snap.is_leaf:
             return self._value
-        elif self.is_dir:
+        elif snap.is_branch:
             all = kwargs.get('all', None)
-            contents =  self.fs.ls(self, all=all)
+            sort, reverse = kwargs.get('sort', None), kwargs.get('reverse', None)
+            try:
+                contents = self.fs.lsentries(self, all=all, sort=sort, reverse=reverse)
+                # There are no DirEntries for these, but as for nix.ls()...
+                if all:
+                    contents += ['.', '..']
+            except NotImplementedError:
+                if sort or reverse:
+                    raise
+                contents = self.fs.ls(self, all=all)
             if args:
-                contents = fnmatch.filter(contents, args[0])
+                names = [getattr(c, 'name', c) for c in contents]
+                wanted = set(fnmatch.filter(names, args[0]))
+                contents = [c for c in contents if getattr(c, 'name', c) in wanted]
             if len(contents) == 0:
                 return []
-            return Pset(self/x for x in contents)
+            if sort or reverse:
+                return list(self._children(contents))
+            return Pset(self._children(contents))
 
         msg = "Cannot access {0}: No such file or directory".format(self)
         raise exceptions.DoesNotExistError(msg)
 
+    def _children(self, items):
+        """
+        Generate paths for ITEMS within SELF, extending our component
+        tuple rather than re-parsing each child.
+
+        ITEMS are names, or os.scandir() DirEntry objects, which the
+        children keep hold of.
+
+        Arguments:
+        - `items`: iterable(str or DirEntry)
+
+        Return: generator(Path)
+        Exceptions: None
+        """
+        sep, value = self.fs.sep, self._value
+        parts = self._parts if value else None
+        for item in items:
+            entry = None
+            if not isinstance(item, six.string_types):
+                entry, item = item, item.name
+            if parts is None:
+                child = self/item
+            else:
+                child = self._spawn(sep.join([value, item]), parts + (item,))
+            if entry is not None:
+                child._entry = entry
+            yield child
+
     # !!! json_dump()
-    # !!! pickle_load()
-    # !!! pickle_dump()
+
+for _attr in _path_blacklists._strblacklist:
+    setattr(BasePath, _attr, _Blacklisted(_attr))
+del _attr
 
 class LeafBranchPath(BasePath):
+    __slots__ = ()
 
     @property
     def is_dir(self):
         """
         Predicate property to determine if this is an existng directory
 
+        Paths from a directory listing answer from what the listing
+        said, as for stat().
+
         Return: bool
         Exceptions: None
         """
-        return self.fs.is_branch(self._value)
+        entry = getattr(self, '_entry', None)
+        if entry is not None:
+            return entry.is_dir()
+        return self._snapshot().is_branch
 
     @property
     def is_file(self):
         """
         Predicate property to determine if this is an existng file
 
+        Paths from a directory listing answer from what the listing
+        said, as for stat().
+
         Return: bool
         Exceptions: None
         """
-        return self.fs.is_leaf(self._value)
+        entry = getattr(self, '_entry', None)
+        if entry is not None:
+            return entry.is_file()
+        return self._snapshot().is_leaf
+
+    def stat(self):
+        """
+        Return the stat() result for SELF.
+
+        If we came from a directory listing, this is the (cached) result
+        from that listing. Such paths carry a snapshot of the file as
+        it was listed: changing it through the path itself (<<,
+        atomic_write(), touch(), rm(), mv() and so on) drops the
+        snapshot, but changes made any other way go unseen until then,
+        even though truthiness always looks afresh. Use Path(path) for
+        a path that always looks afresh.
+
+        Return: stat_result
+        Exceptions: OSError
+        """
+        entry = getattr(self, '_entry', None)
+        if entry is not None:
+            return nix._entrystat(entry)
+        return self.fs.stat(self._value)
 
     @contextlib.contextmanager
     def open(self, mode):
@@ -463,12 +834,97 @@ class LeafBranchPath(BasePath):
         Return: file
         Exceptions: TypeError
         """
-        if self.is_dir:
+        try:
+            with self._open(mode, self._snapshot()) as fh:
+                yield fh
+        finally:
+            if set(mode) & set('wax+'):
+                self._changed()
+
+    @contextlib.contextmanager
+    def atomic_write(self, mode='w', batch=None):
+        """
+        Contextmanager to replace the contents of SELF atomically.
+
+        We yield a temporary file next to SELF, and once the block is
+        done, fsync() it and rename() it over SELF - so readers see
+        either the old contents or the new, never a mixture. If the
+        block raises, SELF is left alone.
+
+        Pass an atomic.Batch as BATCH to replace many files at once for
+        far fewer trips to the disk.
+
+        >>> with Path('settings.json').atomic_write() as fh:
+        ...     json.dump(settings, fh)
+
+        If SELF is a directory, raise TypeError
+
+        Note::
+
+            If components of the path leading to SELF do not exist,
+            they will be created. It is assumed that the user knows their
+            own mind.
+
+        Arguments:
+        - `mode`: str
+        - `batch`: atomic.Batch
+
+        Return: file
+        Exceptions: TypeError, ValueError, InappropriateError
+        """
+        if not isinstance(self.fs, filesystem.DiskFilesystem):
+            raise exceptions.InappropriateError(
+                "Can only write atomically to disk Larry... ")
+        snap = self._snapshot()
+        if snap.is_branch:
+            raise TypeError("you can't write to a directory Larry... ")
+        if not snap.exists and not self.fs.is_branch(self.parent):
+            self.fs.mkdir((self[:-1]), parents=True)
+        try:
+            with atomic.atomic_write(self.fs.expanduser(self._value), mode, batch) as fh:
+                yield fh
+        finally:
+            self._changed()
+
+    def _open(self, mode, snap):
+        """
+        Open SELF in MODE, given SNAP, a snapshot we've already taken of
+        it. Implements open().
+
+        Arguments:
+        - `mode`: str
+        - `snap`: Snapshot
+
+        Return: file
+        Exceptions: TypeError
+        """
+        if snap.is_branch:
             raise TypeError("Opening a directory doesn't really mean anything Larry... ")
-        if not self.fs.is_branch(self.parent): # we only have to check one level
+        # we only have to check one level
+        if not snap.exists and not self.fs.is_branch(self.parent):
             self.fs.mkdir((self[:-1]), parents=True)
-        with self.fs.open(self._value, mode) as fh:
-            yield fh
+        return self.fs.open(self._value, mode)
+
+    def _read(self):
+        """
+        Read the contents of SELF, which we already know to be a file.
+
+        Return: str
+        Exceptions: None
+        """
+        with self.fs.open(self._value, 'r') as fh:
+            return fh.read()
+
+    def _lines(self):
+        """
+        Generate the lines of SELF, which we already know to be a file.
+
+        Return: generator(str)
+        Exceptions: None
+        """
+        with self.fs.open(self._value) as fh:
+            for line in fh:
+                yield line
 
     def read(self):
         """
@@ -481,11 +937,315 @@ class LeafBranchPath(BasePath):
         Return: str
         Exceptions: TypeError
         """
-        if self.is_dir:
+        if self._snapshot().is_branch:
+            raise TypeError("Reading a directory doesn't make any sense Larry... ")
+        return self._read()
+
+    def _map(self, access):
+        """
+        Map SELF into memory with ACCESS. If our filesystem can't map
+        files (or SELF is empty, which mmap() won't map) read it instead.
+
+        Return: (mmap or bytes, memoryview)
+        Exceptions: DoesNotExistError, TypeError, InappropriateError
+        """
+        snap = self._snapshot()
+        if not snap.exists:
+            raise exceptions.DoesNotExistError("Can't map something that doesn't exist Larry... ")
+        if snap.is_branch:
+            raise TypeError("Can't map a directory Larry... ")
+        st = getattr(snap, 'stat', None)
+        if st is None or st.st_size:
+            try:
+                mapping = self.fs.mmap(self._value, access)
+                return mapping, bufferview(mapping)
+            except NotImplementedError:
+                pass
+        if access == mmap.ACCESS_WRITE:
+            raise exceptions.InappropriateError("Can't map {0} for writing Larry... ".format(self))
+        with self.fs.open(self._value, 'rb') as fh:
+            data = fh.read()
+        return data, bufferview(data)
+
+    def read_bytes(self, view=False):
+        """
+        Read the contents of the file SELF as bytes.
+
+        If VIEW is truthy, return a read-only memoryview over a mapping
+        of SELF instead. Nothing is copied, and pages are only read from
+        disk as the view touches them, so slicing a few records out of a
+        huge file is cheap. The mapping lasts as long as the view does.
+
+        If SELF is a directory, raise TypeError.
+
+        Arguments:
+        - `view`: bool
+
+        Return: bytes or memoryview
+        Exceptions: DoesNotExistError, TypeError
+        """
+        if view:
+            return self._map(mmap.ACCESS_READ)[1]
+        if self._snapshot().is_branch:
             raise TypeError("Reading a directory doesn't make any sense Larry... ")
-        with self.open('r') as fh:
+        with self.fs.open(self._value, 'rb') as fh:
             return fh.read()
 
+    @contextlib.contextmanager
+    def mmap(self, access=mmap.ACCESS_READ):
+        """
+        Contextmanager to map SELF into memory, yielding the mmap and a
+        memoryview over it.
+
+        >>> with Path('blob.bin').mmap() as (mapping, view):
+        ...     header = view[:16]
+        ...     offset = mapping.find(b'\\x00\\x00')
+
+        ACCESS is one of the mmap.ACCESS_* constants. On filesystems
+        that can't map files we read SELF instead, and yield its bytes.
+
+        The mapping is closed at the end of the block, unless slices of
+        the view are still alive, in which case it goes when they do.
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `access`: int
+
+        Return: (mmap, memoryview)
+        Exceptions: DoesNotExistError, TypeError, InappropriateError
+        """
+        mapping, view = self._map(access)
+        try:
+            yield mapping, view
+        finally:
+            release = getattr(view, 'release', None)
+            if release is not None:
+                release()
+            if isinstance(mapping, mmap.mmap):
+                try:
+                    mapping.close()
+                except BufferError:
+                    pass
+            if access == mmap.ACCESS_WRITE:
+                self._changed()
+
+    def _readable(self):
+        """
+        Raise unless SELF is something we can read, otherwise return the
+        snapshot that tells us so.
+
+        Return: Snapshot
+        Exceptions: DoesNotExistError, TypeError
+        """
+        snap = self._snapshot()
+        if not snap.exists:
+            raise exceptions.DoesNotExistError("Can't read something that doesn't exist Larry... ")
+        if snap.is_branch:
+            raise TypeError("Can't read a directory Larry... ")
+        return snap
+
+    def chunks(self, size=streams.BUFFER_SIZE):
+        """
+        Generate the contents of the file SELF in blocks of up to SIZE
+        bytes, read into a single reused buffer.
+
+        Each block is a memoryview over that buffer, and only good until
+        the next one is read - take chunk.tobytes() to keep it.
+
+        >>> for chunk in Path('huge.bin').chunks(1 << 22):
+        ...     sock.sendall(chunk)
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `size`: int
+
+        Return: generator(memoryview)
+        Exceptions: DoesNotExistError, TypeError
+        """
+        self._readable()
+        return self._chunks(size)
+
+    def _chunks(self, size):
+        """
+        Generator behind chunks()
+        """
+        with self.fs.open(self._value, 'rb') as fh:
+            for chunk in streams.chunks(fh, size):
+                yield chunk
+
+    def lines(self, binary=True, buffer_size=streams.BUFFER_SIZE, encoding='utf-8',
+              start=None, stop=None):
+        """
+        Generate the lines of the file SELF, newlines and all.
+
+        Lines are split out of BUFFER_SIZE blocks rather than read one at
+        a time, which is a lot quicker for big files. If BINARY is
+        truthy we generate bytes, otherwise text decoded from ENCODING a
+        block at a time.
+
+        If START or STOP are given we generate only those lines, as for
+        a slice, seeking straight to the first of them with line_index().
+
+        >>> for row in Path('huge.csv').lines(start=1000000, stop=1000010):
+        ...     print(row)
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `binary`: bool
+        - `buffer_size`: int
+        - `encoding`: str
+        - `start`: int
+        - `stop`: int
+
+        Return: generator(bytes or unicode)
+        Exceptions: DoesNotExistError, TypeError, LookupError
+        """
+        snap = self._readable()
+        if binary:
+            encoding = None
+        else:
+            codecs.lookup(encoding)
+        begin, end = 0, None
+        if start is not None or stop is not None:
+            index = self._line_index(snap, False)
+            first, last, _ = slice(start, stop).indices(len(index))
+            begin = index.offset(first)
+            end = index.offset(max(first, last))
+        return self._splitlines(buffer_size, encoding, begin, end)
+
+    def _splitlines(self, buffer_size, encoding, begin, end):
+        """
+        Generator behind lines()
+        """
+        with self.fs.open(self._value, 'rb') as fh:
+            limit = None
+            if begin or end is not None:
+                fh.seek(begin)
+                limit = end - begin
+            for line in streams.lines(fh, buffer_size, encoding, limit):
+                yield line
+
+    def _line_index(self, snap, persist):
+        """
+        Implements line_index() given SNAP, a snapshot we've already
+        taken of SELF.
+        """
+        st = getattr(snap, 'stat', None)
+        if st is None:
+            st = self.stat()
+        return lineindex.get(self._value, persist, opener=self.fs.open,
+                             rename=self.fs.mv, st=st)
+
+    def line_index(self, persist=False):
+        """
+        Return an index of where each line of the file SELF starts, for
+        jumping straight to line N.
+
+        Indexes are remembered, and if PERSIST is truthy kept in a
+        sidecar file next to SELF too. Either way, they are checked
+        against the size and mtime of SELF before they are used, and if
+        SELF has only been appended to, only the new lines are indexed.
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `persist`: bool
+
+        Return: lineindex.LineIndex
+        Exceptions: DoesNotExistError, TypeError
+        """
+        return self._line_index(self._readable(), persist)
+
+    def line(self, n, binary=True, encoding='utf-8'):
+        """
+        Return line N of the file SELF, counting from 0, newline and all.
+        Negative N count back from the end.
+
+        We seek straight to it with line_index(), so after the first
+        time this costs a stat() and a read.
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+        If there is no line N, raise IndexError
+
+        Arguments:
+        - `n`: int
+        - `binary`: bool
+        - `encoding`: str
+
+        Return: bytes or unicode
+        Exceptions: DoesNotExistError, TypeError, IndexError
+        """
+        start, stop = self._line_index(self._readable(), False).span(n)
+        with self.fs.open(self._value, 'rb') as fh:
+            fh.seek(start)
+            data = fh.read(stop - start)
+        return data if binary else data.decode(encoding)
+
+    def tail(self, lines=10):
+        """
+        Return the last LINES lines of the file SELF, as for tail(1).
+
+        We read backwards from the end of SELF, so this is as quick for
+        a huge log as it is for a small one.
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `lines`: int
+
+        Return: str
+        Exceptions: DoesNotExistError, TypeError
+        """
+        self._readable()
+        with self.fs.open(self._value, 'rb') as fh:
+            return nix._text(streams.tail(fh, lines))
+
+    def reversed_lines(self, binary=True, buffer_size=streams.REVERSE_BUFFER_SIZE,
+                       encoding='utf-8'):
+        """
+        Generate the lines of the file SELF, last first, reading
+        backwards from the end a block at a time.
+
+        If BINARY is truthy we generate bytes, otherwise each line is
+        decoded from ENCODING.
+
+        >>> for line in Path('app.log').reversed_lines():
+        ...     if b'Started' in line:
+        ...         break
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `binary`: bool
+        - `buffer_size`: int
+        - `encoding`: str
+
+        Return: generator(bytes or unicode)
+        Exceptions: DoesNotExistError, TypeError, LookupError
+        """
+        self._readable()
+        if not binary:
+            codecs.lookup(encoding)
+        return self._reversedlines(buffer_size, None if binary else encoding)
+
+    def _reversedlines(self, buffer_size, encoding):
+        """
+        Generator behind reversed_lines()
+        """
+        with self.fs.open(self._value, 'rb') as fh:
+            for line in streams.reversed_lines(fh, buffer_size):
+                yield line if encoding is None else line.decode(encoding)
+
     def readline(self):
         """
         Duck-typing like a file.
@@ -497,12 +1257,13 @@ class LeafBranchPath(BasePath):
         Return: str
         Exceptions: TypeError
         """
-        if not self:
+        snap = self._snapshot()
+        if not snap.exists:
             raise TypeError("Can't read something that doesn't exist Larry... ")
-        if self.is_dir:
+        if snap.is_branch:
             raise TypeError("Can't read a directory Larry... ")
-        if not self._readlinegen:
-            self._readlinegen = self.__iter__()
+        if not getattr(self, '_readlinegen', None):
+            self._readlinegen = self._lines()
         try:
             return six.next(self._readlinegen)
         except StopIteration:
@@ -519,12 +1280,16 @@ class LeafBranchPath(BasePath):
         Return: None
         Exceptions: TypeError
         """
-        if not self:
+        snap = self._snapshot()
+        if not snap.exists:
             raise TypeError("Can't truncate something that doesn't exist Larry... ")
-        if self.is_dir:
+        if snap.is_branch:
             raise TypeError("Can't truncate a directory Larry... ")
-        with self.open('w') as fh:
-            fh.truncate()
+        try:
+            with self.fs.open(self._value, 'w') as fh:
+                fh.truncate()
+        finally:
+            self._changed()
         return
 
     @property
@@ -538,10 +1303,11 @@ class LeafBranchPath(BasePath):
         Return: str or list[str]
         Exceptions: None
         """
-        if self.is_dir:
+        snap = self._snapshot()
+        if snap.is_branch:
             return self.ls()
-        elif self.is_file:
-            return self.read()
+        elif snap.is_leaf:
+            return self._read()
         msg = "{0} isn't a thing Larry - how can it have contents?"
         raise exceptions.DoesNotExistError(msg)
 
@@ -555,22 +1321,128 @@ class LeafBranchPath(BasePath):
         from ffs.contrib.archive import ZipPath
         return ZipPath(self, error_if_not_found=True)
 
-    def json_load(self):
+    def _parsed(self, snap, cache, loader, load):
+        """
+        Return LOAD(), what SELF parses into with LOADER, by way of the
+        ParseCache that CACHE asks for, given SNAP, a snapshot we've
+        already taken of SELF.
+
+        Return: object
+        Exceptions: Whatever LOAD() raises
+        """
+        cache = parsecache.resolve(cache)
+        st = getattr(snap, 'stat', None)
+        if cache is None or st is None:
+            return load()
+        return cache.get(self.fs.abspath(self._value), st, loader, load)
+
+    def json_load(self, cache=False):
         """
         Treat SELF as a file containing JSON serialized data.
         Load that data and return it.
 
+        If CACHE is True, remember what we loaded in the default
+        parsecache.ParseCache, and while SELF is unchanged return that
+        rather than parse it again - so loading costs one stat(). Pass
+        a ParseCache to use that instead. Cached data is shared, so
+        don't change it.
+
         If SELF is a directory or does not exist, raise TypeError
 
+        Arguments:
+        - `cache`: bool or parsecache.ParseCache
+
         Return: object
         Exceptions: TypeError
         """
-        if not self:
+        snap = self._snapshot()
+        if not snap.exists:
             raise TypeError("Can't load something that doesn't exist Larry... ")
-        if self.is_dir:
+        if snap.is_branch:
             raise TypeError("Can't tread a directory as JSON Larry... ")
-        return json.loads(self.contents)
-    
+        return self._parsed(snap, cache, 'json', lambda: json.loads(self._read()))
+
+    def json_iter(self, prefix='', buffer_size=streams.BUFFER_SIZE, encoding='utf-8'):
+        """
+        Generate the elements of a JSON array in the file SELF one at a
+        time, parsing it BUFFER_SIZE bytes at a time rather than loading
+        the whole document.
+
+        If PREFIX is empty, the document is the array. Otherwise it is
+        a dotted path of keys leading to the array within objects.
+
+        >>> for record in Path('export.json').json_iter('data.results'):
+        ...     process(record)
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `prefix`: str
+        - `buffer_size`: int
+        - `encoding`: str
+
+        Return: generator(object)
+        Exceptions: DoesNotExistError, TypeError, LookupError, ValueError
+        """
+        self._readable()
+        codecs.lookup(encoding)
+        return self._jsoniter(prefix, buffer_size, encoding)
+
+    def _jsoniter(self, prefix, buffer_size, encoding):
+        """
+        Generator behind json_iter()
+        """
+        with self.fs.open(self._value, 'rb') as fh:
+            for element in formats.json_iter(fh, prefix, buffer_size, encoding):
+                yield element
+
+    def pickle_load(self):
+        """
+        Treat SELF as a file containing pickled data, written by
+        pickle_dump(). Load that data and return it.
+
+        Where SELF can be memory mapped, large payloads pickle_dump()
+        wrote out-of-band come back as read-only memoryviews over the
+        mapping, without being copied. The mapping lasts as long as
+        they do.
+
+        If SELF is a directory, raise TypeError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Return: object
+        Exceptions: DoesNotExistError, TypeError
+        """
+        _, view = self._map(mmap.ACCESS_READ)
+        return pickles.load(view)
+
+    def pickle_dump(self, obj, threshold=pickles.THRESHOLD):
+        """
+        Pickle OBJ to the file SELF.
+
+        With pickle protocol 5, bytes of THRESHOLD bytes or more, and
+        out-of-band buffers like those of numpy arrays, are written as
+        aligned regions after the pickle, for pickle_load() to map.
+
+        On disk we replace SELF atomically rather than overwrite it, so
+        anything still using a mapping of the old file is unharmed.
+
+        If SELF is a directory, raise TypeError
+
+        Arguments:
+        - `obj`: object
+        - `threshold`: int
+
+        Return: None
+        Exceptions: TypeError, PicklingError
+        """
+        if isinstance(self.fs, filesystem.DiskFilesystem):
+            writer = self.atomic_write('wb')
+        else:
+            writer = self.open('wb')
+        with writer as fh:
+            pickles.dump(obj, fh, threshold)
+
 
 class Path(LeafBranchPath):
     """
@@ -588,6 +1460,7 @@ class Path(LeafBranchPath):
     Return: None
     Exceptions: TypeError
     """
+    __slots__ = ()
 
     # !! this behaves differently to __contains__
     def __iter__(self):
@@ -595,7 +1468,7 @@ class Path(LeafBranchPath):
         path objects iterate differently depending on context.
 
         if we are a directory, we iterate through path objects
-        representing the contents of that directory.
+        representing the contents of that directory, as it is read.
 
         if we represent a file, iteration returns one line at a time.
 
@@ -604,22 +1477,15 @@ class Path(LeafBranchPath):
         return: generator(str or path)
         exceptions: DoesNotExistError
         """
-        if self.is_dir:
-
-            def dirgen():
-                "directory list generator"
-                for k in self.fs.ls(self._value):
-                    yield Path(k)
-            return dirgen()
-
-        elif self.is_file:
-            def filegen():
-                "file generator"
-                with self as fh:
-                    for line in fh:
-                        yield line
+        snap = self._snapshot()
+        if snap.is_branch:
+            try:
+                return self._children(self.fs.iterentries(self._value))
+            except NotImplementedError:
+                return self._children(self.fs.ls(self._value))
 
-            return filegen()
+        elif snap.is_leaf:
+            return self._lines()
 
         msg = 'the path {0} does not exist - not sure how to iterate'.format(self)
         raise exceptions.DoesNotExistError(msg)
@@ -646,14 +1512,80 @@ class Path(LeafBranchPath):
         return: None
         exceptions: TypeError
         """
-        if self.is_dir:
+        if _APPENDERS and isinstance(contents, six.string_types):
+            stack = _APPENDERS.get(self.fs.abspath(self._value))
+            if stack:
+                stack[-1].write(contents)
+                return
+        snap = self._snapshot()
+        if snap.is_branch:
             raise TypeError("you can't write to a directory Larry... ")
         if not isinstance(contents, six.string_types):
             raise TypeError("you have to write with a stringtype Larry... ")
-        with self.open('a') as fh:
-            fh.write(contents)
+        try:
+            with self._open('a', snap) as fh:
+                fh.write(contents)
+        finally:
+            self._changed()
         return
 
+    @contextlib.contextmanager
+    def appender(self, buffer_size=appender.BUFFER_SIZE, flush_interval=None,
+                 encoding='utf-8'):
+        """
+        Contextmanager to append to SELF through one open file, batching
+        writes, rather than opening and closing it for each <<.
+
+        Inside the block, << on any Path to this file writes through the
+        appender too. Writes are buffered up to BUFFER_SIZE bytes, or
+        FLUSH_INTERVAL seconds, and everything is flushed on the way out.
+        The file is opened O_APPEND, so records appended by several
+        processes at once stay whole.
+
+        >>> with log.appender() as out:
+        ...     for record in records:
+        ...         log << record
+
+        If SELF is a directory, raise TypeError
+
+        Note::
+
+            If components of the path leading to SELF do not exist,
+            they will be created. It is assumed that the user knows their
+            own mind.
+
+        Arguments:
+        - `buffer_size`: int
+        - `flush_interval`: float
+        - `encoding`: str
+
+        Return: appender.Appender
+        Exceptions: TypeError
+        """
+        snap = self._snapshot()
+        if snap.is_branch:
+            raise TypeError("you can't write to a directory Larry... ")
+        if not snap.exists and not self.fs.is_branch(self.parent):
+            self.fs.mkdir((self[:-1]), parents=True)
+        opener = None
+        if not isinstance(self.fs, filesystem.DiskFilesystem):
+            opener = self.fs.open
+        out = appender.Appender(self.fs.expanduser(self._value), buffer_size,
+                                flush_interval, encoding, opener)
+        key = self.fs.abspath(self._value)
+        _APPENDERS.setdefault(key, []).append(out)
+        try:
+            yield out
+        finally:
+            stack = _APPENDERS[key]
+            stack.remove(out)
+            if not stack:
+                del _APPENDERS[key]
+            try:
+                out.close()
+            finally:
+                self._changed()
+
     def __enter__(self):
         """
         contextmanager code - if the path is a file, this should behave like
@@ -661,12 +1593,15 @@ class Path(LeafBranchPath):
 
         if this is a directory, it should cd there and then return
         """
-        if self.is_file:
-            self._file = self.fs.open(self._value)
-            return self._file
-        elif self.is_dir:
-            self._startdir = self.fs.getwd()
+        snap = self._snapshot()
+        if snap.is_leaf:
+            fh = self.fs.open(self._value)
+            _MANAGED.setdefault(id(self), []).append((fh, None))
+            return fh
+        elif snap.is_branch:
+            startdir = self.fs.getwd()
             self.fs.cd(self)
+            _MANAGED.setdefault(id(self), []).append((None, startdir))
             return
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -674,14 +1609,16 @@ class Path(LeafBranchPath):
         Contextmanager handling.
         Exit from opening the path
         """
-        if self.is_file:
-            try:
-                self._file.close()
-            finally:
-                self._file = None
-        elif self.is_dir:
-            self.fs.cd(self._startdir)
-            self._startdir = None
+        stack = _MANAGED.get(id(self))
+        if not stack:
+            return
+        fh, startdir = stack.pop()
+        if not stack:
+            del _MANAGED[id(self)]
+        if fh is not None:
+            fh.close()
+        else:
+            self.fs.cd(startdir)
         return
 
     @property
@@ -704,7 +1641,7 @@ class Path(LeafBranchPath):
         Return: Path
         Exceptions: None
         """
-        fs = klass.fsflavour()
+        fs = klass.fsflavour.instance()
         tmpath = fs.tempdir()
         try:
             yield klass(tmpath)
@@ -724,7 +1661,7 @@ class Path(LeafBranchPath):
         Return: Path
         Exceptions: None
         """
-        fs = klass.fsflavour()
+        fs = klass.fsflavour.instance()
         tmpath = fs.tempfile()
         pth = klass(tmpath)
         pth.touch()
@@ -743,7 +1680,7 @@ class Path(LeafBranchPath):
         Return: klass()
         Exceptions: None
         """
-        fs = klass.fsflavour()
+        fs = klass.fsflavour.instance()
         tmpath = fs.tempdir()
         return klass(tmpath)
 
@@ -756,7 +1693,7 @@ class Path(LeafBranchPath):
         Return: klass()
         Exceptions: None
         """
-        fs = klass.fsflavour()
+        fs = klass.fsflavour.instance()
         if not filename:
             tmpfile = fs.tempfile()
             pth = klass(tmpfile)
@@ -777,17 +1714,17 @@ class Path(LeafBranchPath):
         Return: Path
         Exceptions: None
         """
-        stack = traceback.extract_stack()
-        me = __file__
-        if me.endswith('.pyc') or me.endswith('.pyo'):    # Bytecode!
-            me = me [:-1]
-
-        for i, frame in enumerate(stack):
-            if frame[0] == me:
-                there = stack[i-1][0]
-                return Path(there).abspath.parent
-
-        return
+        there = sys._getframe(1).f_code.co_filename
+        try:
+            return _HERES[there]
+        except KeyError:
+            pass
+        here = Path(there).abspath.parent
+        # Relative filenames depend on the working directory, so only
+        # remember absolute ones.
+        if os.path.isabs(there):
+            _HERES[there] = here
+        return here
 
     def touch(self, *args):
         """
@@ -806,18 +1743,20 @@ class Path(LeafBranchPath):
         Return: None
         Exceptions: TypeError
         """
-        if self.is_dir and not args:
+        snap = self._snapshot()
+        if snap.is_branch and not args:
             raise TypeError("Can't touch() a directory!")
         if not args:
             self.fs.touch(self)
         else:
-            if not self:
+            if not snap.exists:
                 self.fs.mkdir(self, parents=True)
             for arg in args:
                 tfile = self + arg
                 if not tfile.parent:
                     self.fs.mkdir(tfile.parent, parents=True)
                 self.fs.touch(tfile)
+        self._changed()
 
     def mkdir(self, *args):
         """
@@ -845,6 +1784,7 @@ class Path(LeafBranchPath):
         else:
             for arg in args:
                 self.fs.mkdir(self + arg, parents=True)
+        self._changed()
         return
 
     def cp(self, target):
@@ -864,6 +1804,8 @@ class Path(LeafBranchPath):
         if self.is_dir:
             recursive = True
         self.fs.cp(self, target, recursive=recursive)
+        if isinstance(target, BasePath):
+            target._changed()
         return
 
     def mv(self, target):
@@ -882,6 +1824,9 @@ class Path(LeafBranchPath):
         if not self:
             raise exceptions.DoesNotExistError("Can't move nothing Larry... ")
         self.fs.mv(self, target)
+        self._changed()
+        if isinstance(target, BasePath):
+            target._changed()
         return Path(target)
 
     #!!! Implement this
@@ -900,9 +1845,156 @@ class Path(LeafBranchPath):
         Exceptions: None
         """
         self.fs.rm(self)
+        self._changed()
+
+    def walk(self, topdown=True, maxdepth=None, prune=None, followlinks=False,
+             onerror=None, workers=None, ordered=False):
+        """
+        Generate (DIRPATH, DIRS, FILES) for each directory in the tree
+        below SELF, in the manner of os.walk(), where DIRS and FILES
+        are lists of Paths.
+
+        The Paths we yield remember what the directory listing told us
+        about them, so their is_dir, is_file and stat() are free.
+
+        If TOPDOWN is truthy, removing Paths from DIRS stops us
+        descending into them.
+
+        PRUNE is called with each directory Path before we read it,
+        skipping the subtree if it returns a truthy value, which is
+        how to avoid paying for listing .git or vendored trees.
+
+        WORKERS reads directories on a pool of that many threads, for
+        filesystems where listing latency dominates. The results are in
+        no particular order unless ORDERED is truthy.
+
+        For MAXDEPTH, FOLLOWLINKS, ONERROR and the limits of parallel
+        walks, see ffs.tree.walk().
+
+        Arguments:
+        - `topdown`: bool
+        - `maxdepth`: int
+        - `prune`: callable
+        - `followlinks`: bool
+        - `onerror`: callable
+        - `workers`: int
+        - `ordered`: bool
+
+        Return: generator((Path, [Path], [Path]))
+        Exceptions: DoesNotExistError, ValueError
+        """
+        if not self._snapshot().exists:
+            raise exceptions.DoesNotExistError("Can't walk nothing Larry... ")
+        pruner = None
+        if prune is not None:
+            pruner = lambda node: prune(self._walkpath(node))
+        scan = lambda branch: self.fs.iterentries(branch, all=True)
+        triples = tree._walk(self, topdown=topdown, maxdepth=maxdepth,
+                             prune=pruner, followlinks=followlinks,
+                             onerror=onerror, scan=scan, workers=workers,
+                             ordered=ordered)
+        return self._walkpaths(triples, topdown)
+
+    def glob(self, *patterns):
+        """
+        Generate the Paths below SELF which match any of PATTERNS.
+
+        PATTERNS are relative to SELF. Alongside the fnmatch wildcards,
+        ** matches any number of directories, {a,b} matches either a or
+        b, and a trailing / only matches directories. All PATTERNS are
+        matched in one traversal, which only reads the directories that
+        could contain a match.
+
+        >>> list(Path('/src').glob('**/*.{py,pyx}', 'setup.cfg'))
+        [/src/setup.cfg, /src/ffs/path.py]
+
+        Arguments:
+        - `*patterns`: str
+
+        Return: generator(Path)
+        Exceptions: ValueError
+        """
+        scan = lambda branch: self.fs.iterentries(branch, all=True)
+        return self._globpaths(globbing.glob(self._value, *patterns, scan=scan))
+
+    def rglob(self, *patterns):
+        """
+        Generate the Paths anywhere below SELF which match any of
+        PATTERNS, as for glob('**/pattern').
+
+        Arguments:
+        - `*patterns`: str
+
+        Return: generator(Path)
+        Exceptions: ValueError
+        """
+        return self.glob(*['**/' + pattern for pattern in patterns])
+
+    def _globpaths(self, matches):
+        """
+        Turn the (PATH, ENTRY) MATCHES of a glob into Paths
+        """
+        for path, entry in matches:
+            match = self.__class__(path)
+            if entry is not None:
+                match._entry = entry
+            yield match
+
+    def find(self, *predicates, **kwargs):
+        """
+        Generate the Paths below SELF which pass all of PREDICATES,
+        built from the functions in ffs.query, lazily as we walk.
+
+        >>> from ffs import query
+        >>> stale = query.type('f') & query.mtime(hi=time.time() - 86400)
+        >>> for p in Path('/scratch').find(stale, ~query.name('*.keep')):
+        ...     p.rm()
+
+        Keyword arguments are as for ffs.query.find()
+
+        The stdlib (os.path in particular) relies on the str.find() we
+        are shadowing here, so given a string we still behave like one.
+
+        Arguments:
+        - `*predicates`: Predicate
+
+        Return: generator(Path) or int
+        Exceptions: ValueError
+        """
+        if predicates and isinstance(predicates[0], six.string_types):
+            return self._value.find(*predicates)
+        kwargs['scan'] = lambda branch: self.fs.iterentries(branch, all=True)
+        prune = kwargs.get('prune')
+        if prune is not None:
+            kwargs['prune'] = lambda node: prune(self._walkpath(node))
+        entries = query._find(self._value, predicates, **kwargs)
+        return self._globpaths((entry.path, entry) for entry in entries)
+
+    def _walkpath(self, node):
+        """
+        Return the Path for NODE in a walk from SELF - either the path
+        we started from or the DirEntry for one of our subdirectories.
+        """
+        if isinstance(node, six.string_types):
+            return self
+        path = self.__class__(node.path)
+        path._entry = node
+        return path
+
+    def _walkpaths(self, triples, topdown):
+        """
+        Turn the (NODE, DIRS, FILES) TRIPLES of a walk from SELF into Paths
+        """
+        for node, dirs, files in triples:
+            dirpath = self._walkpath(node)
+            pdirs = list(dirpath._children(dirs))
+            yield dirpath, pdirs, list(dirpath._children(files))
+            if topdown:
+                dirs[:] = [d._entry for d in pdirs
+                           if getattr(d, '_entry', None) is not None]
 
     @contextlib.contextmanager
-    def csv(self, delimiter=',', header=False):
+    def csv(self, delimiter=',', header=False, cache=False):
         """
         Contextmanager to use SELF as a csv.Reader object
 
@@ -912,33 +2004,86 @@ class Path(LeafBranchPath):
         and use this to generate a namedtuple from the CSV.
         Return rows as instances of this namedtuple.
 
+        If CACHE is True, read all the rows at once, remember them in
+        the default parsecache.ParseCache, and yield an iterator over
+        them - while SELF is unchanged, later calls reuse those rows for
+        the cost of one stat(). Pass a ParseCache to use that instead.
+
         Arguments:
         - `delimiter`: str
         - `header`: bool
+        - `cache`: bool or parsecache.ParseCache
 
-        Return: csv.Reader
+        Return: csv.Reader or iterator
         Exceptions: None
         """
+        if parsecache.resolve(cache) is not None:
+            rows = self._parsed(self._readable(), cache, ('csv', delimiter, header),
+                                lambda: self._csvrows(delimiter, header))
+            yield iter(rows)
+            return
         with formats.CSV(self, delimiter=delimiter, header=header) as csv:
             yield csv
 
+    def _csvrows(self, delimiter, header):
+        """
+        Return all the rows of SELF, read as for csv(), as a tuple.
+        """
+        with formats.CSV(self, delimiter=delimiter, header=header) as csv:
+            return tuple(csv)
+
+    @contextlib.contextmanager
+    def jsonl(self, append=False, buffer_size=streams.BUFFER_SIZE):
+        """
+        Contextmanager to use SELF as a JSON Lines file - one JSON
+        document per line.
+
+        Iterate through it to get the documents one at a time, or
+        write() documents to replace its contents (or add to them, if
+        APPEND is True).
+
+        >>> with Path('events.jsonl').jsonl() as events:
+        ...     for event in events:
+        ...         print(event['type'])
+
+        Arguments:
+        - `append`: bool
+        - `buffer_size`: int
+
+        Return: formats.JSONL
+        Exceptions: None
+        """
+        try:
+            with formats.JSONL(self, append=append, buffer_size=buffer_size) as jsonl:
+                yield jsonl
+        finally:
+            self._changed()
+
     @property
     def mimetype(self):
         """
         Return a guessed mimetype for SELF.
 
-        If SELF is a directory, raise InappropriateError
+        We read the first sniff.SNIFF_SIZE bytes of SELF and look for a
+        known signature, falling back to a guess from the name. We go
+        straight to opening SELF, and only look at it any harder if that
+        fails. On disk, we only ever read regular files.
+
+        If SELF is a directory (or FIFO, device...), raise InappropriateError
         If SELF is nonexistant, raise DoesNotExistError
 
         Return: str
         Exceptions: InappropriateError, DoesNotExistError
         """
-        if not self:
-            raise exceptions.DoesNotExistError()
-        if self.is_dir:
-            raise exceptions.InappropriateError()
-        mime, _ = mimetypes.guess_type(str(self))
-        return mime
+        try:
+            return sniff.mimetype(self, _sniffopener(self.fs))
+        except EnvironmentError:
+            snap = self._snapshot()
+            if not snap.exists:
+                raise exceptions.DoesNotExistError()
+            if not snap.is_leaf:
+                raise exceptions.InappropriateError()
+            raise
 
     @property
     def checksum(self):
@@ -950,13 +2095,144 @@ class Path(LeafBranchPath):
 
         Return: str
         """
-        if not self:
+        return self.digest()
+
+    def digest(self, algorithm='md5', buffer_size=hashing.BUFFER_SIZE, cache=None):
+        """
+        Return the hexdigest of this file, using ALGORITHM - anything
+        hashlib.new() will take. The file is read BUFFER_SIZE bytes at a
+        time, so memory use doesn't grow with the file.
+
+        If CACHE is a hashing.DigestCache (or the path of one) and SELF
+        hasn't changed since it was last hashed, this costs us a stat()
+        rather than a read.
+
+        If SELF is a directory, raise InappropriateError
+        If SELF is nonexistant, raise DoesNotExistError
+
+        Arguments:
+        - `algorithm`: str
+        - `buffer_size`: int
+        - `cache`: DigestCache or str
+
+        Return: str
+        Exceptions: DoesNotExistError, InappropriateError, ValueError
+        """
+        snap = self._snapshot()
+        if not snap.exists:
             raise exceptions.DoesNotExistError()
-        if self.is_dir:
+        if snap.is_branch:
             raise exceptions.InappropriateError()
-        checksum = hashlib.md5(self.open('rb').read()).hexdigest()
-        return checksum
+        st = getattr(snap, 'stat', None)
+        if st is None:
+            cache = None
+        return hashing.digest(self._value, algorithm, buffer_size, cache=cache,
+                              opener=lambda p: self.fs.open(p, 'rb'), st=st)
+
+    def manifest(self, algorithm='sha256', workers=None, processes=False):
+        """
+        Generate a sha256sum-style manifest of the files below SELF,
+        a line at a time, hashing them on a pool of WORKERS threads
+        (or processes, if PROCESSES is truthy).
+
+        >>> Path('SHA256SUMS') << ''.join(Path('release').manifest(workers=8))
+
+        Arguments:
+        - `algorithm`: str
+        - `workers`: int
+        - `processes`: bool
+
+        Return: generator(str)
+        Exceptions: DoesNotExistError, ValueError
+        """
+        if not self._snapshot().is_branch:
+            raise exceptions.DoesNotExistError(
+                "Can't make a manifest without a directory Larry... ")
+        return hashing.manifest(self._value, algorithm, workers, processes)
+
+    def verify(self, manifest, algorithm='sha256', workers=None, processes=False):
+        """
+        Check the files below SELF against MANIFEST - lines as from
+        manifest(), or the Path of a file full of them - as for
+        sha256sum -c.
+
+        Generate (NAME, STATUS) for each file in MANIFEST, where STATUS
+        is 'OK', 'FAILED' or 'MISSING'.
+
+        Arguments:
+        - `manifest`: iterable(str) or Path
+        - `algorithm`: str
+        - `workers`: int
+        - `processes`: bool
+
+        Return: generator((str, str))
+        Exceptions: DoesNotExistError, ValueError
+        """
+        if not self._snapshot().is_branch:
+            raise exceptions.DoesNotExistError(
+                "Can't verify without a directory Larry... ")
+        if isinstance(manifest, six.string_types):
+            manifest = Path(manifest)
+        return hashing.verify(self._value, manifest, algorithm, workers, processes)
+
+    def duplicates(self, *others, **kwargs):
+        """
+        Generate lists of the Paths of files with identical contents
+        below SELF (and any OTHERS), reading as little of each file as
+        we can get away with. Keyword arguments are as for
+        ffs.dupes.duplicates() - pass LINK='hardlink' to replace all but
+        the first of each group with a link to it.
+
+        >>> for group in Path('/srv/share').duplicates(workers=8):
+        ...     print(group[0], len(group) - 1)
+
+        Arguments:
+        - `*others`: str or Path
+
+        Return: generator([Path])
+        Exceptions: DoesNotExistError, ValueError
+        """
+        roots = (self,) + others
+        for root in roots:
+            if not Path(root)._snapshot().is_branch:
+                raise exceptions.DoesNotExistError(
+                    "Can't look for duplicates without a directory Larry... ")
+        return ([Path(p) for p in group] for group in dupes.duplicates(*roots, **kwargs))
+
+    def du(self, workers=None, apparent=False, top=usage.TOP):
+        """
+        Report on the disk usage of everything below SELF, in one walk,
+        as for ffs.usage.du(): the total, subtotals for each directory,
+        totals by extension, and the TOP largest files.
+
+        We count the space files take on disk, or their sizes if
+        APPARENT is truthy, and count hard links once. Listing and
+        stat()ing happen on a pool of WORKERS threads.
+
+        >>> report = Path('/srv/data').du(workers=16)
+        >>> for size, path in report.largest:
+        ...     print(size, path)
+
+        If SELF is nonexistant, raise DoesNotExistError
+        If SELF isn't on disk, raise InappropriateError
+
+        Arguments:
+        - `workers`: int
+        - `apparent`: bool
+        - `top`: int
+
+        Return: usage.Usage
+        Exceptions: DoesNotExistError, InappropriateError, ValueError
+        """
+        if not isinstance(self.fs, filesystem.DiskFilesystem):
+            raise exceptions.InappropriateError(
+                "Can only measure disk usage on disk Larry... ")
+        try:
+            return usage.du(self.fs.expanduser(self._value), workers, apparent, top)
+        except OSError as err:
+            if err.errno == errno.ENOENT:
+                raise exceptions.DoesNotExistError(
+                    "Can't measure something that doesn't exist Larry... ")
+            raise
         
     # !!! json_dump()
-    # !!! pickle_load()
-    # !!! pickle_dump()
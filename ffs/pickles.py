@@ -0,0 +1,164 @@
+"""
+Pickles whose large buffers can be loaded without copying them
+
+>>> with open('stage1.pickle', 'wb') as fh:
+...     pickles.dump(result, fh)
+>>> with open('stage1.pickle', 'rb') as fh:
+...     data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+>>> result = pickles.load(memoryview(data))
+
+Where pickle has protocol 5 (Python 3.8 onwards), large payloads don't
+go in the pickle stream at all. Bytes of at least THRESHOLD bytes, and
+anything that pickles out-of-band buffers itself (numpy arrays,
+pickle.PickleBuffer...) are written after it, each in its own region
+aligned to ALIGNMENT bytes. Loaded from a memory map, those regions are
+handed back as memoryviews over the map, so nothing is copied, and
+pages are only read as they're touched.
+
+Large bytes come back as read-only memoryviews rather than bytes.
+
+Without protocol 5 we write and read plain pickles.
+"""
+import io
+import struct
+
+import six
+from six.moves import cPickle as pickle
+
+# Do we have protocol 5, and so out-of-band buffers?
+OUT_OF_BAND = hasattr(pickle, 'PickleBuffer')
+
+# Bytes at least this long are written out-of-band
+THRESHOLD = 1 << 16
+
+# Regions start at multiples of this, which suits vector instructions
+ALIGNMENT = 64
+
+MAGIC = b'ffs-pickle-5\n'
+
+# Length of the pickle stream, and the number of regions
+_HEADER = struct.Struct('<QQ')
+
+# Offset, length and kind of each region
+_REGION = struct.Struct('<QQQ')
+
+# Region kinds: a buffer the pickle stream asked for, or large bytes
+_BUFFER, _BYTES = 0, 1
+
+if OUT_OF_BAND:
+    class _Pickler(pickle.Pickler):
+        """
+        Pickle to FH, putting large bytes and out-of-band buffers into
+        REGIONS as (KIND, memoryview) pairs.
+        """
+        def __init__(self, fh, regions, threshold):
+            pickle.Pickler.__init__(self, fh, protocol=5, buffer_callback=self._buffer)
+            self.regions = regions
+            self.threshold = threshold
+
+        def _buffer(self, buf):
+            try:
+                raw = buf.raw()
+            except BufferError: # Not contiguous - pickle it in-band
+                return True
+            self.regions.append((_BUFFER, raw))
+            return False
+
+        def persistent_id(self, obj):
+            if type(obj) is bytes and len(obj) >= self.threshold:
+                self.regions.append((_BYTES, memoryview(obj)))
+                return len(self.regions) - 1
+            return None
+
+    class _Unpickler(pickle.Unpickler):
+        """
+        Unpickle from FH, with the large bytes in VIEWS.
+        """
+        def __init__(self, fh, views, buffers):
+            pickle.Unpickler.__init__(self, fh, buffers=buffers)
+            self.views = views
+
+        def persistent_load(self, pid):
+            return self.views[pid]
+
+def _align(offset):
+    """
+    Round OFFSET up to a multiple of ALIGNMENT.
+
+    Return: int
+    Exceptions: None
+    """
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def dump(obj, fh, threshold=THRESHOLD):
+    """
+    Pickle OBJ to the binary file FH, with bytes of at least THRESHOLD
+    bytes and out-of-band buffers in aligned regions after the pickle.
+
+    Arguments:
+    - `obj`: object
+    - `fh`: file-like object
+    - `threshold`: int
+
+    Return: None
+    Exceptions: PicklingError
+    """
+    if not OUT_OF_BAND:
+        pickle.dump(obj, fh, pickle.HIGHEST_PROTOCOL)
+        return
+    regions = []
+    stream = io.BytesIO()
+    _Pickler(stream, regions, threshold).dump(obj)
+    stream = stream.getbuffer()
+    offset = len(MAGIC) + _HEADER.size + _REGION.size * len(regions) + len(stream)
+    table = []
+    for kind, raw in regions:
+        offset = _align(offset)
+        table.append(_REGION.pack(offset, raw.nbytes, kind))
+        offset += raw.nbytes
+    fh.write(MAGIC)
+    fh.write(_HEADER.pack(len(stream), len(regions)))
+    fh.write(b''.join(table))
+    fh.write(stream)
+    offset = len(MAGIC) + _HEADER.size + _REGION.size * len(regions) + len(stream)
+    for kind, raw in regions:
+        padding = _align(offset) - offset
+        fh.write(b'\0' * padding)
+        fh.write(raw)
+        offset += padding + raw.nbytes
+
+def load(data):
+    """
+    Unpickle the contents of a file written by dump(), given as DATA.
+
+    Where DATA is a memoryview over a memory map, regions come back as
+    memoryviews over the same map, which keep it open for as long as
+    they are in use.
+
+    Arguments:
+    - `data`: bytes-like object
+
+    Return: object
+    Exceptions: UnpicklingError, ValueError
+    """
+    if six.PY2:
+        data = bytes(data)
+    if data[:len(MAGIC)] != MAGIC:
+        return pickle.loads(data)
+    if not OUT_OF_BAND:
+        raise ValueError("Can't load out-of-band buffers without protocol 5 Larry... ")
+    view = memoryview(data)
+    start = len(MAGIC) + _HEADER.size
+    length, count = _HEADER.unpack_from(view, len(MAGIC))
+    views, buffers = [], []
+    for i in range(count):
+        offset, size, kind = _REGION.unpack_from(view, start + i * _REGION.size)
+        if offset + size > len(view):
+            raise ValueError("Truncated pickle Larry... ")
+        region = view[offset:offset + size]
+        views.append(region)
+        if kind == _BUFFER:
+            buffers.append(region)
+    start += _REGION.size * count
+    stream = io.BytesIO(view[start:start + length])
+    return _Unpickler(stream, views, buffers).load()
@@ -0,0 +1,388 @@
+"""
+find(1) style queries over directory trees
+
+Predicates are built with the functions in this module, and combined
+with & (and), | (or) and ~ (not):
+
+>>> old = query.mtime(hi=time.time() - 30 * 86400)
+>>> list(query.find('/scratch', query.type('f') & old & ~query.name('*.keep')))
+
+Each predicate is a test on the os.scandir() DirEntry for a candidate.
+DirEntry objects cache their stat() results, so however many
+predicates need one there is at most a single stat() per entry - and
+none at all for entries ruled out by name or type first.
+
+Trees change while we walk them. An entry we can't stat() by the time
+a predicate asks - say it was deleted after we listed its directory -
+matches nothing, not even a negated test, as in find(1).
+"""
+import fnmatch
+import grp
+import pwd
+import re
+import stat
+
+import six
+
+from ffs import tree
+
+# How expensive predicates are to evaluate, so that we can try the cheap
+# ones first. Names are free, types usually come with the listing, and
+# everything else needs a stat().
+FREE, LISTED, STATTED = 0, 1, 2
+
+def _lstat(entry):
+    """
+    Return the stat() result for ENTRY itself rather than anything it
+    links to, as find(1) does by default.
+
+    Return: stat_result
+    Exceptions: OSError
+    """
+    return entry.stat(follow_symlinks=False)
+
+class Predicate(object):
+    """
+    A test applied to the DirEntry for each candidate.
+
+    Predicates combine with &, | and ~, and know how COST-ly they are,
+    so that combinations can put the cheap tests first.
+    """
+    def __init__(self, test, cost=FREE, description='?'):
+        self.test = test
+        self.cost = cost
+        self.description = description
+
+    def __call__(self, entry):
+        return _passes(self.test, entry)
+
+    def __repr__(self):
+        return '<Predicate {0}>'.format(self.description)
+
+    def __and__(self, other):
+        return all_of(self, other)
+
+    def __or__(self, other):
+        return any_of(self, other)
+
+    def __invert__(self):
+        test = self.test
+        return Predicate(lambda entry: not test(entry), self.cost,
+                         'not {0}'.format(self.description))
+
+def _passes(test, entry):
+    """
+    Does ENTRY pass TEST? Entries we can no longer stat() don't.
+
+    Tests raise rather than answer for these, so that wherever in a
+    combination the stat() was needed - under a ~ included - it's the
+    whole test that fails.
+
+    Return: bool
+    Exceptions: None
+    """
+    try:
+        return test(entry)
+    except OSError:
+        return False
+
+def _flatten(predicates, kind):
+    """
+    Return PREDICATES with any nested combinations of KIND spliced in,
+    cheapest first.
+
+    Return: [Predicate]
+    Exceptions: None
+    """
+    flat = []
+    for predicate in predicates:
+        flat.extend(getattr(predicate, kind, None) or [predicate])
+    return sorted(flat, key=lambda p: p.cost)
+
+def all_of(*predicates):
+    """
+    Return a predicate that passes when all of PREDICATES do.
+
+    Arguments:
+    - `*predicates`: Predicate
+
+    Return: Predicate
+    Exceptions: None
+    """
+    flat = _flatten(predicates, 'all_of')
+    tests = [p.test for p in flat]
+
+    def test(entry):
+        for t in tests:
+            if not t(entry):
+                return False
+        return True
+
+    description = ' and '.join(p.description for p in flat) or 'everything'
+    combined = Predicate(test, max([p.cost for p in flat] + [FREE]),
+                         '({0})'.format(description))
+    combined.all_of = flat
+    return combined
+
+def any_of(*predicates):
+    """
+    Return a predicate that passes when any of PREDICATES do.
+
+    Arguments:
+    - `*predicates`: Predicate
+
+    Return: Predicate
+    Exceptions: None
+    """
+    flat = _flatten(predicates, 'any_of')
+    tests = [p.test for p in flat]
+
+    def test(entry):
+        for t in tests:
+            if t(entry):
+                return True
+        return False
+
+    description = ' or '.join(p.description for p in flat) or 'nothing'
+    combined = Predicate(test, max([p.cost for p in flat] + [FREE]),
+                         '({0})'.format(description))
+    combined.any_of = flat
+    return combined
+
+def name(pattern):
+    """
+    Entries whose name matches the glob PATTERN, as for find -name.
+
+    Arguments:
+    - `pattern`: str
+
+    Return: Predicate
+    Exceptions: None
+    """
+    match = re.compile(fnmatch.translate(pattern)).match
+    return Predicate(lambda entry: match(entry.name) is not None, FREE,
+                     'name {0}'.format(pattern))
+
+def path(pattern):
+    """
+    Entries whose whole path matches the glob PATTERN, as for find -path.
+
+    Arguments:
+    - `pattern`: str
+
+    Return: Predicate
+    Exceptions: None
+    """
+    match = re.compile(fnmatch.translate(pattern)).match
+    return Predicate(lambda entry: match(entry.path) is not None, FREE,
+                     'path {0}'.format(pattern))
+
+def regex(expression):
+    """
+    Entries whose whole path matches the regular EXPRESSION, as for
+    find -regex.
+
+    Arguments:
+    - `expression`: str or compiled regular expression
+
+    Return: Predicate
+    Exceptions: None
+    """
+    pattern = getattr(expression, 'pattern', expression)
+    flags = getattr(expression, 'flags', 0)
+    match = re.compile('(?:{0})\\Z'.format(pattern), flags).match
+    return Predicate(lambda entry: match(entry.path) is not None, FREE,
+                     'regex {0}'.format(pattern))
+
+_STATTYPES = {
+    'b': stat.S_ISBLK,
+    'c': stat.S_ISCHR,
+    'p': stat.S_ISFIFO,
+    's': stat.S_ISSOCK,
+    }
+
+def type(kind):
+    """
+    Entries of KIND, using the letters of find -type:
+      'f' regular file
+      'd' directory
+      'l' symbolic link
+      'p' named pipe
+      's' socket
+      'b' block device
+      'c' character device
+
+    Symlinks are never followed, so a link to a directory is 'l'.
+
+    Arguments:
+    - `kind`: str
+
+    Return: Predicate
+    Exceptions: ValueError
+    """
+    description = 'type {0}'.format(kind)
+    if kind == 'f':
+        return Predicate(lambda e: e.is_file(follow_symlinks=False), LISTED, description)
+    if kind == 'd':
+        return Predicate(lambda e: e.is_dir(follow_symlinks=False), LISTED, description)
+    if kind == 'l':
+        return Predicate(lambda e: e.is_symlink(), LISTED, description)
+    if kind in _STATTYPES:
+        check = _STATTYPES[kind]
+        return Predicate(lambda e: check(_lstat(e).st_mode), STATTED, description)
+    raise ValueError("Don't know the file type {0} Larry... ".format(kind))
+
+def _between(field, lo, hi):
+    """
+    Entries whose stat() FIELD is at least LO and less than HI.
+
+    Return: Predicate
+    Exceptions: ValueError
+    """
+    if lo is None and hi is None:
+        raise ValueError("You haven't given a range for {0} Larry... ".format(field))
+
+    def test(entry):
+        value = getattr(_lstat(entry), field)
+        return (lo is None or value >= lo) and (hi is None or value < hi)
+
+    return Predicate(test, STATTED, '{0} in [{1}, {2})'.format(field, lo, hi))
+
+def size(lo=None, hi=None):
+    """
+    Entries of at least LO and less than HI bytes. Either may be None.
+
+    Arguments:
+    - `lo`: int
+    - `hi`: int
+
+    Return: Predicate
+    Exceptions: ValueError
+    """
+    return _between('st_size', lo, hi)
+
+def mtime(lo=None, hi=None):
+    """
+    Entries last modified at or after LO and before HI, as seconds
+    since the epoch. Either may be None.
+
+    Arguments:
+    - `lo`: float
+    - `hi`: float
+
+    Return: Predicate
+    Exceptions: ValueError
+    """
+    return _between('st_mtime', lo, hi)
+
+def atime(lo=None, hi=None):
+    """
+    Entries last accessed at or after LO and before HI, as for mtime()
+
+    Arguments:
+    - `lo`: float
+    - `hi`: float
+
+    Return: Predicate
+    Exceptions: ValueError
+    """
+    return _between('st_atime', lo, hi)
+
+def ctime(lo=None, hi=None):
+    """
+    Entries whose status last changed at or after LO and before HI, as
+    for mtime()
+
+    Arguments:
+    - `lo`: float
+    - `hi`: float
+
+    Return: Predicate
+    Exceptions: ValueError
+    """
+    return _between('st_ctime', lo, hi)
+
+def user(owner):
+    """
+    Entries owned by OWNER, a user name or uid.
+
+    Arguments:
+    - `owner`: str or int
+
+    Return: Predicate
+    Exceptions: KeyError
+    """
+    uid = owner if isinstance(owner, six.integer_types) else pwd.getpwnam(owner)[2]
+    return Predicate(lambda entry: _lstat(entry).st_uid == uid, STATTED,
+                     'user {0}'.format(owner))
+
+def group(owner):
+    """
+    Entries belonging to the group OWNER, a group name or gid.
+
+    Arguments:
+    - `owner`: str or int
+
+    Return: Predicate
+    Exceptions: KeyError
+    """
+    gid = owner if isinstance(owner, six.integer_types) else grp.getgrnam(owner)[2]
+    return Predicate(lambda entry: _lstat(entry).st_gid == gid, STATTED,
+                     'group {0}'.format(owner))
+
+def perm(mode, exact=False):
+    """
+    Entries with all of the permission bits in MODE set, as for
+    find -perm -MODE, or if EXACT, with exactly those bits.
+
+    Arguments:
+    - `mode`: int
+    - `exact`: bool
+
+    Return: Predicate
+    Exceptions: None
+    """
+    if exact:
+        test = lambda entry: stat.S_IMODE(_lstat(entry).st_mode) == mode
+    else:
+        test = lambda entry: _lstat(entry).st_mode & mode == mode
+    return Predicate(test, STATTED, 'perm {0:o}'.format(mode))
+
+def _find(root, predicates, maxdepth=None, prune=None, followlinks=False,
+          onerror=None, scan=None, workers=None):
+    """
+    Generate the DirEntry for everything below ROOT that passes all of
+    PREDICATES, in the order that the tree is walked.
+
+    Return: generator(DirEntry)
+    Exceptions: ValueError
+    """
+    kwargs = dict(maxdepth=maxdepth, prune=prune, followlinks=followlinks,
+                  onerror=onerror, workers=workers)
+    if scan is not None:
+        kwargs['scan'] = scan
+    test = all_of(*predicates).test
+    triples = tree._walk(root, **kwargs)
+    return (entry for _, dirs, files in triples
+            for entries in (dirs, files) for entry in entries if _passes(test, entry))
+
+def find(root, *predicates, **kwargs):
+    """
+    Generate the paths of everything below ROOT that passes all of
+    PREDICATES, lazily, as the tree is walked.
+
+    ROOT itself is not a candidate. Hidden files are. Keyword arguments
+    MAXDEPTH, PRUNE, FOLLOWLINKS, ONERROR and WORKERS are as for
+    ffs.tree.walk().
+
+    Arguments:
+    - `root`: str or Path
+    - `*predicates`: Predicate
+
+    Return: generator(str)
+    Exceptions: ValueError
+    """
+    prune = kwargs.get('prune')
+    if prune is not None:
+        kwargs['prune'] = lambda node: prune(tree._nodepath(node))
+    return (entry.path for entry in _find(str(root), predicates, **kwargs))
@@ -0,0 +1,228 @@
+"""
+Telling what a file is from what's in it
+
+>>> sniff.mimetype('upload-7f3a')
+'image/png'
+
+We read the first SNIFF_SIZE bytes of a file and match them against a
+table of signatures ("magic numbers") compiled into one regex. Where
+nothing matches, we guess from the name, and failing that, tell text
+from binary.
+"""
+from __future__ import with_statement
+
+import codecs
+import errno
+import mimetypes
+import os
+import re
+import stat
+
+from ffs import hashing
+
+# How much of the start of a file we look at
+SNIFF_SIZE = 1024
+
+def _nocase(text):
+    """
+    Return a regex matching the bytes TEXT in any case.
+
+    Return: bytes
+    Exceptions: None
+    """
+    out = []
+    for char in text.decode('ascii'):
+        if char.isalpha():
+            out.append('[{0}{1}]'.format(char.upper(), char.lower()))
+        else:
+            out.append(re.escape(char))
+    return ''.join(out).encode('ascii')
+
+# (regex matched at the start of the file, mimetype), most specific first
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF8[79]a', 'image/gif'),
+    (b'RIFF.{4}WEBP', 'image/webp'),
+    (b'RIFF.{4}WAVE', 'audio/x-wav'),
+    (b'RIFF.{4}AVI ', 'video/x-msvideo'),
+    (b'BM.{4}\x00\x00\x00\x00', 'image/bmp'),
+    (b'II\\*\x00|MM\x00\\*', 'image/tiff'),
+    (b'\x00\x00\x01\x00[\x01-\xff]\x00', 'image/vnd.microsoft.icon'),
+    (b'%PDF-', 'application/pdf'),
+    (b'%!PS', 'application/postscript'),
+    (b'\\{\\\\rtf', 'application/rtf'),
+    (b'PK\x03\x04|PK\x05\x06', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'BZh[1-9]', 'application/x-bzip2'),
+    (b'\xfd7zXZ\x00', 'application/x-xz'),
+    (b'7z\xbc\xaf\x27\x1c', 'application/x-7z-compressed'),
+    (b'\\(\xb5/\xfd', 'application/zstd'),
+    (b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (b'.{257}ustar', 'application/x-tar'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+    (b'SQLite format 3\x00', 'application/vnd.sqlite3'),
+    (b'\x7fELF', 'application/x-executable'),
+    (b'MZ', 'application/x-msdownload'),
+    (b'\xca\xfe\xba\xbe\x00\x00\x00[\x2d-\x7f]', 'application/java-vm'),
+    (b'ID3|\xff[\xe2\xe3\xf2\xf3\xfa\xfb]', 'audio/mpeg'),
+    (b'OggS', 'audio/ogg'),
+    (b'fLaC', 'audio/flac'),
+    (b'.{4}ftypqt  ', 'video/quicktime'),
+    (b'.{4}ftyp', 'video/mp4'),
+    (b'\x1a\x45\xdf\xa3', 'video/webm'),
+    (b'wOFF', 'font/woff'),
+    (b'wOF2', 'font/woff2'),
+    (b'<\\?xml', 'text/xml'),
+    (b'\\s*(?:' + _nocase(b'<!doctype html') + b'|' + _nocase(b'<html') + b')', 'text/html'),
+]
+
+# Where a signature only tells us what kind of container a file is, a
+# guess from the name starting with one of these can say what's in it
+REFINEMENTS = {
+    'application/zip': ('application/vnd.openxmlformats-officedocument.',
+                        'application/vnd.oasis.opendocument.',
+                        'application/epub+zip', 'application/java-archive',
+                        'application/vnd.android.package-archive'),
+    'application/x-ole-storage': ('application/msword', 'application/vnd.ms-',
+                                  'application/x-msi'),
+    'text/xml': ('application/', 'image/svg+xml', 'text/'),
+}
+
+_SIGNATURES = re.compile(
+    b'|'.join(b'(?P<s' + str(i).encode('ascii') + b'>' + pattern + b')'
+              for i, (pattern, _) in enumerate(SIGNATURES)),
+    re.DOTALL)
+_TYPES = dict(('s{0}'.format(i), mime) for i, (_, mime) in enumerate(SIGNATURES))
+
+# Bytes which don't turn up in text
+_BINARY = re.compile(b'[\x00-\x08\x0e-\x1a\x1c-\x1f]')
+
+_BOMS = (codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+def _is_text(data):
+    """
+    Does DATA, the start of a file, look like text?
+
+    Return: bool
+    Exceptions: None
+    """
+    if data.startswith(_BOMS):
+        return True
+    if _BINARY.search(data):
+        return False
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(data, False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def sniff(data, name=None):
+    """
+    Return the mimetype of a file that starts with the bytes DATA, and
+    is called NAME.
+
+    Signatures in DATA win, except that a guess from NAME can refine
+    what a container format holds - a zip called report.docx is a Word
+    document. Otherwise we go by NAME, then text or binary. Empty
+    files with no name to go by are None.
+
+    Arguments:
+    - `data`: bytes
+    - `name`: str
+
+    Return: str or None
+    Exceptions: None
+    """
+    guess = mimetypes.guess_type(str(name))[0] if name is not None else None
+    match = _SIGNATURES.match(data)
+    if match is not None:
+        mime = _TYPES[match.lastgroup]
+        if guess and guess.startswith(REFINEMENTS.get(mime, ())):
+            return guess
+        return mime
+    if guess or not data:
+        return guess
+    return 'text/plain' if _is_text(data) else 'application/octet-stream'
+
+def _open(path, mode='rb'):
+    """
+    Open PATH for binary reading, as long as it is a regular file.
+
+    Opening a FIFO blocks until something writes to it, and reading a
+    device could do anything, so we open without blocking and fstat()
+    what we got before we read any of it.
+
+    Return: file
+    Exceptions: IOError, OSError
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0))
+    try:
+        mode = os.fstat(fd).st_mode
+        if stat.S_ISDIR(mode):
+            raise IOError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+        if not stat.S_ISREG(mode):
+            raise IOError(errno.EINVAL, "Not a regular file", path)
+        return os.fdopen(fd, 'rb')
+    except:
+        os.close(fd)
+        raise
+
+def mimetype(path, opener=None, size=SNIFF_SIZE):
+    """
+    Return the mimetype of the file at PATH, reading at most SIZE bytes
+    of it with OPENER.
+
+    By default we only read regular files, raising IOError for
+    anything else (directories, FIFOs, devices...) without blocking.
+
+    Arguments:
+    - `path`: str
+    - `opener`: callable
+    - `size`: int
+
+    Return: str or None
+    Exceptions: IOError, OSError
+    """
+    if opener is None:
+        opener = _open
+    with opener(path, 'rb') as fh:
+        data = fh.read(size)
+    return sniff(data, path)
+
+def _mimetypejob(job):
+    """
+    mimetype() for a pool, where JOB is (PATH, OPENER, SIZE). Files we
+    can't read are None.
+
+    Return: str or None
+    Exceptions: None
+    """
+    path, opener, size = job
+    try:
+        return mimetype(path, opener, size)
+    except EnvironmentError:
+        return None
+
+def classify(paths, workers=None, opener=None, size=SNIFF_SIZE):
+    """
+    Return {PATH: MIMETYPE} for each of PATHS, sniffing them as for
+    mimetype() on a pool of WORKERS threads. Paths we can't read,
+    directories and other things that aren't regular files included,
+    have a MIMETYPE of None.
+
+    Arguments:
+    - `paths`: iterable(str)
+    - `workers`: int
+    - `opener`: callable
+    - `size`: int
+
+    Return: dict
+    Exceptions: None
+    """
+    # The mimetypes database loads lazily - load it before threads race to
+    if not mimetypes.inited:
+        mimetypes.init()
+    paths = list(paths)
+    jobs = ((path, opener, size) for path in paths)
+    return dict(zip(paths, hashing._pmap(_mimetypejob, jobs, workers, False)))
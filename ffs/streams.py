@@ -0,0 +1,230 @@
+"""
+Reading files a block at a time
+"""
+import codecs
+import collections
+import itertools
+
+# How much of a file we read at a time
+BUFFER_SIZE = 1 << 20
+
+# How much we read at a time working backwards from the end of a file,
+# where we usually only want a little
+REVERSE_BUFFER_SIZE = 1 << 16
+
+def chunks(fh, size=BUFFER_SIZE):
+    """
+    Generate the rest of the open binary file FH in blocks of up to SIZE
+    bytes.
+
+    Blocks are read with readinto() into a single buffer allocated up
+    front, and generated as memoryviews over it - so each one is only
+    good until the next is read. Take chunk.tobytes() to keep one.
+
+    Arguments:
+    - `fh`: file-like object
+    - `size`: int
+
+    Return: generator(memoryview)
+    Exceptions: None
+    """
+    readinto = getattr(fh, 'readinto', None)
+    if readinto is None:
+        for chunk in iter(lambda: fh.read(size), b''):
+            yield chunk
+        return
+
+    buf = bytearray(size)
+    view = memoryview(buf)
+    while True:
+        count = readinto(buf)
+        if not count:
+            return
+        yield view if count == size else view[:count]
+
+def _batches(blocks, newline):
+    """
+    Generate lists of the lines in BLOCKS, split on NEWLINE, which they
+    keep. However long a line is, we only join its pieces once.
+
+    Working a list at a time leaves the per-line iteration to
+    itertools. splitlines() keeps newlines without copying each line
+    again, but also splits on carriage returns (and in text, a few other
+    things) - so if it finds more lines than there are NEWLINEs we split
+    the slow way instead.
+
+    Return: generator([str])
+    Exceptions: None
+    """
+    empty = newline[:0]
+    pending = []
+    for block in blocks:
+        if not block:
+            continue
+        lines = block.splitlines(True)
+        last = empty if lines[-1].endswith(newline) else lines.pop()
+        if len(lines) != block.count(newline):
+            lines = block.split(newline)
+            last = lines.pop()
+            lines = [line + newline for line in lines]
+        if pending and lines:
+            pending.append(lines[0])
+            lines[0] = empty.join(pending)
+            pending = []
+        if last:
+            pending.append(last)
+        if lines:
+            yield lines
+    if pending:
+        yield [empty.join(pending)]
+
+def _blocks(fh, size, limit=None):
+    """
+    Generate the rest of binary FH as bytes, SIZE at a time, stopping
+    after LIMIT bytes if it is given.
+
+    Return: generator(bytes)
+    Exceptions: None
+    """
+    if limit is None:
+        for block in iter(lambda: fh.read(size), b''):
+            yield block
+        return
+    while limit > 0:
+        block = fh.read(min(size, limit))
+        if not block:
+            return
+        limit -= len(block)
+        yield block
+
+def _decoded(blocks, encoding):
+    """
+    Generate BLOCKS of bytes decoded from ENCODING, taking care of
+    characters that straddle two blocks.
+
+    Return: generator(unicode)
+    Exceptions: UnicodeDecodeError
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for block in blocks:
+        yield decoder.decode(block)
+    yield decoder.decode(b'', True)
+
+def lines(fh, buffer_size=BUFFER_SIZE, encoding=None, limit=None):
+    """
+    Generate the lines of the open binary file FH, newlines and all.
+
+    Rather than asking the file for a line at a time, we read
+    BUFFER_SIZE bytes at once and split lines out of that. If ENCODING
+    is given, whole blocks are decoded rather than each line. If LIMIT
+    is given we stop after reading that many bytes.
+
+    Arguments:
+    - `fh`: file-like object
+    - `buffer_size`: int
+    - `encoding`: str
+    - `limit`: int
+
+    Return: generator(bytes or unicode)
+    Exceptions: LookupError, UnicodeDecodeError
+    """
+    blocks = _blocks(fh, buffer_size, limit)
+    if encoding is None:
+        return itertools.chain.from_iterable(_batches(blocks, b'\n'))
+    codecs.lookup(encoding)
+    return itertools.chain.from_iterable(_batches(_decoded(blocks, encoding), u'\n'))
+
+def _reversed_blocks(fh, size):
+    """
+    Generate (OFFSET, BLOCK) for blocks of up to SIZE bytes of the
+    binary file FH, working backwards from the end.
+
+    Return: generator((int, bytes))
+    Exceptions: None
+    """
+    fh.seek(0, 2)
+    end = fh.tell()
+    while end > 0:
+        start = max(0, end - size)
+        fh.seek(start)
+        yield start, fh.read(end - start)
+        end = start
+
+def _tailoffset(fh, lines, buffer_size):
+    """
+    Return the offset in binary FH at which its last LINES lines start.
+
+    Blocks without enough newlines in them are only counted, so this
+    costs us as many reads as it takes to find LINES lines.
+
+    Return: int
+    Exceptions: None
+    """
+    if lines <= 0:
+        fh.seek(0, 2)
+        return fh.tell()
+    wanted = lines
+    last = True
+    for start, block in _reversed_blocks(fh, buffer_size):
+        stop = len(block)
+        # A newline at the very end finishes the last line rather than starting another
+        if last and block.endswith(b'\n'):
+            stop -= 1
+        last = False
+        count = block.count(b'\n', 0, stop)
+        if count < wanted:
+            wanted -= count
+            continue
+        for _ in range(wanted):
+            stop = block.rfind(b'\n', 0, stop)
+        return start + stop + 1
+    return 0
+
+def tail(fh, lines=10, buffer_size=REVERSE_BUFFER_SIZE):
+    """
+    Return the last LINES lines of the binary file FH.
+
+    We read backwards from the end BUFFER_SIZE bytes at a time, so how
+    long this takes depends on how long the lines are, not the file.
+
+    Arguments:
+    - `fh`: file-like object
+    - `lines`: int
+    - `buffer_size`: int
+
+    Return: bytes
+    Exceptions: None
+    """
+    fh.seek(_tailoffset(fh, lines, buffer_size))
+    return fh.read()
+
+def reversed_lines(fh, buffer_size=REVERSE_BUFFER_SIZE):
+    """
+    Generate the lines of the binary file FH, newlines and all, starting
+    with the last one, reading backwards from the end a block at a time.
+
+    Arguments:
+    - `fh`: file-like object
+    - `buffer_size`: int
+
+    Return: generator(bytes)
+    Exceptions: None
+    """
+    # The pieces, in order, of the line that runs on from the start of
+    # the blocks we have seen so far
+    carry = collections.deque()
+    for _, block in _reversed_blocks(fh, buffer_size):
+        parts = block.split(b'\n')
+        if len(parts) == 1:
+            carry.appendleft(block)
+            continue
+        carry.appendleft(parts[-1])
+        line = b''.join(carry)
+        if line:
+            yield line
+        for part in reversed(parts[1:-1]):
+            yield part + b'\n'
+        carry = collections.deque([parts[0], b'\n'])
+    line = b''.join(carry)
+    if line:
+        yield line
@@ -0,0 +1,355 @@
+"""
+Recursive traversal of directory trees
+"""
+from multiprocessing.pool import ThreadPool
+import os
+import sys
+
+import six
+from six.moves import queue
+
+from ffs._py3k import scandir
+
+def _listdir(scan, path):
+    """
+    Split the contents of PATH into lists of directory and file entries.
+
+    Arguments:
+    - `scan`: callable
+    - `path`: str
+
+    Return: ([DirEntry], [DirEntry])
+    Exceptions: OSError
+    """
+    dirs, files = [], []
+    entries = scan(path)
+    try:
+        for entry in entries:
+            try:
+                isdir = entry.is_dir()
+            except OSError:
+                isdir = False
+            if isdir:
+                dirs.append(entry)
+            else:
+                files.append(entry)
+    finally:
+        if hasattr(entries, 'close'):
+            entries.close()
+    return dirs, files
+
+def _visit(node, path, opts):
+    """
+    Read the directory PATH, unless we've been told to prune NODE.
+
+    Errors reading PATH are returned rather than raised, so that they
+    can make their way back from a worker thread to ONERROR.
+
+    Arguments:
+    - `node`: str or DirEntry
+    - `path`: str
+    - `opts`: dict
+
+    Return: ([DirEntry], [DirEntry]) or OSError or None
+    Exceptions: None
+    """
+    prune = opts['prune']
+    if prune is not None and prune(node):
+        return None
+    try:
+        return _listdir(opts['scan'], path)
+    except OSError as err:
+        return err
+
+def _subdirs(dirs, depth, opts, ancestors):
+    """
+    Generate (ENTRY, ANCESTORS) for each of DIRS we should descend into
+    from DEPTH, with the ANCESTORS we will have once we are inside.
+
+    We stop at MAXDEPTH, and don't follow symlinks unless FOLLOWLINKS.
+    If we do, ANCESTORS is the set of (st_dev, st_ino) pairs for the
+    directories we came through, which we check so that we don't go
+    round in circles.
+
+    Arguments:
+    - `dirs`: [DirEntry]
+    - `depth`: int
+    - `opts`: dict
+    - `ancestors`: frozenset
+
+    Return: generator((DirEntry, frozenset))
+    Exceptions: None
+    """
+    maxdepth = opts['maxdepth']
+    if maxdepth is not None and depth >= maxdepth:
+        return
+    followlinks = opts['followlinks']
+    for entry in dirs:
+        below = ancestors
+        if followlinks:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            key = (st.st_dev, st.st_ino)
+            if key in ancestors:
+                continue
+            below = ancestors | frozenset([key])
+        elif entry.is_symlink():
+            continue
+        yield entry, below
+
+def _outcome(result, opts):
+    """
+    Unpack the RESULT of _visit(), passing any error to ONERROR.
+
+    Return: ([DirEntry], [DirEntry]) or None
+    Exceptions: None
+    """
+    if isinstance(result, OSError):
+        if opts['onerror'] is not None:
+            opts['onerror'](result)
+        return None
+    return result
+
+def _descend(node, path, depth, opts, ancestors):
+    """
+    Generate the (NODE, DIRS, FILES) triples for PATH and everything below it.
+
+    Arguments:
+    - `node`: str or DirEntry
+    - `path`: str
+    - `depth`: int
+    - `opts`: dict
+    - `ancestors`: frozenset
+
+    Return: generator
+    Exceptions: None
+    """
+    listing = _outcome(_visit(node, path, opts), opts)
+    if listing is None:
+        return
+    dirs, files = listing
+    topdown = opts['topdown']
+
+    if topdown:
+        yield node, dirs, files
+
+    for entry, below in _subdirs(dirs, depth, opts, ancestors):
+        for triple in _descend(entry, entry.path, depth + 1, opts, below):
+            yield triple
+
+    if not topdown:
+        yield node, dirs, files
+
+def _pdescend_unordered(pool, window, top, opts, ancestors):
+    """
+    Generate the (NODE, DIRS, FILES) triples below TOP, reading
+    directories on the threads of POOL and yielding each as soon as
+    it has been read.
+
+    Idle workers take the next directory from the pool's shared task
+    queue, so one large subtree doesn't leave the rest of them waiting.
+    We only have WINDOW directories being read, or read and waiting
+    for us to yield them, at once; the rest wait in BACKLOG as the bare
+    DirEntries we found them as, deepest first so that it stays short.
+
+    Return: generator
+    Exceptions: None
+    """
+    done = queue.Queue()
+
+    def job(node, path, depth, ancestors):
+        try:
+            done.put((node, depth, ancestors, _visit(node, path, opts), None))
+        except BaseException:
+            done.put((node, depth, ancestors, None, sys.exc_info()))
+
+    backlog = [(top, str(top), 1, ancestors)]
+    pending = 0
+    while backlog or pending:
+        while backlog and pending < window:
+            pool.apply_async(job, backlog.pop())
+            pending += 1
+        node, depth, ancestors, result, exc_info = done.get()
+        pending -= 1
+        if exc_info is not None:
+            six.reraise(*exc_info)
+        listing = _outcome(result, opts)
+        if listing is None:
+            continue
+        dirs, files = listing
+        backlog.extend((entry, entry.path, depth + 1, below)
+                       for entry, below in _subdirs(dirs, depth, opts, ancestors))
+        yield node, dirs, files
+
+def _pdescend_ordered(pool, window, top, opts, ancestors):
+    """
+    Generate the (NODE, DIRS, FILES) triples below TOP in the same order
+    as a (top down) sequential walk, reading directories on the threads
+    of POOL ahead of the point we have reached.
+
+    STACK holds what we have yet to yield, next up on top, as [NODE,
+    DEPTH, ANCESTORS, RESULT], where RESULT is None until we ask for it
+    to be read. We ask for the top WINDOW entries, the next ones we'll
+    need. The subdirectories of each one we yield go on top of those,
+    pushing them down the stack, so to keep reading what's next we let
+    up to WINDOW * 2 directories be read and waiting - but no more,
+    beyond the one we need right now.
+
+    Return: generator
+    Exceptions: None
+    """
+    stack = [[top, 1, ancestors, None]]
+    inflight = [0]
+
+    def readahead():
+        for n, item in enumerate(stack[-1:-window - 1:-1]):
+            if n and inflight[0] >= window * 2:
+                return
+            if item[3] is None:
+                item[3] = pool.apply_async(_visit, (item[0], str(_nodepath(item[0])), opts))
+                inflight[0] += 1
+
+    while stack:
+        readahead()
+        node, depth, ancestors, result = stack.pop()
+        inflight[0] -= 1
+        listing = _outcome(result.get(), opts)
+        if listing is None:
+            continue
+        dirs, files = listing
+        children = [[entry, depth + 1, below, None]
+                    for entry, below in _subdirs(dirs, depth, opts, ancestors)]
+        stack.extend(reversed(children))
+        readahead()
+        yield node, dirs, files
+
+def _nodepath(node):
+    """
+    Return the path of NODE, as _walk() yields it: TOP, or a DirEntry.
+
+    Return: str
+    Exceptions: None
+    """
+    if isinstance(node, six.string_types):
+        return node
+    return node.path
+
+def _walk(top, topdown=True, maxdepth=None, prune=None, followlinks=False,
+          onerror=None, scan=scandir, workers=None, ordered=False):
+    """
+    The guts of walk().
+
+    Rather than the path of each directory we yield the node we have
+    for it: TOP itself, or the DirEntry for a subdirectory, which is
+    also what PRUNE gets called with.
+
+    SCAN is the function we list directories with, which must return
+    entries in the manner of os.scandir()
+
+    Return: generator((str or DirEntry, [DirEntry], [DirEntry]))
+    Exceptions: ValueError
+    """
+    if workers is not None:
+        if workers < 1:
+            raise ValueError("Can't walk with {0} workers Larry... ".format(workers))
+        if not topdown:
+            raise ValueError("Can only walk in parallel top down Larry... ")
+    return _walker(top, topdown, maxdepth, prune, followlinks, onerror, scan,
+                   workers, ordered)
+
+def _walker(top, topdown, maxdepth, prune, followlinks, onerror, scan,
+            workers, ordered):
+    """
+    Generator behind _walk(), so that we raise before we are iterated.
+    """
+    if maxdepth is not None and maxdepth < 1:
+        return
+    ancestors = frozenset()
+    if followlinks:
+        try:
+            st = os.stat(str(top))
+        except OSError as err:
+            if onerror is not None:
+                onerror(err)
+            return
+        ancestors = frozenset([(st.st_dev, st.st_ino)])
+    opts = dict(topdown=topdown, maxdepth=maxdepth, prune=prune,
+                followlinks=followlinks, onerror=onerror, scan=scan)
+    if workers is None:
+        for triple in _descend(top, str(top), 1, opts, ancestors):
+            yield triple
+        return
+
+    # As for hashing._pmap(), a few directories per worker in flight
+    window = workers * 4
+    pool = ThreadPool(workers)
+    try:
+        if ordered:
+            triples = _pdescend_ordered(pool, window, top, opts, ancestors)
+        else:
+            triples = _pdescend_unordered(pool, window, top, opts, ancestors)
+        for triple in triples:
+            yield triple
+    finally:
+        pool.terminate()
+
+def walk(top, topdown=True, maxdepth=None, prune=None, followlinks=False,
+         onerror=None, workers=None, ordered=False):
+    """
+    Generate (DIRPATH, DIRS, FILES) for each directory in the tree
+    rooted at TOP, in the manner of os.walk().
+
+    Rather than names, DIRS and FILES are lists of the os.scandir()
+    DirEntry objects for the contents of DIRPATH, which know their own
+    type and cache their stat() results.
+
+    If TOPDOWN is truthy, each directory comes before its subdirectories,
+    and removing entries from DIRS stops us descending into them.
+    Otherwise each directory comes after its subdirectories.
+
+    MAXDEPTH limits how many levels we list: 1 lists TOP alone, 2 lists
+    TOP and its subdirectories, and so on.
+
+    PRUNE is called with the path of each directory before we read it.
+    If it returns a truthy value we skip that directory and everything
+    below it.
+
+    If FOLLOWLINKS is truthy we descend into symlinks to directories,
+    unless they lead back to a directory we are already inside.
+
+    Errors listing a directory are passed to ONERROR if we have one,
+    and that directory is skipped.
+
+    If WORKERS is given, directories are read by a pool of that many
+    threads, which pays off where listing latency dominates (NFS, FUSE).
+    Results still stream back as they are read, in whatever order that
+    turns out to be, unless ORDERED is truthy, in which case they come
+    in the same order as a sequential walk. Either way the workers only
+    read a few directories each ahead of us, so however big the tree,
+    we don't hold much of it in memory. Parallel walks are always
+    top down, PRUNE is called from the worker threads, and it is too
+    late to prune by removing entries from DIRS.
+
+    Arguments:
+    - `top`: str or Path
+    - `topdown`: bool
+    - `maxdepth`: int
+    - `prune`: callable
+    - `followlinks`: bool
+    - `onerror`: callable
+    - `workers`: int
+    - `ordered`: bool
+
+    Return: generator((str, [DirEntry], [DirEntry]))
+    Exceptions: ValueError
+    """
+    pruner = None
+    if prune is not None:
+        pruner = lambda node: prune(_nodepath(node))
+
+    triples = _walk(top, topdown=topdown, maxdepth=maxdepth, prune=pruner,
+                    followlinks=followlinks, onerror=onerror, workers=workers,
+                    ordered=ordered)
+    return ((_nodepath(node), dirs, files) for node, dirs, files in triples)
@@ -0,0 +1,158 @@
+"""
+Reporting on disk usage, in the manner of du(1)
+
+>>> report = usage.du('/srv/data', workers=16)
+>>> report.total, report.dirs['/srv/data/logs'], report.largest[:3]
+
+One walk of the tree gives us totals for every directory, totals by
+file extension, and the largest files.
+"""
+from __future__ import with_statement
+
+import collections
+import heapq
+import itertools
+import os
+import stat
+
+from ffs import tree
+from ffs._py3k import scandir
+
+# How many of the largest files we report by default
+TOP = 10
+
+class Usage(object):
+    """
+    The disk usage of the tree rooted at ROOT.
+
+    TOTAL is the bytes used by the whole tree, and FILES the number of
+    files (and symlinks) in it. DIRS is {path: bytes} for each directory,
+    counting everything below it, EXTENSIONS is {extension: bytes} for
+    the files, and LARGEST is [(bytes, path)] for the biggest files,
+    biggest first.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.total = 0
+        self.files = 0
+        self.dirs = {}
+        self.extensions = collections.defaultdict(int)
+        self.largest = []
+
+    def __repr__(self):
+        return '<Usage {0} {1} bytes>'.format(self.root, self.total)
+
+def _statscan(path):
+    """
+    List PATH as os.scandir() does, and lstat() each entry while we're
+    at it, so that the walk's worker threads do the stat()ing and the
+    entries have their results cached by the time we see them.
+
+    Return: [DirEntry]
+    Exceptions: OSError
+    """
+    entries = list(scandir(path))
+    for entry in entries:
+        try:
+            entry.stat(follow_symlinks=False)
+        except OSError:
+            pass
+    return entries
+
+def _bytes(st, apparent):
+    """
+    Return the bytes used by a file with the stat() result ST: the
+    space allocated to it, or if APPARENT, its size.
+
+    Return: int
+    Exceptions: None
+    """
+    if apparent:
+        return st.st_size
+    blocks = getattr(st, 'st_blocks', None)
+    if blocks is None: # Windows
+        return st.st_size
+    return blocks * 512
+
+def du(root, workers=None, apparent=False, top=TOP):
+    """
+    Return the Usage of the tree rooted at ROOT, in one walk.
+
+    Unless APPARENT is truthy we count the space files take up on disk
+    (st_blocks) rather than their sizes, so sparse files count for what
+    they use, and small files for the blocks they fill. Files with
+    several hard links are counted once, wherever we see them first.
+    Symlinks count for themselves, and aren't followed.
+
+    We read directories, and stat() what's in them, on a pool of
+    WORKERS threads. Directories we can't read are left out.
+
+    Arguments:
+    - `root`: str or Path
+    - `workers`: int
+    - `apparent`: bool
+    - `top`: int
+
+    Return: Usage
+    Exceptions: OSError, ValueError
+    """
+    root = os.path.normpath(str(root))
+    report = Usage(root)
+    st = os.lstat(root)
+    if not stat.S_ISDIR(st.st_mode):
+        report.total = _bytes(st, apparent)
+        report.files = 1
+        report.extensions[os.path.splitext(root)[1].lower()] = report.total
+        report.largest = [(report.total, root)][:top]
+        return report
+
+    own = {root: _bytes(st, apparent)}
+    extensions = report.extensions
+    largest = []
+    seen = set()
+    for node, dirs, files in tree._walk(root, workers=workers, scan=_statscan):
+        dirpath = getattr(node, 'path', node)
+        used = 0
+        links = []
+        for entry in dirs:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if entry.is_symlink():
+                links.append(entry)
+            else:
+                own[entry.path] = own.get(entry.path, 0) + _bytes(st, apparent)
+        for entry in itertools.chain(files, links):
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if st.st_nlink > 1:
+                inode = (st.st_dev, st.st_ino)
+                if inode in seen:
+                    continue
+                seen.add(inode)
+            size = _bytes(st, apparent)
+            used += size
+            report.files += 1
+            extensions[os.path.splitext(entry.name)[1].lower()] += size
+            if top:
+                if len(largest) < top:
+                    heapq.heappush(largest, (size, entry.path))
+                elif size > largest[0][0]:
+                    heapq.heapreplace(largest, (size, entry.path))
+        own[dirpath] = own.get(dirpath, 0) + used
+
+    # Roll each directory up into its parent, deepest first
+    totals = dict(own)
+    for path in sorted(own, key=lambda p: p.count(os.sep), reverse=True):
+        if path != root:
+            parent = os.path.dirname(path)
+            if parent in totals:
+                totals[parent] += totals[path]
+    report.dirs = totals
+    report.total = totals[root]
+    report.extensions = dict(extensions)
+    report.largest = sorted(largest, reverse=True)
+    return report
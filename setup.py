@@ -26,6 +26,8 @@ os.chdir(HERE)
 install_requires = ['six>=1.2.0']
 if sys.version_info < (2, 6):
     install_requires.append('smplejson')
+if sys.version_info < (3, 5):
+    install_requires.append('scandir')
 
 setup(
     name = "ffs",
@@ -0,0 +1,93 @@
+"""
+Unittests for the ffs.appender module
+"""
+from __future__ import with_statement
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import appender, nix
+
+class AppenderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tdir, 'events.log')
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def contents(self):
+        with open(self.fpath, 'rb') as fh:
+            return fh.read()
+
+    def test_append(self):
+        "Should append records"
+        with open(self.fpath, 'wb') as fh:
+            fh.write(b'zero\n')
+        with appender.Appender(self.fpath) as out:
+            out << 'one\n' << b'two\n'
+            out.write(u'caf\xe9\n')
+        self.assertEqual(u'zero\none\ntwo\ncaf\xe9\n'.encode('utf-8'), self.contents())
+
+    def test_buffers(self):
+        "Should only write when the buffer fills"
+        with appender.Appender(self.fpath, buffer_size=10) as out:
+            out << 'abcd'
+            self.assertEqual(b'', self.contents())
+            out << 'efghij'
+            self.assertEqual(b'abcdefghij', self.contents())
+            out << 'k'
+        self.assertEqual(b'abcdefghijk', self.contents())
+
+    def test_flush_interval(self):
+        "Should write when it has been a while"
+        with appender.Appender(self.fpath, flush_interval=0) as out:
+            out << 'abcd'
+            self.assertEqual(b'abcd', self.contents())
+
+    def test_batches(self):
+        "Should write more records than writev() takes at once"
+        with appender.Appender(self.fpath) as out:
+            for i in range(appender.IOV_MAX * 2 + 5):
+                out << '{0}\n'.format(i)
+        self.assertEqual(appender.IOV_MAX * 2 + 5, len(self.contents().splitlines()))
+
+    def test_short_writes(self):
+        "Should finish short writes"
+        if not hasattr(os, 'writev'):
+            return
+        with appender.Appender(self.fpath) as out:
+            out << 'abcd' << 'efgh'
+            with patch('os.writev', side_effect=lambda fd, bufs: os.write(fd, bufs[0][:3])):
+                out.flush()
+        self.assertEqual(b'abcdefgh', self.contents())
+
+    def test_opener(self):
+        "Should use a file-like object if asked"
+        with appender.Appender(self.fpath, opener=io.open) as out:
+            out << 'abcd'
+        self.assertEqual(b'abcd', self.contents())
+
+    def test_closed(self):
+        "Should raise"
+        out = appender.Appender(self.fpath)
+        out.close()
+        out.close()
+        with self.assertRaises(ValueError):
+            out << 'abcd'
+        with self.assertRaises(TypeError):
+            appender.Appender(self.fpath).write(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
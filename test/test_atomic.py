@@ -0,0 +1,143 @@
+"""
+Unittests for the ffs.atomic module
+"""
+from __future__ import with_statement
+
+import errno
+import os
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import atomic, nix
+
+class AtomicWriteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tdir, 'settings.json')
+        with open(self.fpath, 'w') as fh:
+            fh.write('old')
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def contents(self, path=None):
+        with open(path or self.fpath) as fh:
+            return fh.read()
+
+    def test_atomic_write(self):
+        "Should replace the file once we're done"
+        with patch('os.fsync', side_effect=os.fsync) as psync:
+            with atomic.atomic_write(self.fpath) as fh:
+                fh.write('new')
+                self.assertEqual('old', self.contents())
+            self.assertEqual(2, psync.call_count)
+        self.assertEqual('new', self.contents())
+        self.assertEqual(['settings.json'], os.listdir(self.tdir))
+
+    def test_atomic_write_new(self):
+        "Should create files, honouring the umask"
+        fpath = os.path.join(self.tdir, 'new.bin')
+        umask = os.umask(0o022)
+        try:
+            with atomic.atomic_write(fpath, 'wb') as fh:
+                fh.write(b'new')
+        finally:
+            os.umask(umask)
+        self.assertEqual(0o644, os.stat(fpath).st_mode & 0o777)
+
+    def test_atomic_write_keeps_permissions(self):
+        "Should keep the mode and owner of the file we replace"
+        os.chmod(self.fpath, 0o600)
+        with patch('os.fchown') as pchown:
+            with atomic.atomic_write(self.fpath) as fh:
+                fh.write('new')
+        st = os.stat(self.fpath)
+        self.assertEqual(0o600, st.st_mode & 0o777)
+        self.assertEqual(1, pchown.call_count)
+        self.assertEqual((st.st_uid, st.st_gid), pchown.call_args[0][1:])
+
+    def test_atomic_write_foreign_owner(self):
+        "Should keep going if we can't give the file away"
+        with patch('os.fchown', side_effect=OSError(errno.EPERM, 'nope')):
+            with atomic.atomic_write(self.fpath) as fh:
+                fh.write('new')
+        self.assertEqual('new', self.contents())
+
+    def test_atomic_write_raises(self):
+        "Should leave the file alone"
+        with self.assertRaises(ZeroDivisionError):
+            with atomic.atomic_write(self.fpath) as fh:
+                fh.write('new')
+                1 / 0
+        self.assertEqual('old', self.contents())
+        self.assertEqual(['settings.json'], os.listdir(self.tdir))
+
+    def test_atomic_write_mode(self):
+        "Should only write"
+        for mode in ['r', 'a', 'w+']:
+            with self.assertRaises(ValueError):
+                with atomic.atomic_write(self.fpath, mode):
+                    pass
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        for name in ['a', 'b']:
+            nix.mkdir_p(os.path.join(self.tdir, name))
+        self.paths = [os.path.join(self.tdir, name, str(i)) for name in 'ab' for i in range(5)]
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def test_batch(self):
+        "Should replace everything at the end, syncing each directory once"
+        with patch('ffs.atomic._fsync', side_effect=atomic._fsync) as psync:
+            with atomic.Batch(workers=3) as batch:
+                for path in self.paths:
+                    with batch.write(path) as fh:
+                        fh.write(path)
+                self.assertFalse(os.path.exists(self.paths[0]))
+            synced = sorted(c[0][0] for c in psync.call_args_list)
+        for path in self.paths:
+            with open(path) as fh:
+                self.assertEqual(path, fh.read())
+        self.assertEqual(12, len(synced))
+        self.assertEqual([os.path.join(self.tdir, 'a'), os.path.join(self.tdir, 'b')],
+                         [p for p in synced if os.path.isdir(p)])
+
+    def test_batch_raises(self):
+        "Should throw everything away"
+        with self.assertRaises(ZeroDivisionError):
+            with atomic.Batch() as batch:
+                with batch.write(self.paths[0]) as fh:
+                    fh.write('new')
+                1 / 0
+        self.assertEqual([], os.listdir(os.path.join(self.tdir, 'a')))
+
+    def test_batch_rename_fails(self):
+        "Should clean up whatever we didn't get to rename"
+        renames, real = [], os.rename
+        def rename(src, dst):
+            if renames:
+                raise OSError(errno.EXDEV, 'nope')
+            renames.append(dst)
+            real(src, dst)
+        with self.assertRaises(OSError):
+            with patch('os.rename', side_effect=rename):
+                with atomic.Batch() as batch:
+                    for path in self.paths[:3]:
+                        with batch.write(path) as fh:
+                            fh.write('new')
+        self.assertEqual(['0'], os.listdir(os.path.join(self.tdir, 'a')))
+
+
+if __name__ == '__main__':
+    unittest.main()
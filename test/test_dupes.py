@@ -0,0 +1,161 @@
+"""
+Unittests for the ffs.dupes module
+"""
+from __future__ import with_statement
+
+import os
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import dupes, hashing, nix
+
+class DuplicatesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.other = tempfile.mkdtemp()
+        nix.mkdir_p(os.path.join(self.tdir, 'sub'))
+        big = b'x' * 10000
+        self.contents = {
+            'a': b'same', 'sub/b': b'same', 'c': b'sAme',
+            'big1': big, 'sub/big2': big, 'big3': b'x' * 5000 + b'y' + b'x' * 4999,
+            'empty1': b'', 'empty2': b'',
+            }
+        for name, data in self.contents.items():
+            with open(os.path.join(self.tdir, name), 'wb') as fh:
+                fh.write(data)
+        with open(os.path.join(self.other, 'a'), 'wb') as fh:
+            fh.write(b'same')
+        os.link(os.path.join(self.tdir, 'c'), os.path.join(self.tdir, 'c.link'))
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+        nix.rm_r(self.other)
+
+    def rel(self, groups):
+        return [[os.path.relpath(p, self.tdir) for p in group] for group in groups]
+
+    def test_duplicates(self):
+        "Should group identical files, biggest first"
+        self.assertEqual([['big1', 'sub/big2'], ['a', 'sub/b']],
+                         self.rel(dupes.duplicates(self.tdir)))
+
+    def test_duplicates_staged(self):
+        "Should only hash whole files whose ends collide"
+        with patch('ffs.hashing._digestjob', side_effect=hashing._digestjob) as pjob:
+            list(dupes.duplicates(self.tdir, edge=100))
+            hashed = sorted(os.path.basename(c[0][0][0]) for c in pjob.call_args_list)
+        self.assertEqual(['big1', 'big2', 'big3'], hashed)
+
+    def test_duplicates_roots(self):
+        "Should look across roots"
+        groups = list(dupes.duplicates(self.tdir, self.other, workers=2))
+        self.assertIn(sorted([os.path.join(self.tdir, 'a'), os.path.join(self.tdir, 'sub', 'b'),
+                              os.path.join(self.other, 'a')]), groups)
+
+    def test_duplicates_min_size(self):
+        "Should be able to include empty files"
+        groups = self.rel(dupes.duplicates(self.tdir, min_size=0))
+        self.assertEqual(['empty1', 'empty2'], groups[-1])
+
+    def test_duplicates_link(self):
+        "Should replace duplicates with hard links"
+        list(dupes.duplicates(self.tdir, link='hardlink'))
+        first = os.stat(os.path.join(self.tdir, 'big1'))
+        second = os.stat(os.path.join(self.tdir, 'sub', 'big2'))
+        self.assertEqual(first.st_ino, second.st_ino)
+        self.assertEqual([], [n for n in os.listdir(self.tdir) if n.startswith('.')])
+        self.assertEqual([], list(dupes.duplicates(self.tdir)))
+
+    def test_duplicates_one_pool(self):
+        "Should hash every group on one pool"
+        with patch('ffs.dupes.ThreadPool', wraps=dupes.ThreadPool) as ppool:
+            groups = list(dupes.duplicates(self.tdir, edge=100, workers=2))
+            self.assertEqual(1, ppool.call_count)
+        self.assertEqual([['big1', 'sub/big2'], ['a', 'sub/b']], self.rel(groups))
+
+    def test_duplicates_link_fails(self):
+        "Should raise, or pass link errors to onerror and carry on"
+        with patch('os.link', side_effect=OSError(18, 'EXDEV')):
+            found = dupes.duplicates(self.tdir, link='hardlink')
+            with self.assertRaises(OSError):
+                next(found)
+            errors = []
+            groups = list(dupes.duplicates(self.tdir, link='hardlink', onerror=errors.append))
+        self.assertEqual([['big1', 'sub/big2'], ['a', 'sub/b']], self.rel(groups))
+        self.assertEqual([18, 18], [e.errno for e in errors])
+
+    def test_replace_nonsense(self):
+        "Should raise"
+        with self.assertRaises(ValueError):
+            dupes.duplicates(self.tdir, link='symlink')
+        with self.assertRaises(ValueError):
+            dupes.replace(['a', 'b'], 'symlink')
+
+    def test_replace_failure(self):
+        "Should leave the duplicate alone if we can't link"
+        group = [os.path.join(self.tdir, 'a'), os.path.join(self.tdir, 'sub', 'b')]
+        with patch('os.link', side_effect=OSError(18, 'EXDEV')):
+            with self.assertRaises(OSError):
+                dupes.replace(group)
+        self.assertEqual(['b', 'big2'], sorted(os.listdir(os.path.join(self.tdir, 'sub'))))
+
+    def test_replace_changed(self):
+        "Should leave files that changed since they were hashed"
+        group = [os.path.join(self.tdir, 'big1'), os.path.join(self.tdir, 'sub', 'big2')]
+        stats = dict((p, os.lstat(p)) for p in group)
+        with open(group[1], 'ab') as fh:
+            fh.write(b'more')
+        self.assertEqual([], dupes.replace(group, stats=stats))
+        self.assertNotEqual(os.stat(group[0]).st_ino, os.stat(group[1]).st_ino)
+        os.utime(group[0], (0, 0))
+        self.assertEqual([], dupes.replace(group, stats=stats))
+        self.assertEqual([group[1]], dupes.replace(group))
+
+    def test_replace_changed_during(self):
+        "Should check again before linking while finding duplicates"
+        real = hashing._digestjob
+        def digestjob(job):
+            if job[0].endswith('big2'):
+                os.utime(job[0], (0, 0))
+            return real(job)
+        with patch('ffs.hashing._digestjob', side_effect=digestjob):
+            groups = self.rel(dupes.duplicates(self.tdir, edge=100, link='hardlink'))
+        self.assertEqual(['big1', 'sub/big2'], groups[0])
+        self.assertNotEqual(os.stat(os.path.join(self.tdir, 'big1')).st_ino,
+                            os.stat(os.path.join(self.tdir, 'sub', 'big2')).st_ino)
+
+    def test_replace_mode(self):
+        "Should leave duplicates a link would change the mode of"
+        group = [os.path.join(self.tdir, 'a'), os.path.join(self.tdir, 'sub', 'b')]
+        os.chmod(group[1], 0o600)
+        self.assertEqual([], dupes.replace(group))
+        self.assertEqual(0o600, os.stat(group[1]).st_mode & 0o777)
+        os.chmod(group[0], 0o600)
+        self.assertEqual([group[1]], dupes.replace(group))
+        self.assertEqual(os.stat(group[0]).st_ino, os.stat(group[1]).st_ino)
+
+    def test_replace_owner(self):
+        "Should leave duplicates someone else owns"
+        group = [os.path.join(self.tdir, 'a'), os.path.join(self.tdir, 'sub', 'b')]
+        real = os.lstat
+        def lstat(path):
+            st = real(path)
+            if path != group[1]:
+                return st
+            fields = list(st)
+            fields[4] += 1
+            return os.stat_result(fields)
+        with patch('os.lstat', side_effect=lstat):
+            self.assertEqual([], dupes.replace(group))
+
+
+if __name__ == '__main__':
+    unittest.main()
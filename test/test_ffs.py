@@ -65,26 +65,27 @@ class BaseNTestCase(unittest.TestCase):
 
 class LsmtimeTestCase(unittest.TestCase):
 
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tdir, 'sub'))
+        for name, mtime in [('baz.txt', 123), ('caz.txt', 789), ('sub/daz.txt', 456),
+                            ('sub/eaz.txt', 100)]:
+            fpath = os.path.join(self.tdir, name)
+            open(fpath, 'w').close()
+            os.utime(fpath, (mtime, mtime))
+
+    def tearDown(self):
+        ffs.rm_r(self.tdir)
+
     def test_lessthan(self):
         "Files modified less than... "
-        mtimes = [456, 789, 123]
-        def mtimer(path):
-            return mtimes.pop()
-
-        def walker(self):
-            yield ['/foo/bar/', [], ['baz.txt', 'caz.txt', 'daz.txt']]
-
-        with patch.object(ffs.os, 'walk') as pwalk:
-            pwalk.side_effect = walker
-
-            with patch.object(ffs.os.path, 'getmtime') as ptime:
-                ptime.side_effect = mtimer
-
-                lessthan = ffs.lsmtime('/foo/bar', datetime.datetime(1970, 1, 1, 0, 3))
-
-                expected = ['/foo/bar/baz.txt']
+        lessthan = ffs.lsmtime(self.tdir, datetime.datetime(1970, 1, 1, 0, 3))
+        expected = [os.path.join(self.tdir, n) for n in ['baz.txt', 'sub/eaz.txt']]
+        self.assertEqual(expected, sorted(lessthan))
 
-                self.assertEqual(expected, lessthan)
+    def test_lessthan_none(self):
+        "All the files"
+        self.assertEqual(4, len(ffs.lsmtime(self.tdir)))
 
 class RmTestCase(unittest.TestCase):
 
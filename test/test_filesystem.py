@@ -4,6 +4,7 @@ Unittests for the ffs.filesystem module
 from __future__ import with_statement
 
 import getpass
+import mmap
 import os
 import sys
 import tempfile
@@ -39,6 +40,16 @@ class BaseFilesystemTestCase(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             self.fs.ls(None)
 
+    def test_lsentries(self):
+        "Lsentries raises"
+        with self.assertRaises(NotImplementedError):
+            self.fs.lsentries(None)
+
+    def test_iterentries(self):
+        "Iterentries raises"
+        with self.assertRaises(NotImplementedError):
+            self.fs.iterentries(None)
+
     def test_cd(self):
         "Cd raises"
         with self.assertRaises(NotImplementedError):
@@ -54,6 +65,11 @@ class BaseFilesystemTestCase(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             self.fs.open(None)
 
+    def test_mmap(self):
+        "Mmap raises"
+        with self.assertRaises(NotImplementedError):
+            self.fs.mmap(None)
+
     def test_is_branch(self):
         "Is_branch raises"
         with self.assertRaises(NotImplementedError):
@@ -124,6 +140,20 @@ class BaseFilesystemTestCase(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             self.fs.tempdir()
 
+    def test_snapshot(self):
+        "Ask the predicates, once each"
+        with patch.object(self.fs, 'exists', return_value=True) as pexists:
+            snap = self.fs.snapshot('/foo')
+            self.assertTrue(snap.exists)
+            self.assertTrue(snap.exists)
+            pexists.assert_called_once_with('/foo')
+
+    def test_instance(self):
+        "Stateful flavours get a new instance every time"
+        first = filesystem.BaseFilesystem.instance()
+        self.assertIsInstance(first, filesystem.BaseFilesystem)
+        self.assertIsNot(first, filesystem.BaseFilesystem.instance())
+
 
 class ReadOnlyFilesystemTestCase(unittest.TestCase):
     def setUp(self):
@@ -192,6 +222,35 @@ class DiskFilesystemTestCase(unittest.TestCase):
         "Should be os.sep"
         self.assertEqual(os.sep, self.fs.sep)
 
+    def test_stat(self):
+        "Stat a resource"
+        self.assertEqual(os.stat(self.tfile), self.fs.stat(self.tfile))
+
+    def test_snapshot(self):
+        "One stat answers every question"
+        cases = [
+            (self.tfile, (True, False, True)),
+            (self.tdir, (True, True, False)),
+            (tempfile.mktemp(), (False, False, False))
+            ]
+        for resource, expected in cases:
+            with patch('ffs.filesystem.os.stat', side_effect=os.stat) as pstat:
+                snap = self.fs.snapshot(resource)
+                self.assertEqual(expected, (snap.exists, snap.is_branch, snap.is_leaf))
+                pstat.assert_called_once_with(resource)
+
+    def test_instance(self):
+        "Stateless, so everyone shares one instance"
+        shared = filesystem.DiskFilesystem.instance()
+        self.assertIsInstance(shared, filesystem.DiskFilesystem)
+        self.assertIs(shared, filesystem.DiskFilesystem.instance())
+
+    def test_instance_subclass(self):
+        "Subclasses get their own shared instance"
+        class SubFilesystem(filesystem.DiskFilesystem):
+            pass
+        self.assertIsInstance(SubFilesystem.instance(), SubFilesystem)
+
     def test_getwd(self):
         "Should be the curdir"
         self.assertEqual(os.getcwd(), self.fs.getwd())
@@ -202,6 +261,18 @@ class DiskFilesystemTestCase(unittest.TestCase):
             self.assertEqual(['this.txt'], self.fs.ls('/foo'))
             pls.assert_called_with('/foo', all=None)
 
+    def test_lsentries(self):
+        "Should list entries"
+        with patch('ffs.filesystem.nix.lsentries', return_value=[]) as pls:
+            self.assertEqual([], self.fs.lsentries('/foo', sort='size'))
+            pls.assert_called_with('/foo', all=None, sort='size', reverse=None)
+
+    def test_iterentries(self):
+        "Should generate entries"
+        with patch('ffs.filesystem.nix.iterentries', return_value=iter([])) as pit:
+            self.assertEqual([], list(self.fs.iterentries('/foo', all=True)))
+            pit.assert_called_with('/foo', all=True)
+
     def test_cd(self):
         "Should change dir"
         with patch('ffs.filesystem.nix.cd') as pcd:
@@ -251,6 +322,27 @@ class DiskFilesystemTestCase(unittest.TestCase):
                 pe.assert_called_with(self.tfile)
 
 
+    def test_mmap(self):
+        "Should map the file"
+        with open(self.tfile, 'wb') as fh:
+            fh.write(b'Hello Beautiful')
+        mapping = self.fs.mmap(self.tfile)
+        self.assertEqual(b'Beautiful', mapping[6:])
+        with self.assertRaises(TypeError):
+            mapping[0:1] = b'J'
+        mapping.close()
+
+    def test_mmap_write(self):
+        "Should write through to the file"
+        with open(self.tfile, 'wb') as fh:
+            fh.write(b'Hello Beautiful')
+        mapping = self.fs.mmap(self.tfile, mmap.ACCESS_WRITE)
+        mapping[0:1] = b'J'
+        mapping.close()
+        with open(self.tfile, 'rb') as fh:
+            self.assertEqual(b'Jello Beautiful', fh.read())
+
+
     def test_expanduser(self):
         "Expand ~"
         if not sys.platform.startswith('win'):
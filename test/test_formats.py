@@ -3,6 +3,8 @@ Unittests for the ffs.formats module
 """
 import collections
 import csv
+import io
+import json
 import sys
 import tempfile
 import unittest
@@ -231,5 +233,107 @@ class CSVTestCase(unittest.TestCase):
             self.assertEqual('a', row.frist_thing)
             self.assertEqual('b', row.last_one)
 
+class JSONLTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tfile = tempfile.mktemp()
+        self.tjsonl = Path(self.tfile)
+
+    def tearDown(self):
+        if self.tjsonl:
+            self.tjsonl.rm()
+
+    def test_repr(self):
+        with self.tjsonl.jsonl() as jsonl:
+            self.assertEqual('<Unresolved JSONL {0}>'.format(self.tfile), repr(jsonl))
+
+    def test_iter(self):
+        "Skip blank lines"
+        self.tjsonl << '{"a": 1}\n\n[2]\n3'
+        with self.tjsonl.jsonl() as jsonl:
+            self.assertEqual([dict(a=1), [2], 3], list(jsonl))
+            self.assertEqual('reader', jsonl.resolved)
+
+    def test_iter_raises(self):
+        "Writers aren't iterable"
+        with self.tjsonl.jsonl() as jsonl:
+            jsonl.write(1)
+            with self.assertRaises(TypeError):
+                iter(jsonl)
+
+    def test_write_raises(self):
+        "Readers can't write"
+        self.tjsonl << '1'
+        with self.tjsonl.jsonl() as jsonl:
+            iter(jsonl)
+            with self.assertRaises(AttributeError):
+                jsonl.write(2)
+
+    def test_write_buffers(self):
+        "Records go out when we have enough of them"
+        with self.tjsonl.jsonl(buffer_size=8) as jsonl:
+            jsonl.write('a')
+            self.assertEqual([b'"a"\n'], jsonl._pending)
+            jsonl.write('bcdef')
+            self.assertEqual([], jsonl._pending)
+        self.assertEqual('"a"\n"bcdef"\n', self.tjsonl.contents)
+
+    def test_write_replaces(self):
+        "Unless we're appending"
+        self.tjsonl << '1\n'
+        with self.tjsonl.jsonl() as jsonl:
+            jsonl.write(2)
+        with self.tjsonl.jsonl(append=True) as jsonl:
+            jsonl.write(3)
+        self.assertEqual('2\n3\n', self.tjsonl.contents)
+
+class JsonIterTestCase(unittest.TestCase):
+    def elements(self, document, prefix='', buffer_size=4):
+        fh = io.BytesIO(document.encode('utf-8'))
+        return list(formats.json_iter(fh, prefix, buffer_size))
+
+    def test_array(self):
+        self.assertEqual([1, 'two', [3], dict(four=4)],
+                         self.elements(' [1, "two" ,[3],\n{"four": 4}] '))
+
+    def test_empty(self):
+        self.assertEqual([], self.elements('[ ]'))
+
+    def test_numbers_across_buffers(self):
+        "Don't stop a number at the end of a buffer"
+        numbers = list(range(10000, 10100))
+        self.assertEqual(numbers, self.elements(json.dumps(numbers), buffer_size=3))
+
+    def test_big_element(self):
+        "Elements many buffers long"
+        big = dict(text='x' * 10000)
+        self.assertEqual([big, big], self.elements(json.dumps([big, big]), buffer_size=5))
+
+    def test_multibyte(self):
+        "Characters split between buffers"
+        self.assertEqual([u'\u00e9\u00e9', u'\u4e2d'], self.elements(u'["\u00e9\u00e9", "\u4e2d"]', buffer_size=1))
+
+    def test_prefix(self):
+        document = '{"skip": {"results": [0]}, "data": {"n": 1, "results": [1, 2]}}'
+        self.assertEqual([1, 2], self.elements(document, 'data.results'))
+
+    def test_prefix_missing(self):
+        with self.assertRaises(ValueError):
+            self.elements('{"data": {}}', 'data.results')
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            self.elements('{"data": []}')
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            self.elements('[1, 2, {"a": ')
+
+    def test_lazy(self):
+        "Only read as much as we need"
+        fh = io.BytesIO(('[1, 2, ' + ' ' * 10000 + '3]').encode('ascii'))
+        elements = formats.json_iter(fh, buffer_size=16)
+        self.assertEqual(1, next(elements))
+        self.assertEqual(16, fh.tell())
+
 if __name__ == '__main__':
     unittest.main()
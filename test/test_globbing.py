@@ -0,0 +1,149 @@
+"""
+Unittests for the ffs.globbing module
+"""
+from __future__ import with_statement
+
+import os
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from ffs import globbing, nix
+from ffs._py3k import scandir
+
+class ExpandBracesTestCase(unittest.TestCase):
+
+    def test_expand(self):
+        "Should expand alternatives"
+        self.assertEqual(['a.py', 'a.pyx'], globbing.expand_braces('a.{py,pyx}'))
+
+    def test_expand_many(self):
+        "Should expand every group"
+        self.assertEqual(['a/x', 'a/y', 'b/x', 'b/y'],
+                         globbing.expand_braces('{a,b}/{x,y}'))
+
+    def test_expand_nested(self):
+        "Should expand nested groups"
+        self.assertEqual(['a', 'b1', 'b2'], globbing.expand_braces('{a,b{1,2}}'))
+
+    def test_expand_nothing(self):
+        "Should leave lone braces alone"
+        for pattern in ['plain', '{x}', 'open{', 'close}']:
+            self.assertEqual([pattern], globbing.expand_braces(pattern))
+
+class CompileTestCase(unittest.TestCase):
+
+    def test_compile(self):
+        "Should split into segments"
+        (segments, dironly), = globbing.compile('src/**/*.py')
+        self.assertEqual([globbing.LITERAL, globbing.RECURSE, globbing.WILD],
+                         [s[0] for s in segments])
+        self.assertFalse(dironly)
+
+    def test_compile_dironly(self):
+        "Trailing separators only match dirs"
+        (segments, dironly), = globbing.compile('src/')
+        self.assertTrue(dironly)
+
+    def test_compile_absolute(self):
+        "Should raise"
+        with self.assertRaises(ValueError):
+            globbing.compile('/etc/*')
+
+class GlobTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        for d in ['src/ffs/contrib', 'src/.git', 'test', 'build']:
+            nix.mkdir_p(os.path.join(self.tdir, d))
+        for f in ['setup.py', 'README.rst', 'src/.hidden.py', 'src/ffs/path.py',
+                  'src/ffs/speedups.pyx', 'src/ffs/contrib/http.py',
+                  'src/.git/config.py', 'test/test_path.py', 'build/junk.o']:
+            nix.touch(os.path.join(self.tdir, f))
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def glob(self, *patterns, **kwargs):
+        return sorted(os.path.relpath(p, self.tdir)
+                      for p, e in globbing.glob(self.tdir, *patterns, **kwargs))
+
+    def test_glob(self):
+        "Should match one directory"
+        self.assertEqual(['setup.py'], self.glob('*.py'))
+
+    def test_glob_segments(self):
+        "Should match segment by segment"
+        self.assertEqual(['src/ffs/path.py', 'test/test_path.py'],
+                         self.glob('*/*/*.py', '*/*.py'))
+
+    def test_glob_recurse(self):
+        "** matches any number of directories"
+        self.assertEqual(['setup.py', 'src/ffs/contrib/http.py', 'src/ffs/path.py',
+                          'test/test_path.py'], self.glob('**/*.py'))
+        self.assertEqual(['src/ffs/contrib/http.py', 'src/ffs/path.py'],
+                         self.glob('src/**/*.py'))
+
+    def test_glob_recurse_everything(self):
+        "A trailing ** matches the directory and everything below"
+        self.assertEqual(['src/ffs', 'src/ffs/contrib', 'src/ffs/contrib/http.py',
+                          'src/ffs/path.py', 'src/ffs/speedups.pyx'],
+                         self.glob('src/ffs/**'))
+
+    def test_glob_hidden(self):
+        "Wildcards don't match dotfiles unless asked to"
+        self.assertNotIn('src/.hidden.py', self.glob('src/*.py'))
+        self.assertEqual(['src/.hidden.py'], self.glob('src/.*.py'))
+        self.assertEqual(['src/.git/config.py'], self.glob('src/.git/*'))
+
+    def test_glob_braces(self):
+        "Should expand alternatives"
+        self.assertEqual(['src/ffs/path.py', 'src/ffs/speedups.pyx'],
+                         self.glob('src/ffs/*.{py,pyx}'))
+
+    def test_glob_once(self):
+        "Should only generate each path once"
+        self.assertEqual(['setup.py'], self.glob('*.py', 'setup.*', 'setup.py'))
+
+    def test_glob_dironly(self):
+        "Trailing separators only match dirs"
+        self.assertEqual(['build', 'src', 'test'], self.glob('*/'))
+
+    def test_glob_literal_stat(self):
+        "Literal segments shouldn't be listed"
+        listed = []
+
+        def scan(path):
+            listed.append(os.path.relpath(path, self.tdir))
+            return scandir(path)
+
+        self.assertEqual(['src/ffs/path.py'], self.glob('src/ffs/path.py', scan=scan))
+        self.assertEqual([], listed)
+        self.assertEqual([], self.glob('src/nonexistent/path.py', scan=scan))
+        self.assertEqual([], listed)
+        self.assertEqual(['src/ffs/path.py'], self.glob('src/ffs/p*.py', scan=scan))
+        self.assertEqual(['src/ffs'], listed)
+
+    def test_glob_pruned(self):
+        "Should only list directories that could match"
+        listed = []
+
+        def scan(path):
+            listed.append(os.path.relpath(path, self.tdir))
+            return scandir(path)
+
+        self.glob('*/ffs/*.py', scan=scan)
+        self.assertEqual(['.', 'src/ffs'], sorted(listed))
+
+    def test_glob_entries(self):
+        "Listed matches come with their entries"
+        for path, entry in globbing.glob(self.tdir, 'src/*/*.py'):
+            self.assertEqual(path, os.path.join(self.tdir, 'src/ffs', entry.name))
+
+
+if __name__ == '__main__':
+    unittest.main()
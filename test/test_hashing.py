@@ -0,0 +1,206 @@
+"""
+Unittests for the ffs.hashing module
+"""
+from __future__ import with_statement
+
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import MagicMock, patch
+
+from ffs import hashing, nix
+
+CONTENTS = b'Hello Beautiful\n' * 1000
+
+class HashfileTestCase(unittest.TestCase):
+
+    def test_hashfile(self):
+        "Should hash in chunks"
+        for size in [1, 7, 16, 1 << 20]:
+            digest = hashing.hashfile(io.BytesIO(CONTENTS), buffer_size=size)
+            self.assertEqual(hashlib.md5(CONTENTS).hexdigest(), digest)
+
+    def test_hashfile_algorithm(self):
+        "Should use any hashlib algorithm"
+        digest = hashing.hashfile(io.BytesIO(CONTENTS), 'sha256')
+        self.assertEqual(hashlib.sha256(CONTENTS).hexdigest(), digest)
+        with self.assertRaises(ValueError):
+            hashing.hashfile(io.BytesIO(CONTENTS), 'nonsense')
+
+    def test_hashfile_read(self):
+        "Should cope without readinto"
+        class Reader(object):
+            def __init__(self):
+                self.fh = io.BytesIO(CONTENTS)
+
+            def read(self, size):
+                return self.fh.read(size)
+
+        digest = hashing.hashfile(Reader(), 'sha1', buffer_size=100)
+        self.assertEqual(hashlib.sha1(CONTENTS).hexdigest(), digest)
+
+class DigestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tdir, 'artefact.bin')
+        with open(self.fpath, 'wb') as fh:
+            fh.write(CONTENTS)
+        self.dbpath = os.path.join(self.tdir, 'digests.db')
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def test_digest(self):
+        "Should hash the file"
+        self.assertEqual(hashlib.md5(CONTENTS).hexdigest(), hashing.digest(self.fpath))
+
+    def test_digest_cached(self):
+        "Unchanged files shouldn't be read again"
+        cache = hashing.DigestCache(self.dbpath)
+        expected = hashlib.sha256(CONTENTS).hexdigest()
+        self.assertEqual(expected, hashing.digest(self.fpath, 'sha256', cache=cache))
+        with patch('ffs.hashing.hashfile') as phash:
+            self.assertEqual(expected, hashing.digest(self.fpath, 'sha256', cache=cache))
+            self.assertEqual(0, phash.call_count)
+
+    def test_digest_cache_algorithms(self):
+        "Should keep algorithms apart"
+        cache = hashing.DigestCache(self.dbpath)
+        hashing.digest(self.fpath, 'md5', cache=cache)
+        self.assertEqual(hashlib.sha1(CONTENTS).hexdigest(),
+                         hashing.digest(self.fpath, 'sha1', cache=cache))
+
+    def test_digest_cache_changed(self):
+        "Changed files should be hashed again"
+        cache = hashing.DigestCache(self.dbpath)
+        hashing.digest(self.fpath, cache=cache)
+        with open(self.fpath, 'ab') as fh:
+            fh.write(b'More')
+        self.assertEqual(hashlib.md5(CONTENTS + b'More').hexdigest(),
+                         hashing.digest(self.fpath, cache=cache))
+
+    def test_digest_cache_persists(self):
+        "Should keep digests between runs"
+        hashing.digest(self.fpath, cache=self.dbpath)
+        cache = hashing.DigestCache(self.dbpath)
+        self.assertEqual(hashlib.md5(CONTENTS).hexdigest(),
+                         cache.get(os.stat(self.fpath), 'md5'))
+        cache.close()
+
+    def test_digest_cache_batches(self):
+        "Should commit every COMMIT_EVERY digests, and on close"
+        with patch.object(hashing, 'COMMIT_EVERY', 2):
+            with hashing.DigestCache(self.dbpath) as cache:
+                for ino in range(3):
+                    st = MagicMock(st_dev=1, st_ino=ino, st_size=10, st_mtime_ns=1)
+                    cache.put(st, 'md5', str(ino))
+                other = hashing.DigestCache(self.dbpath)
+                self.assertEqual(2, other._db.execute("SELECT COUNT(*) FROM digests").fetchone()[0])
+            self.assertEqual(3, other._db.execute("SELECT COUNT(*) FROM digests").fetchone()[0])
+            other.close()
+
+    def test_digest_cache_path_shared(self):
+        "Should keep one connection per database path"
+        with patch('sqlite3.connect', wraps=sqlite3.connect) as pconnect:
+            for _ in range(3):
+                hashing.digest(self.fpath, cache=self.dbpath)
+            self.assertEqual(1, pconnect.call_count)
+            os.unlink(self.dbpath)
+            hashing.digest(self.fpath, cache=self.dbpath)
+            self.assertEqual(2, pconnect.call_count)
+        cache = hashing.DigestCache(self.dbpath)
+        self.assertEqual(hashlib.md5(CONTENTS).hexdigest(),
+                         cache.get(os.stat(self.fpath), 'md5'))
+        cache.close()
+
+    def test_digest_cache_path_replaced(self):
+        "Should close a replaced database once nobody is using it"
+        hashing.digest(self.fpath, cache=self.dbpath)
+        old = hashing._sharedcache(self.dbpath)
+        os.unlink(self.dbpath)
+        hashing.digest(self.fpath, cache=self.dbpath)
+        self.assertIn(old, hashing._retired)
+        with patch.object(old, 'close', wraps=old.close) as pclose:
+            hashing._release(old)
+            self.assertEqual(1, pclose.call_count)
+        self.assertNotIn(old, hashing._retired)
+        self.assertNotIn(old, hashing._users)
+        os.unlink(self.dbpath)
+        hashing.digest(self.fpath, cache=self.dbpath)
+        current = hashing._sharedcache(self.dbpath)
+        hashing._release(current)
+        with patch.object(current, 'close', wraps=current.close) as pclose:
+            hashing._closeshared()
+            self.assertEqual(1, pclose.call_count)
+
+class ManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        nix.mkdir_p(os.path.join(self.tdir, 'lib', 'sub'))
+        self.contents = {'b.txt': b'bee', 'a.txt': b'ay', 'lib/c.so': b'sea',
+                         'lib/sub/d': b'', 'odd\\name\nhere': b'odd'}
+        for name, data in self.contents.items():
+            with open(os.path.join(self.tdir, name), 'wb') as fh:
+                fh.write(data)
+        os.symlink('a.txt', os.path.join(self.tdir, 'link'))
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def test_manifest(self):
+        "Should write sha256sum lines, sorted"
+        lines = list(hashing.manifest(self.tdir))
+        self.assertEqual(5, len(lines))
+        self.assertEqual(hashlib.sha256(b'ay').hexdigest() + '  a.txt\n', lines[0])
+        self.assertEqual('\\' + hashlib.sha256(b'odd').hexdigest() +
+                         '  odd\\\\name\\nhere\n', lines[2])
+        self.assertEqual(hashlib.sha256(b'sea').hexdigest() + '  lib/c.so\n', lines[3])
+
+    def test_manifest_workers(self):
+        "Should come out the same in parallel"
+        expected = list(hashing.manifest(self.tdir, 'md5'))
+        self.assertEqual(expected, list(hashing.manifest(self.tdir, 'md5', workers=3)))
+        self.assertEqual(expected, list(hashing.manifest(self.tdir, 'md5', workers=2,
+                                                         processes=True)))
+
+    def test_manifest_unreadable(self):
+        "Should raise rather than leave a directory out"
+        locked = os.path.join(self.tdir, 'lib', 'sub')
+        os.chmod(locked, 0)
+        try:
+            if os.access(locked, os.R_OK):
+                self.skipTest("We can read a 000 directory (root?)")
+            with self.assertRaises(OSError):
+                list(hashing.manifest(self.tdir))
+        finally:
+            os.chmod(locked, 0o755)
+
+    def test_verify(self):
+        "Should check a tree against its manifest"
+        lines = list(hashing.manifest(self.tdir))
+        with open(os.path.join(self.tdir, 'b.txt'), 'wb') as fh:
+            fh.write(b'wasp')
+        os.unlink(os.path.join(self.tdir, 'lib', 'c.so'))
+        for workers in [None, 3]:
+            results = dict(hashing.verify(self.tdir, lines, workers=workers))
+            self.assertEqual({'a.txt': 'OK', 'b.txt': 'FAILED', 'lib/c.so': 'MISSING',
+                              'lib/sub/d': 'OK', 'odd\\name\nhere': 'OK'}, results)
+
+    def test_verify_nonsense(self):
+        "Should raise"
+        with self.assertRaises(ValueError):
+            list(hashing.verify(self.tdir, ['nonsense\n']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Unittests for the ffs.lineindex module
+"""
+from __future__ import with_statement
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import lineindex, nix
+
+class IndexTestCase(unittest.TestCase):
+    data = b'one\ntwo\n\nthree is longer\nfour'
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tdir, 'data.txt')
+        with open(self.fpath, 'wb') as fh:
+            fh.write(self.data)
+        lineindex._memo.clear()
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+        lineindex._memo.clear()
+
+    def lines(self, index, data):
+        return [data[slice(*index.span(n))] for n in range(len(index))]
+
+    def test_build(self):
+        "Should find every line from any block size"
+        for data in [self.data, self.data + b'\n', b'\n', b'']:
+            expected = io.BytesIO(data).readlines()
+            with open(self.fpath, 'wb') as fh:
+                fh.write(data)
+            for size in [1, 3, 100]:
+                fh = io.BytesIO(data)
+                index = lineindex.build(fh, os.stat(self.fpath), size)
+                self.assertEqual(len(expected), len(index))
+                self.assertEqual(expected, self.lines(index, data))
+
+    def test_span(self):
+        "Should count back from the end, and raise past it"
+        index = lineindex.get(self.fpath)
+        self.assertEqual((25, 29), index.span(-1))
+        with self.assertRaises(IndexError):
+            index.span(5)
+        with self.assertRaises(IndexError):
+            index.span(-6)
+
+    def test_dump_load(self):
+        "Should round trip"
+        index = lineindex.get(self.fpath)
+        fh = io.BytesIO()
+        lineindex.dump(index, fh)
+        fh.seek(0)
+        loaded = lineindex.load(fh)
+        self.assertEqual(list(index.offsets), list(loaded.offsets))
+        self.assertEqual((index.size, index.mtime_ns, index.fingerprint),
+                         (loaded.size, loaded.mtime_ns, loaded.fingerprint))
+        self.assertEqual(None, lineindex.load(io.BytesIO(b'nonsense')))
+        self.assertEqual(None, lineindex.load(io.BytesIO(fh.getvalue()[:-1])))
+
+    def test_get_remembers(self):
+        "Shouldn't index an unchanged file twice"
+        first = lineindex.get(self.fpath)
+        with patch('ffs.lineindex.build') as pbuild:
+            self.assertIs(first, lineindex.get(self.fpath))
+            self.assertFalse(pbuild.called)
+
+    def test_get_unlocked(self):
+        "Shouldn't hold up the memo while we index or write sidecars"
+        held = []
+        def opener(path, mode):
+            free = lineindex._lock.acquire(False)
+            if free:
+                lineindex._lock.release()
+            held.append(not free)
+            return open(path, mode)
+        lineindex.get(self.fpath, persist=True, opener=opener)
+        self.assertEqual([False, False, False], held)
+
+    def test_persist(self):
+        "Should keep the index in a sidecar"
+        lineindex.get(self.fpath, persist=True)
+        sidecar = os.path.join(self.tdir, '.data.txt.lineindex')
+        self.assertTrue(os.path.exists(sidecar))
+        lineindex._memo.clear()
+        with patch('ffs.lineindex.build') as pbuild:
+            self.assertEqual(5, len(lineindex.get(self.fpath)))
+            self.assertFalse(pbuild.called)
+
+    def test_append(self):
+        "Should only index what has been appended"
+        index = lineindex.get(self.fpath, persist=True)
+        with open(self.fpath, 'ab') as fh:
+            fh.write(b' and more\nfive\n')
+        os.utime(self.fpath, (1, 1))
+        lineindex._memo.clear()
+        with patch('ffs.lineindex.build') as pbuild:
+            index = lineindex.get(self.fpath)
+            self.assertFalse(pbuild.called)
+        with open(self.fpath, 'rb') as fh:
+            data = fh.read()
+        self.assertEqual(io.BytesIO(data).readlines(), self.lines(index, data))
+
+    def test_append_leaves_old_index(self):
+        "Should leave indexes we handed out before an append as they were"
+        old = lineindex.get(self.fpath)
+        count, size, offsets = len(old), old.size, list(old.offsets)
+        with open(self.fpath, 'ab') as fh:
+            fh.write(b' and more\nfive\n')
+        os.utime(self.fpath, (1, 1))
+        new = lineindex.get(self.fpath)
+        self.assertEqual(count + 1, len(new))
+        self.assertEqual((count, size, offsets), (len(old), old.size, list(old.offsets)))
+
+    def test_rewrite(self):
+        "Should start again when the file has been rewritten"
+        lineindex.get(self.fpath)
+        with open(self.fpath, 'wb') as fh:
+            fh.write(b'ONE\nTWO\nthree\nfour\nfive\nsix\n')
+        os.utime(self.fpath, (1, 1))
+        index = lineindex.get(self.fpath)
+        self.assertEqual(6, len(index))
+        self.assertEqual((8, 14), index.span(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
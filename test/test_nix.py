@@ -225,6 +225,54 @@ class HeadTestCase(unittest.TestCase):
         frist = nix.head(Path(self.tname))
         self.assertEqual(expected, frist)
 
+    def test_bytes(self):
+        "Should read the frist bytes"
+        self.assertEqual(b'0\n1\n', nix.head(self.tname, nbytes=4))
+
+    def test_stops_reading(self):
+        "Shouldn't read the whole file"
+        with patch('ffs.nix.open', create=True) as po:
+            fh = po.return_value.__enter__.return_value
+            fh.__iter__.return_value = iter(['a\n'] * 100)
+            nix.head(self.tname, lines=2)
+            self.assertFalse(fh.readlines.called)
+            self.assertFalse(fh.read.called)
+
+class TailTestCase(unittest.TestCase):
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(delete=False) as tf:
+            self.tname = tf.name
+            tf.write(bytearray(
+                    "\n".join([str(x) for x in range(100)]) + "\n",
+                    'utf-8'))
+
+    def tearDown(self):
+        os.remove(self.tname)
+
+    def test_get_lines(self):
+        "Should get the last lines"
+        expected = "".join(["{0}\n".format(x) for x in range(90, 100)])
+        self.assertEqual(expected, nix.tail(self.tname))
+        self.assertEqual("97\n98\n99\n", nix.tail(Path(self.tname), lines=3))
+        self.assertEqual("", nix.tail(self.tname, lines=0))
+
+    def test_more_than_there_are(self):
+        "Should get the whole file"
+        with open(self.tname) as fh:
+            self.assertEqual(fh.read(), nix.tail(self.tname, lines=1000))
+
+    def test_no_trailing_newline(self):
+        "The last line needn't end in a newline"
+        with open(self.tname, 'ab') as fh:
+            fh.write(b'last')
+        self.assertEqual("99\nlast", nix.tail(self.tname, lines=2))
+
+    def test_bytes(self):
+        "Should read the last bytes"
+        self.assertEqual(b'99\n', nix.tail(self.tname, nbytes=3))
+        self.assertEqual(290, len(nix.tail(self.tname, nbytes=1000)))
+
 class LnTestCase(unittest.TestCase):
     def setUp(self):
         self.tdir = tempfile.mkdtemp()
@@ -338,6 +386,50 @@ class LsTestCase(unittest.TestCase):
         contents.sort()
         self.assertEqual(['.', '..', 'bar.txt', 'foo.txt'], contents)
 
+    def test_ls_sort(self):
+        "Should sort by name"
+        self.assertEqual(['bar.txt', 'foo.txt'], nix.ls(self.tdir, sort='name'))
+        self.assertEqual(['foo.txt', 'bar.txt'],
+                         nix.ls(self.tdir, sort='name', reverse=True))
+
+    def test_ls_sort_size(self):
+        "Should sort biggest first"
+        with open(self.tdir + '/foo.txt', 'w') as fh:
+            fh.write('Hello Beautiful')
+        self.assertEqual(['foo.txt', 'bar.txt'], nix.ls(self.tdir, sort='size'))
+
+    def test_ls_sort_time(self):
+        "Should sort newest first"
+        os.utime(self.tdir + '/bar.txt', (1000, 1000))
+        os.utime(self.tdir + '/foo.txt', (2000, 2000))
+        self.assertEqual(['foo.txt', 'bar.txt'], nix.ls(self.tdir, sort='time'))
+
+    def test_ls_sort_extension(self):
+        "Should sort by extension then name"
+        nix.touch(Path(self.tdir) + 'baz.csv')
+        self.assertEqual(['baz.csv', 'bar.txt', 'foo.txt'],
+                         nix.ls(self.tdir, sort='extension'))
+
+    def test_ls_sort_unknown(self):
+        "Should raise"
+        with self.assertRaises(ValueError):
+            nix.ls(self.tdir, sort='colour')
+
+    def test_iterentries(self):
+        "Should generate entries, filtered as for ls"
+        nix.touch(Path(self.tdir) + '.dotrc')
+        entries = nix.iterentries(self.tdir)
+        self.assertEqual(['bar.txt', 'foo.txt'], sorted(e.name for e in entries))
+        entries = nix.iterentries(self.tdir, all=True)
+        self.assertEqual(3, len(list(entries)))
+
+    def test_lsentries(self):
+        "Should return entries"
+        nix.mkdir(Path(self.tdir) + 'baz')
+        entries = nix.lsentries(self.tdir, sort='name')
+        self.assertEqual(['bar.txt', 'baz', 'foo.txt'], [e.name for e in entries])
+        self.assertEqual([False, True, False], [e.is_dir() for e in entries])
+
 class MkdirTestCase(unittest.TestCase):
     def setUp(self):
         self.nodir = tempfile.mkdtemp()
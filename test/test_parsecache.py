@@ -0,0 +1,90 @@
+"""
+Unittests for the ffs.parsecache module
+"""
+from __future__ import with_statement
+
+import sys
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import MagicMock
+
+from ffs import parsecache
+
+def stat(size=10, mtime_ns=1, ino=1):
+    return MagicMock(st_dev=1, st_ino=ino, st_size=size, st_mtime_ns=mtime_ns)
+
+class ParseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = parsecache.ParseCache(max_entries=3, max_bytes=100)
+
+    def test_hit(self):
+        "Parse once while the file is unchanged"
+        load = MagicMock(return_value='parsed')
+        self.assertEqual('parsed', self.cache.get('a', stat(), 'json', load))
+        self.assertEqual('parsed', self.cache.get('a', stat(), 'json', load))
+        self.assertEqual(1, load.call_count)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_changed(self):
+        "Parse again when the size, mtime or inode changes"
+        load = MagicMock(return_value='parsed')
+        for st in [stat(), stat(size=11), stat(size=11, mtime_ns=2), stat(size=11, mtime_ns=2, ino=2)]:
+            self.cache.get('a', st, 'json', load)
+        self.assertEqual(4, load.call_count)
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(11, self.cache.nbytes)
+
+    def test_loaders(self):
+        "Each loader gets its own entry"
+        self.cache.get('a', stat(), 'json', lambda: 1)
+        self.assertEqual(2, self.cache.get('a', stat(), 'csv', lambda: 2))
+        self.assertEqual(0, self.cache.hits)
+
+    def test_max_entries(self):
+        "Evict the least recently used"
+        for name in 'abc':
+            self.cache.get(name, stat(), 'json', lambda: name)
+        self.cache.get('a', stat(), 'json', None)
+        self.cache.get('d', stat(), 'json', lambda: 'd')
+        self.assertEqual([('a', 'json'), ('c', 'json'), ('d', 'json')],
+                         sorted(self.cache._entries))
+        self.assertEqual(30, self.cache.nbytes)
+
+    def test_max_bytes(self):
+        "Evict until we're under MAX_BYTES"
+        self.cache.get('a', stat(size=60), 'json', lambda: 'a')
+        self.cache.get('b', stat(size=60), 'json', lambda: 'b')
+        self.assertEqual([('b', 'json')], list(self.cache._entries))
+        self.assertEqual(60, self.cache.nbytes)
+
+    def test_too_big(self):
+        "Never cache files bigger than MAX_BYTES"
+        self.assertEqual('big', self.cache.get('a', stat(size=101), 'json', lambda: 'big'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_raises(self):
+        "Nothing is cached when parsing fails"
+        load = MagicMock(side_effect=ValueError)
+        with self.assertRaises(ValueError):
+            self.cache.get('a', stat(), 'json', load)
+        self.assertEqual(0, len(self.cache))
+
+    def test_clear(self):
+        self.cache.get('a', stat(), 'json', lambda: 1)
+        self.cache.clear()
+        self.assertEqual((0, 0, 0, 0), (len(self.cache), self.cache.hits,
+                                        self.cache.misses, self.cache.nbytes))
+
+    def test_resolve(self):
+        self.assertIs(parsecache.default, parsecache.resolve(True))
+        self.assertEqual(None, parsecache.resolve(False))
+        self.assertEqual(None, parsecache.resolve(None))
+        self.assertIs(self.cache, parsecache.resolve(self.cache))
+
+if __name__ == '__main__':
+    unittest.main()
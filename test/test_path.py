@@ -5,12 +5,16 @@ from __future__ import with_statement
 
 import filecmp
 import getpass
+import hashlib
 import itertools
 try:
     import json
 except ImportError:
     import simplejson as json
+import copy
+import mmap
 import os
+import pickle
 import sys
 import tempfile
 import unittest
@@ -20,9 +24,10 @@ if sys.version_info <  (2, 7):
 if sys.version.startswith('3.1'):
     from ffs import _unittest31 as unittest
 
+from mock import patch
 import six
 
-from ffs import exceptions, path, _path_blacklists
+from ffs import exceptions, hashing, nix, parsecache, path, _path_blacklists
 from ffs.contrib import http
 from ffs.path import Path, Pset
 from ffs.nix import touch, rm, rm_r, rmdir
@@ -47,6 +52,30 @@ class PsetTestCase(unittest.TestCase):
         for bname in ['bar.py', 'buzz.txt']:
             self.assertIn(bname, pset.basenames)
 
+    def test_containing(self):
+        "Filter to the paths containing an item"
+        pset = Pset([Path('/src/node_modules/x.js'), Path('/src/lib/y.js'),
+                     Path('node_modules')])
+        self.assertEqual(Pset([Path('/src/node_modules/x.js'), Path('node_modules')]),
+                         pset.containing('node_modules'))
+        self.assertEqual(Pset([Path('/src/lib/y.js')]), pset.containing('/src/lib'))
+        self.assertEqual(Pset(), Pset().containing('node_modules'))
+        self.assertIsInstance(pset.containing('src'), Pset)
+
+    def test_mimetypes(self):
+        "Sniff a collection of paths"
+        tdir = Path.newdir()
+        try:
+            png, csv = tdir/'upload', tdir/'wat.csv'
+            with png.open('wb') as fh:
+                fh.write(b'\x89PNG\r\n\x1a\n')
+            csv << 'a,b,c'
+            self.assertEqual({png: 'image/png', csv: 'text/csv', tdir: None},
+                             Pset([png, csv, tdir]).mimetypes(workers=2))
+            self.assertEqual({}, Pset().mimetypes())
+        finally:
+            rm_r(tdir)
+
 
 class BasePathTestCase(unittest.TestCase):
     def setUp(self):
@@ -126,6 +155,12 @@ class MagicMethodsTestCase(PathTestCase):
         self.assertEqual(Path('/foo/bar'), Path('/foo/bar'))
         self.assertNotEqual('/foo/bar/baz', Path('/foo/bar'))
 
+    def test_shared_filesystem(self):
+        "Paths share their (stateless) filesystem"
+        p = Path('/foo')
+        self.assertIs(p.fs, Path('/bar').fs)
+        self.assertIs(p.fs, (p + 'bar').fs)
+
     def test_hash(self):
         "Hashing should equate to the _value"
         p = Path('/foo')
@@ -184,13 +219,32 @@ class MagicMethodsTestCase(PathTestCase):
             self.assertEqual(expected, branch)
 
     def test_iter_dir(self):
-        "Iterate through lines in a file"
+        "Iterate through the contents of a dir"
         p = Path(self.tdir)
         touch(p + 'foo.txt')
         touch(p + 'bar.txt')
-        i = ['foo.txt', 'bar.txt']
-        for branch in p:
+        i = [p + 'foo.txt', p + 'bar.txt']
+        contents = list(p)
+        self.assertEqual(2, len(contents))
+        for branch in contents:
+            self.assertIsInstance(branch, Path)
             self.assertIn(branch, i)
+            self.assertTrue(branch.is_file)
+
+    def test_iter_dir_streams(self):
+        "Should yield entries before the whole dir is read"
+        p = Path(self.tdir)
+
+        class Entry(object):
+            name = 'foo.txt'
+
+        def entries(path):
+            yield Entry()
+            raise AssertionError("Shouldn't read this far")
+
+        with patch('ffs.nix.scandir', side_effect=entries):
+            first = next(iter(p))
+        self.assertEqual(p + 'foo.txt', first)
 
     def test_iter_raises(self):
         "Iterate through lines in a file"
@@ -213,6 +267,25 @@ class MagicMethodsTestCase(PathTestCase):
         rp = Path('my/rel/file.txt')
         self.assertTrue('my/rel' in rp)
 
+    def test_contains_components(self):
+        "Only whole components match"
+        p = Path('/foo/bar/baz.txt')
+        self.assertTrue('bar/baz.txt' in p)
+        self.assertTrue('bar/' in p)
+        self.assertTrue('/' in p)
+        self.assertFalse('fo' in p)
+        self.assertFalse('bar/baz' in p)
+        self.assertFalse('/foo' in Path('foo/bar'))
+        self.assertTrue('a/b' in Path('a/x/a/b/c'))
+
+    def test_contains_metacharacters(self):
+        "Items are literal, not regular expressions"
+        p = Path('/srv/c++/[x].txt')
+        self.assertTrue('c++' in p)
+        self.assertTrue('[x].txt' in p)
+        self.assertFalse('.*' in p)
+        self.assertFalse('x' in p)
+
     def test_add_paths(self):
         "Add two Path objects"
         p = Path('/foo') + Path('bar')
@@ -361,6 +434,17 @@ class ContextmanagingTestCase(PathTestCase):
                 cwd = cwd.replace('/private', '')
             self.assertEqual(self.tdir, cwd)
 
+    def test_contextmanager_nested(self):
+        "Nested with blocks on one path each get their own file"
+        p = Path(self.tmpath)
+        with p as outer:
+            with p as inner:
+                self.assertIsNot(outer, inner)
+            self.assertTrue(inner.closed)
+            self.assertFalse(outer.closed)
+        self.assertTrue(outer.closed)
+        self.assertEqual({}, path._MANAGED)
+
     def test_open(self):
         "path.open allows modes to be passed"
         with Path(self.tmpath).open('w') as fh:
@@ -412,6 +496,22 @@ class PropertiesTestCase(PathTestCase):
         self.assertEqual(expected, ap._split)
         self.assertEqual(expected, p._split)
 
+    def test_parts(self):
+        "Components are parsed once, into a tuple"
+        p = Path('/foo/bar')
+        self.assertEqual(('foo', 'bar'), p._parts)
+        self.assertIs(p._parts, p._parts)
+        self.assertEqual(('foo', 'bar'), Path('foo/bar')._parts)
+
+    def test_parts_derived(self):
+        "Derived paths reuse our components"
+        p = Path('/foo/bar/baz')
+        self.assertEqual(('foo', 'bar'), p[:-1]._partcache)
+        self.assertEqual(('foo', 'bar', 'baz', 'car'), (p + 'car')._partcache)
+        self.assertEqual(('foo', 'bar'), p.parent._partcache)
+        for derived in [p[:-1], p + 'car', p.parent, p + 'car/']:
+            self.assertEqual(tuple(str(derived)[1:].split('/')), derived._parts)
+
     def test_abspath(self):
         "Propertize the absolute path please"
         cases = [
@@ -441,6 +541,18 @@ class PropertiesTestCase(PathTestCase):
         self.assertEqual('/foo', p.parent)
         self.assertIsInstance(p.parent, Path)
 
+    def test_parent_edges(self):
+        "Parents of short or oddly separated paths"
+        cases = [
+            ('/foo',      '/'),
+            ('foo',       ''),
+            ('foo/bar',   'foo'),
+            ('/foo/bar/', '/foo/bar'),
+            ('/foo//bar', '/foo'),
+            ]
+        for value, expected in cases:
+            self.assertEqual(expected, Path(value).parent)
+
     def test_contents(self):
         "Contents should be a property"
         p = Path(self.tmpath)
@@ -468,6 +580,13 @@ class PropertiesTestCase(PathTestCase):
         expected = os.path.dirname(__file__)
         self.assertEqual(expected, Path.here())
 
+    def test_here_cached(self):
+        "Repeat calls from one file hand back the same Path"
+        here = Path.here()
+        self.assertIsInstance(here, Path)
+        if os.path.isabs(__file__):
+            self.assertIs(here, Path.here())
+
 class StringLikeTestCase(PathTestCase):
 
     def test_blacklisted(self):
@@ -531,6 +650,256 @@ class FileLikeTestCase(PathTestCase):
         with self.assertRaises(TypeError):
             p.read()
 
+    def test_read_bytes(self):
+        "Should read bytes, or a view over them"
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        self.assertEqual(b'Hello Beautiful', p.read_bytes())
+        view = p.read_bytes(view=True)
+        self.assertEqual(b'Beautiful', bytes(view[6:]))
+        with self.assertRaises(TypeError):
+            Path(self.tdir).read_bytes(view=True)
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path(tempfile.mktemp()).read_bytes(view=True)
+
+    def test_read_bytes_empty(self):
+        "Can't map an empty file, but can view it"
+        p = Path(self.tmpath)
+        p.touch()
+        self.assertEqual(b'', bytes(p.read_bytes(view=True)))
+
+    def test_mmap(self):
+        "Should map the file"
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        with p.mmap() as (mapping, view):
+            self.assertEqual(6, mapping.find(b'Beautiful'))
+            self.assertEqual(b'Hello', bytes(view[:5]))
+        with self.assertRaises(ValueError):
+            mapping.find(b'Beautiful')
+
+    def test_mmap_write(self):
+        "Should write through the mapping"
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        with p.mmap(mmap.ACCESS_WRITE) as (mapping, view):
+            mapping[0:1] = b'J'
+        self.assertEqual('Jello Beautiful', p.contents)
+
+    def test_mmap_fallback(self):
+        "Should read when the filesystem can't map"
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        with patch.object(p.fs, 'mmap', side_effect=NotImplementedError):
+            with p.mmap() as (data, view):
+                self.assertEqual(b'Hello Beautiful', data)
+            with self.assertRaises(exceptions.InappropriateError):
+                with p.mmap(mmap.ACCESS_WRITE):
+                    pass
+
+    def test_chunks(self):
+        "Should read in blocks"
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        self.assertEqual([b'Hello', b' Beau', b'tiful'], [c.tobytes() for c in p.chunks(5)])
+        with self.assertRaises(TypeError):
+            Path(self.tdir).chunks()
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path(tempfile.mktemp()).chunks()
+
+    def test_lines(self):
+        "Should split lines out of blocks"
+        p = Path(self.tmpath)
+        p << "Frist\nNext\nLast"
+        self.assertEqual([b'Frist\n', b'Next\n', b'Last'], list(p.lines(buffer_size=4)))
+        self.assertEqual([u'Frist\n', u'Next\n', u'Last'], list(p.lines(binary=False)))
+        with self.assertRaises(TypeError):
+            Path(self.tdir).lines()
+
+    def test_line(self):
+        "Should jump to a line"
+        p = Path(self.tmpath)
+        p << "Frist\nNext\nLast"
+        self.assertEqual(b'Next\n', p.line(1))
+        self.assertEqual(u'Last', p.line(-1, binary=False))
+        with self.assertRaises(IndexError):
+            p.line(3)
+        self.assertEqual(3, len(p.line_index()))
+        p << "\nMore\n"
+        self.assertEqual(b'More\n', p.line(3))
+
+    def test_lines_slice(self):
+        "Should generate a slice of the lines"
+        p = Path(self.tmpath)
+        p << "".join("{0}\n".format(i) for i in range(100))
+        self.assertEqual([b'10\n', b'11\n'], list(p.lines(start=10, stop=12)))
+        self.assertEqual([u'98\n', u'99\n'], list(p.lines(binary=False, start=-2)))
+        self.assertEqual([b'0\n'], list(p.lines(stop=1, buffer_size=1)))
+        self.assertEqual([], list(p.lines(start=50, stop=10)))
+
+    def test_line_index_persist(self):
+        "Should keep a sidecar"
+        p = Path(self.tdir) + 'data.txt'
+        p << "Frist\nNext\nLast"
+        p.line_index(persist=True)
+        self.assertTrue((Path(self.tdir) + '.data.txt.lineindex').is_file)
+
+    def test_appender(self):
+        "Should route << through the appender"
+        p = Path(self.tdir) + 'sub/events.log'
+        with p.appender() as out:
+            with patch.object(Path, '_snapshot') as psnap:
+                p << 'one\n'
+                Path(p._value) << 'two\n'
+                out << 'three\n'
+                self.assertFalse(psnap.called)
+            self.assertFalse(p.size)
+        self.assertEqual('one\ntwo\nthree\n', p.contents)
+        p << 'four\n'
+        self.assertEqual('four\n', p.tail(1))
+
+    def test_appender_dir_raises(self):
+        with self.assertRaises(TypeError):
+            with Path(self.tdir).appender():
+                pass
+
+    def test_atomic_write(self):
+        "Should replace the file"
+        p = Path(self.tdir) + 'sub/settings.json'
+        p << 'old'
+        with p.atomic_write() as fh:
+            fh.write('new')
+            self.assertEqual('old', p.contents)
+        self.assertEqual('new', p.contents)
+        with self.assertRaises(TypeError):
+            with Path(self.tdir).atomic_write():
+                pass
+
+    def test_tail(self):
+        "Should read the last lines"
+        p = Path(self.tmpath)
+        p << "Frist\nNext\nLast\n"
+        self.assertEqual("Next\nLast\n", p.tail(2))
+        with self.assertRaises(TypeError):
+            Path(self.tdir).tail()
+
+    def test_reversed_lines(self):
+        "Should read lines backwards"
+        p = Path(self.tmpath)
+        p << "Frist\nNext\nLast"
+        self.assertEqual([b'Last', b'Next\n', b'Frist\n'], list(p.reversed_lines(buffer_size=3)))
+        self.assertEqual([u'Last', u'Next\n', u'Frist\n'], list(p.reversed_lines(binary=False)))
+
+    def test_one_stat(self):
+        "Each operation looks at the path once before doing any I/O"
+        p = Path(self.tmpath)
+        p << 'Contentz'
+        operations = [p.read, p.readline, p.json_load, p.truncate,
+                      lambda: p.checksum, p.touch]
+        for operation in operations:
+            with patch('os.stat', side_effect=os.stat) as pstat:
+                try:
+                    operation()
+                except ValueError:
+                    pass # Contentz isn't JSON
+                stats = [c for c in pstat.call_args_list if c[0][0] == self.tmpath]
+                self.assertEqual(1, len(stats))
+
+
+class StatCachedTestCase(PathTestCase):
+    "Sharing stat() results between predicates"
+
+    def test_shares_stat(self):
+        "Predicates share a single stat"
+        p = Path(self.tmpath).stat_cached(ttl=60)
+        self.assertIsInstance(p, Path)
+        self.assertEqual(self.tmpath, p)
+        with patch('os.stat', side_effect=os.stat) as pstat:
+            self.assertTrue(p)
+            self.assertTrue(p.is_file)
+            self.assertFalse(p.is_dir)
+            self.assertEqual('', p.read())
+            self.assertEqual(1, pstat.call_count)
+
+    def test_expires(self):
+        "Look again once the TTL is up"
+        p = Path(self.tmpath).stat_cached(ttl=0)
+        self.assertTrue(p)
+        rm(self.tmpath)
+        self.assertFalse(p)
+        touch(self.tmpath)
+
+    def test_own_changes(self):
+        "Changes through the path itself are seen"
+        p = (Path(self.tdir) + 'new.txt').stat_cached(ttl=60)
+        self.assertFalse(p)
+        p << 'Contentz'
+        self.assertTrue(p.is_file)
+
+    def test_derived_uncached(self):
+        "Paths derived from a cached one look afresh"
+        p = Path(self.tdir).stat_cached(ttl=60)
+        self.assertTrue(p.is_dir)
+        child = p + 'child'
+        child.mkdir()
+        self.assertTrue(child.is_dir)
+
+    def test_ls_entries_mutators(self):
+        "Should forget the listing whenever we change it"
+        p = Path(self.tdir)
+        ops = [lambda c: c << 'more',
+               lambda c: c.atomic_write().__enter__().close(),
+               lambda c: c.touch(),
+               lambda c: c.truncate(),
+               lambda c: c.pickle_dump([1]),
+               lambda c: c.jsonl().__enter__().write({'a': 1}),
+               lambda c: c.mv(p + 'elsewhere'),
+               lambda c: c.rm()]
+        for op in ops:
+            p.touch('one')
+            child = p.ls(sort='name')[0]
+            self.assertIsNot(None, child._entry)
+            op(child)
+            self.assertEqual(None, child._entry)
+            for c in p.ls():
+                c.rm()
+
+    def test_ls_entries_targets(self):
+        "Should forget the listing of paths we copy or move onto"
+        p = Path(self.tdir)
+        p.touch('one')
+        p.touch('two')
+        one, two = p.ls(sort='name')
+        os.unlink(str(two))
+        one.cp(two)
+        self.assertEqual(None, two._entry)
+        two = p.ls(sort='name')[1]
+        os.unlink(str(two))
+        one.mv(two)
+        self.assertEqual(None, two._entry)
+
+    def test_ls_entries_snapshot(self):
+        "Changes made elsewhere go unseen, as documented"
+        p = Path(self.tdir)
+        p.touch('one')
+        child = p.ls(sort='name')[0]
+        os.unlink(str(child))
+        os.mkdir(str(child))
+        self.assertTrue(child.is_file)
+        self.assertTrue(Path(child).is_dir)
+
+    def test_ls_pickle(self):
+        "Children should pickle and copy, leaving the listing behind"
+        p = Path(self.tdir)
+        p.touch('one.txt')
+        child = p.ls(sort='name')[0]
+        for clone in [pickle.loads(pickle.dumps(child)), copy.deepcopy(child), copy.copy(child)]:
+            self.assertIsInstance(clone, Path)
+            self.assertEqual(child, clone)
+            self.assertEqual(str(child), str(clone))
+            self.assertEqual(None, getattr(clone, '_entry', None))
+            self.assertTrue(clone.is_file)
+
 
 class NixMethodsTestCase(PathTestCase):
     "Unittesting nix operations added as methods"
@@ -580,6 +949,48 @@ class NixMethodsTestCase(PathTestCase):
         for p in [self.tdir + '/one.txt', self.tdir + '/two.txt']:
             self.assertIn(p, contents)
 
+    def test_ls_sort(self):
+        "Should return an ordered list"
+        p = Path(self.tdir)
+        p.touch('one.txt', 'two.txt', 'three.csv')
+        contents = p.ls(sort='name', reverse=True)
+        self.assertEqual(list, type(contents))
+        self.assertEqual([p + 'two.txt', p + 'three.csv', p + 'one.txt'], contents)
+
+    def test_ls_all(self):
+        "Should include hidden entries, and . and .. last, as nix.ls() does"
+        p = Path(self.tdir)
+        p.touch('.hidden')
+        p.touch('shown')
+        self.assertEqual(Pset([p + 'shown']), p.ls())
+        self.assertEqual(Pset([p + '.hidden', p + 'shown', p + '.', p + '..']), p.ls(all=True))
+        self.assertEqual([p + '.hidden', p + 'shown', p + '.', p + '..'],
+                         p.ls(all=True, sort='name'))
+        self.assertEqual(sorted(nix.ls(self.tdir, all=True)),
+                         sorted(c[-1] for c in p.ls(all=True)))
+        self.assertTrue((p + '..').is_dir)
+
+    def test_ls_entries(self):
+        "Children should know their type without a stat"
+        p = Path(self.tdir)
+        p.touch('one.txt')
+        p.mkdir('sub')
+        contents = p.ls(sort='name')
+        with patch('os.stat') as pstat:
+            self.assertEqual([True, False], [c.is_file for c in contents])
+            self.assertEqual([False, True], [c.is_dir for c in contents])
+            self.assertEqual(0, contents[0].stat().st_size)
+            self.assertEqual(0, pstat.call_count)
+
+    def test_ls_entries_changed(self):
+        "Should forget the listing once we change"
+        p = Path(self.tdir)
+        p.touch('one')
+        child = p.ls(sort='name')[0]
+        child.rm()
+        child.mkdir()
+        self.assertTrue(child.is_dir)
+
     def test_touch(self):
         "Should touch it"
         p = Path(self.tdir) + 'notyet.txt'
@@ -691,6 +1102,100 @@ class NixMethodsTestCase(PathTestCase):
         with self.assertRaises(exceptions.DoesNotExistError):
             p.mv(self.tdir)
 
+    def test_walk(self):
+        "Should walk with paths"
+        p = Path(self.tdir)
+        p.mkdir('sub', '.git')
+        p.touch('one.txt', 'sub/two.txt', '.git/HEAD')
+        found = {}
+        for dirpath, dirs, files in p.walk(prune=lambda d: d[-1] == '.git'):
+            self.assertIsInstance(dirpath, Path)
+            self.assertTrue(all(isinstance(f, Path) for f in files))
+            found[dirpath] = (sorted(dirs), sorted(files))
+        self.assertEqual(([p + '.git', p + 'sub'], [p + 'one.txt']), found[p])
+        self.assertEqual(([], [p + 'sub/two.txt']), found[p + 'sub'])
+        self.assertEqual(2, len(found))
+
+    def test_walk_entries(self):
+        "Walked paths should know their type without a stat"
+        p = Path(self.tdir)
+        p.mkdir('sub')
+        p.touch('sub/two.txt')
+        walker = p.walk()
+        with patch('os.stat') as pstat:
+            for dirpath, dirs, files in walker:
+                self.assertTrue(all(f.is_file for f in files))
+                self.assertTrue(all(d.is_dir for d in dirs))
+            self.assertEqual(0, pstat.call_count)
+
+    def test_walk_remove_dirs(self):
+        "Removing paths from dirs stops us descending"
+        p = Path(self.tdir)
+        p.mkdir('sub', 'other')
+        seen = []
+        for dirpath, dirs, files in p.walk():
+            seen.append(dirpath)
+            dirs[:] = [d for d in dirs if d[-1] != 'sub']
+        self.assertEqual([p, p + 'other'], seen)
+
+    def test_walk_parallel(self):
+        "Should walk with workers"
+        p = Path(self.tdir)
+        p.mkdir('sub', 'other')
+        p.touch('sub/one.txt')
+        found = dict((d, sorted(fs)) for d, ds, fs in p.walk(workers=2))
+        self.assertEqual([p + 'sub/one.txt'], found[p + 'sub'])
+        self.assertEqual(3, len(found))
+        self.assertIsInstance(list(found)[0], Path)
+
+    def test_glob(self):
+        "Should glob paths"
+        p = Path(self.tdir)
+        p.mkdir('src', 'src/sub')
+        p.touch('setup.py', 'src/one.py', 'src/sub/two.pyx', 'src/three.txt')
+        found = sorted(p.glob('*.py', 'src/**/*.{py,pyx}'))
+        self.assertEqual([p + 'setup.py', p + 'src/one.py', p + 'src/sub/two.pyx'], found)
+        self.assertTrue(all(isinstance(f, Path) for f in found))
+
+    def test_rglob(self):
+        "Should glob all the way down"
+        p = Path(self.tdir)
+        p.mkdir('src', 'src/sub')
+        p.touch('setup.py', 'src/one.py', 'src/sub/two.pyx')
+        found = sorted(p.rglob('*.py'))
+        self.assertEqual([p + 'setup.py', p + 'src/one.py'], found)
+
+    def test_find(self):
+        "Should find paths"
+        from ffs import query
+        p = Path(self.tdir)
+        p.mkdir('sub')
+        p.touch('one.txt', 'sub/two.txt', 'sub/three.csv')
+        found = sorted(p.find(query.name('*.txt')))
+        self.assertEqual([p + 'one.txt', p + 'sub/two.txt'], found)
+        self.assertTrue(all(isinstance(f, Path) and f.is_file for f in found))
+
+    def test_find_prune(self):
+        "Should prune with Paths"
+        from ffs import query
+        p = Path(self.tdir)
+        p.mkdir('sub/.git')
+        p.touch('one.txt', 'sub/two.txt', 'sub/.git/three.txt')
+        found = sorted(p.find(query.name('*.txt'), prune=lambda d: d[-1] == '.git'))
+        self.assertEqual([p + 'one.txt', p + 'sub/two.txt'], found)
+
+    def test_find_str(self):
+        "Should still find substrings"
+        p = Path('/foo/bar')
+        self.assertEqual(4, p.find('/', 1))
+        self.assertEqual(-1, p.find('baz'))
+
+    def test_walk_nonexistent(self):
+        "Should raise"
+        p = Path(self.tdir) + 'nonexistant'
+        with self.assertRaises(exceptions.DoesNotExistError):
+            p.walk()
+
 class TemporaryTestCase(unittest.TestCase):
     def setUp(self):
         pass
@@ -762,6 +1267,79 @@ class JsonishTestCase(unittest.TestCase):
             with self.assertRaises(TypeError):
                 case.json_load()
 
+    def test_loads_cached(self):
+        "Parse once while the file is unchanged"
+        p = Path(self.tmpath)
+        p << json.dumps(dict(foo=1))
+        cache = parsecache.ParseCache()
+        self.assertEqual(dict(foo=1), p.json_load(cache=cache))
+        self.assertIs(p.json_load(cache=cache), p.json_load(cache=cache))
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+        p << ' '
+        p.json_load(cache=cache)
+        self.assertEqual(2, cache.misses)
+
+    def test_json_iter(self):
+        "Generate the elements of an array"
+        p = Path(self.tmpath)
+        p << json.dumps([dict(n=i) for i in range(100)])
+        self.assertEqual([dict(n=i) for i in range(100)],
+                         list(p.json_iter(buffer_size=7)))
+
+    def test_json_iter_prefix(self):
+        "Find the array within objects"
+        p = Path(self.tmpath)
+        p << json.dumps(dict(meta=dict(skip=[1, 2]), data=dict(results=[1, 'two', None])))
+        self.assertEqual([1, 'two', None], list(p.json_iter('data.results', buffer_size=3)))
+
+    def test_json_iter_inappropriate(self):
+        "Check before we're iterated"
+        with self.assertRaises(TypeError):
+            Path(self.tdir).json_iter()
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path(tempfile.mktemp()).json_iter()
+
+    def test_pickle_roundtrip(self):
+        "Pickle and load back"
+        p = Path(self.tmpath)
+        p.pickle_dump(dict(a=[1, 2], b=b'x' * 100))
+        loaded = p.pickle_load()
+        self.assertEqual([1, 2], loaded['a'])
+        self.assertEqual(b'x' * 100, bytes(loaded['b']))
+
+    def test_pickle_dump_replaces(self):
+        "Earlier loads aren't disturbed"
+        p = Path(self.tmpath)
+        p.pickle_dump([b'x' * 10], threshold=1)
+        first = p.pickle_load()
+        p.pickle_dump([b'y' * 10], threshold=1)
+        self.assertEqual(b'x' * 10, bytes(first[0]))
+        self.assertEqual(b'y' * 10, bytes(p.pickle_load()[0]))
+
+    def test_pickle_dump_keeps_mode(self):
+        "Replacing the file keeps its permissions"
+        p = Path(self.tmpath)
+        os.chmod(self.tmpath, 0o600)
+        p.pickle_dump([1])
+        self.assertEqual(0o600, os.stat(self.tmpath).st_mode & 0o777)
+
+    def test_pickle_load_inappropriate(self):
+        with self.assertRaises(TypeError):
+            Path(self.tdir).pickle_load()
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path(tempfile.mktemp()).pickle_load()
+
+    def test_jsonl(self):
+        "Write then read JSON Lines"
+        p = Path(self.tmpath)
+        with p.jsonl() as out:
+            out.write(dict(foo=1))
+            out.writeall([[1, 2], 'three'])
+        with p.jsonl(append=True) as out:
+            out.write(None)
+        with p.jsonl() as jsonl:
+            self.assertEqual([dict(foo=1), [1, 2], 'three', None], list(jsonl))
+
 class CsvIshTestCase(PathTestCase):
 
     def test_as_csv(self):
@@ -785,21 +1363,119 @@ class CsvIshTestCase(PathTestCase):
             self.assertEqual('3', row.c)
             self.assertEqual('4', row.d)
 
+    def test_as_csv_cached(self):
+        "Csv rows parsed once"
+        p = Path(self.tmpath)
+        p << 'a,b\n1,2\n'
+        cache = parsecache.ParseCache()
+        for _ in range(2):
+            with p.csv(header=True, cache=cache) as csv:
+                self.assertEqual([('1', '2')], list(csv))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
 class MimetypeTestCase(PathTestCase):
     def test_mimetype(self):
         p = Path(self.tdir)/'wat.csv'
         p << 'a,b,c'
         self.assertEqual(p.mimetype, 'text/csv')
 
+    def test_mimetype_sniffed(self):
+        "Go by the contents first"
+        p = Path(self.tdir)/'upload'
+        with p.open('wb') as fh:
+            fh.write(b'%PDF-1.4\n')
+        self.assertEqual('application/pdf', p.mimetype)
+        with patch('os.stat', side_effect=os.stat) as pstat:
+            p.mimetype
+            self.assertEqual(0, pstat.call_count)
+
     def test_mimetype_dir_raises(self):
         p = Path(self.tdir)
         with self.assertRaises(exceptions.InappropriateError):
             p.mimetype
 
+    def test_mimetype_fifo_raises(self):
+        "Shouldn't block waiting for a writer"
+        if not hasattr(os, 'mkfifo'):
+            self.skipTest("No FIFOs here")
+        p = Path(self.tdir)/'pipe'
+        os.mkfifo(str(p))
+        with self.assertRaises(exceptions.InappropriateError):
+            p.mimetype
+
     def test_mimetype_nonexistant_raises(self):
         p = Path('/wat/not/this/a/thing?')
         with self.assertRaises(exceptions.DoesNotExistError):
             p.mimetype
 
+class DigestTestCase(PathTestCase):
+    def test_checksum(self):
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        self.assertEqual(hashlib.md5(b'Hello Beautiful').hexdigest(),
+                         p.checksum)
+
+    def test_checksum_dir_raises(self):
+        with self.assertRaises(exceptions.InappropriateError):
+            Path(self.tdir).checksum
+
+    def test_checksum_nonexistant_raises(self):
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path('/wat/not/this/a/thing?').checksum
+
+    def test_digest_algorithm(self):
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        self.assertEqual(hashlib.sha256(b'Hello Beautiful').hexdigest(),
+                         p.digest('sha256', buffer_size=4))
+
+    def test_digest_cache(self):
+        p = Path(self.tmpath)
+        p << 'Hello Beautiful'
+        cache = hashing.DigestCache(Path(self.tdir) + 'digests.db')
+        expected = hashlib.md5(b'Hello Beautiful').hexdigest()
+        self.assertEqual(expected, p.digest(cache=cache))
+        with patch('ffs.hashing.hashfile') as phash:
+            self.assertEqual(expected, p.digest(cache=cache))
+            self.assertEqual(0, phash.call_count)
+
+    def test_manifest(self):
+        p = Path(self.tdir)
+        p.touch('one', 'two')
+        manifest = Path(self.tmpath)
+        manifest << ''.join(p.manifest(workers=2))
+        self.assertEqual(2, len(manifest.contents.splitlines()))
+        self.assertEqual([('one', 'OK'), ('two', 'OK')], list(p.verify(self.tmpath)))
+
+    def test_manifest_nonexistant_raises(self):
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path('/wat/not/this/a/thing?').manifest()
+
+    def test_duplicates(self):
+        p = Path(self.tdir)
+        (p + 'one') << 'Hello Beautiful'
+        (p + 'two') << 'Hello Beautiful'
+        (p + 'three') << 'Hello Larry'
+        groups = list(p.duplicates())
+        self.assertEqual([[p + 'one', p + 'two']], groups)
+        self.assertIsInstance(groups[0][0], Path)
+
+    def test_duplicates_nonexistant_raises(self):
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path(self.tdir).duplicates('/wat/not/this/a/thing?')
+
+    def test_du(self):
+        p = Path(self.tdir)
+        (p + 'one.txt') << 'Hello Beautiful'
+        (p + 'sub/two.txt') << 'Hello Larry'
+        report = p.du(workers=2, apparent=True, top=1)
+        self.assertEqual(26, report.extensions['.txt'])
+        self.assertEqual([(15, p + 'one.txt')], report.largest)
+        self.assertEqual(report.total, report.dirs[self.tdir])
+
+    def test_du_nonexistant_raises(self):
+        with self.assertRaises(exceptions.DoesNotExistError):
+            Path('/wat/not/this/a/thing?').du()
+
 if __name__ == '__main__':
     unittest.main()
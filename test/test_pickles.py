@@ -0,0 +1,88 @@
+"""
+Unittests for the ffs.pickles module
+"""
+from __future__ import with_statement
+
+import io
+import mmap
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import nix, pickles
+
+def roundtrip(obj, threshold=pickles.THRESHOLD):
+    fh = io.BytesIO()
+    pickles.dump(obj, fh, threshold)
+    return fh.getvalue(), pickles.load(fh.getvalue())
+
+class RoundtripTestCase(unittest.TestCase):
+    def test_small(self):
+        "Things without large payloads survive"
+        obj = dict(a=[1, 2.5, u'three'], b=b'four')
+        _, loaded = roundtrip(obj)
+        self.assertEqual(obj, loaded)
+
+    def test_plain_pickle(self):
+        "We can load pickles we didn't write"
+        self.assertEqual([1, 2], pickles.load(pickles.pickle.dumps([1, 2])))
+
+    def test_fallback(self):
+        "Without protocol 5 we write plain pickles"
+        with patch.object(pickles, 'OUT_OF_BAND', False):
+            data, loaded = roundtrip(dict(a=b'x' * 10), threshold=1)
+        self.assertFalse(data.startswith(pickles.MAGIC))
+        self.assertEqual(dict(a=b'x' * 10), loaded)
+
+class OutOfBandTestCase(unittest.TestCase):
+    def setUp(self):
+        if not pickles.OUT_OF_BAND:
+            self.skipTest('needs pickle protocol 5')
+
+    def test_large_bytes(self):
+        "Large bytes are aligned regions, loaded as views"
+        big = b'x' * 100
+        data, loaded = roundtrip(dict(big=big, small=b'y'), threshold=100)
+        self.assertTrue(data.startswith(pickles.MAGIC))
+        self.assertIsInstance(loaded['big'], memoryview)
+        self.assertTrue(loaded['big'].readonly)
+        self.assertEqual(big, loaded['big'].tobytes())
+        self.assertEqual(b'y', loaded['small'])
+        self.assertEqual(0, data.index(big) % pickles.ALIGNMENT)
+
+    def test_out_of_band_buffers(self):
+        "Buffers pickled out-of-band go in regions too"
+        buffers = [pickles.pickle.PickleBuffer(b'ab' * 50), pickles.pickle.PickleBuffer(b'cd')]
+        data, loaded = roundtrip(buffers)
+        self.assertEqual([b'ab' * 50, b'cd'], [view.tobytes() for view in loaded])
+        self.assertEqual(0, data.index(b'ab' * 50) % pickles.ALIGNMENT)
+
+    def test_zero_copy(self):
+        "Regions are views over the map we load from"
+        tfile = tempfile.mktemp()
+        try:
+            with open(tfile, 'wb') as fh:
+                pickles.dump([b'z' * pickles.THRESHOLD], fh)
+            with open(tfile, 'rb') as fh:
+                mapping = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            loaded = pickles.load(memoryview(mapping))
+            self.assertIs(mapping, loaded[0].obj)
+            del loaded
+        finally:
+            nix.rm(tfile)
+
+    def test_truncated(self):
+        "Regions must all be there"
+        data, _ = roundtrip([b'x' * 100], threshold=100)
+        with self.assertRaises(ValueError):
+            pickles.load(data[:-1])
+
+if __name__ == '__main__':
+    unittest.main()
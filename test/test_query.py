@@ -0,0 +1,148 @@
+"""
+Unittests for the ffs.query module
+"""
+from __future__ import with_statement
+
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from ffs import nix, query
+
+class FindTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        nix.mkdir_p(os.path.join(self.tdir, 'logs', 'old'))
+        for name, size, mtime in [('a.txt', 10, 1000), ('logs/b.log', 2000, 2000),
+                                  ('logs/old/c.log', 30, 3000), ('.hidden', 0, 4000)]:
+            fpath = os.path.join(self.tdir, name)
+            with open(fpath, 'w') as fh:
+                fh.write('x' * size)
+            os.utime(fpath, (mtime, mtime))
+        os.symlink(os.path.join(self.tdir, 'logs'), os.path.join(self.tdir, 'link'))
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def find(self, *predicates, **kwargs):
+        return sorted(os.path.relpath(p, self.tdir)
+                      for p in query.find(self.tdir, *predicates, **kwargs))
+
+    def test_find_everything(self):
+        "Should find everything below root"
+        self.assertEqual(['.hidden', 'a.txt', 'link', 'logs', 'logs/b.log',
+                          'logs/old', 'logs/old/c.log'], self.find())
+
+    def test_find_prune(self):
+        "Should prune with paths"
+        seen = []
+        def prune(path):
+            seen.append(path)
+            return path.endswith('old')
+        self.assertEqual(['.hidden', 'a.txt', 'link', 'logs', 'logs/b.log', 'logs/old'],
+                         self.find(prune=prune))
+        self.assertTrue(all(type(p) is str for p in seen))
+
+    def test_find_name(self):
+        "Should match names"
+        self.assertEqual(['logs/b.log', 'logs/old/c.log'], self.find(query.name('*.log')))
+
+    def test_find_path(self):
+        "Should match whole paths"
+        self.assertEqual(['logs/old/c.log'], self.find(query.path('*/old/*')))
+
+    def test_find_regex(self):
+        "Should match whole paths with regexes"
+        self.assertEqual(['logs/b.log'], self.find(query.regex(r'.*/[ab]\.log')))
+        self.assertEqual([], self.find(query.regex(r'[ab]\.log')))
+        self.assertEqual(['logs/b.log'], self.find(query.regex(re.compile(r'.*B\.LOG', re.I))))
+
+    def test_find_type(self):
+        "Should match types without following links"
+        self.assertEqual(['link'], self.find(query.type('l')))
+        self.assertEqual(['logs', 'logs/old'], self.find(query.type('d')))
+        self.assertEqual([], self.find(query.type('p')))
+        with self.assertRaises(ValueError):
+            query.type('x')
+
+    def test_find_size(self):
+        "Should match size ranges"
+        files = query.type('f')
+        self.assertEqual(['logs/b.log'], self.find(files, query.size(lo=1000)))
+        self.assertEqual(['a.txt', 'logs/old/c.log'], self.find(files, query.size(1, 100)))
+        with self.assertRaises(ValueError):
+            query.size()
+
+    def test_find_times(self):
+        "Should match times as epoch floats"
+        self.assertEqual(['a.txt', 'logs/b.log'], self.find(query.mtime(hi=2500)))
+        self.assertEqual(['.hidden', 'logs/old/c.log'],
+                         self.find(query.type('f'), query.mtime(lo=2500.5)))
+        self.assertEqual(['logs/old/c.log'], self.find(query.atime(3000, 3001)))
+        self.assertEqual([], self.find(query.ctime(hi=1)))
+
+    def test_find_owner(self):
+        "Should match owners"
+        uid, gid = os.getuid(), os.getgid()
+        self.assertEqual(7, len(self.find(query.user(uid), query.group(gid))))
+        self.assertEqual([], self.find(query.user(uid + 1)))
+
+    def test_find_perm(self):
+        "Should match permissions"
+        os.chmod(os.path.join(self.tdir, 'a.txt'), 0o751)
+        self.assertEqual(['a.txt'], self.find(query.type('f'), query.perm(0o051)))
+        self.assertEqual(['a.txt'], self.find(query.perm(0o751, exact=True)))
+
+    def test_find_combinations(self):
+        "Should combine with and, or and not"
+        logs = query.name('*.log')
+        self.assertEqual(['logs/old/c.log'], self.find(logs & query.size(hi=100)))
+        self.assertEqual(['a.txt', 'logs/b.log', 'logs/old/c.log'],
+                         self.find(logs | query.name('a.*')))
+        self.assertEqual(['.hidden', 'a.txt', 'link'],
+                         self.find(~logs & ~query.type('d')))
+
+    def test_find_cheap_first(self):
+        "Should test names before anything that needs a stat"
+        tested = []
+        spy = query.Predicate(lambda e: tested.append(e.name) or True, query.STATTED)
+        self.assertEqual(['logs/b.log'], self.find(spy & query.name('b.log')))
+        self.assertEqual(['b.log'], tested)
+
+    def test_find_lazy(self):
+        "Should find things as we go"
+        found = query.find(self.tdir)
+        self.assertTrue(next(found).startswith(self.tdir))
+
+    def test_find_vanishing(self):
+        "Entries deleted as we go should match nothing, rather than raise"
+        names = ['a.txt', '.hidden', 'logs/b.log', 'logs/old/c.log']
+        for predicate in [query.size(lo=0), ~query.mtime(lo=0), query.user(os.getuid()),
+                          query.type('p'), query.perm(0, exact=True)]:
+            for name in names:
+                with open(os.path.join(self.tdir, name), 'w') as fh:
+                    fh.write('x')
+            found = query.find(self.tdir, query.type('d') | predicate)
+            first = next(found, None)
+            gone = [os.path.join(self.tdir, n) for n in names]
+            for path in gone:
+                if path != first:
+                    os.unlink(path)
+            self.assertEqual([], [p for p in found if p in gone])
+
+    def test_find_walk_options(self):
+        "Should pass options through to the walk"
+        self.assertEqual(['logs/b.log'], self.find(query.name('*.log'), maxdepth=2))
+        self.assertEqual(['link/b.log', 'link/old/c.log', 'logs/b.log', 'logs/old/c.log'],
+                         self.find(query.name('*.log'), followlinks=True, workers=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
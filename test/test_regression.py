@@ -59,6 +59,14 @@ class PathRegressionTestCase(unittest.TestCase):
         self.assertEqual('/tmp', splat[0])
         self.assertEqual('my.file', splat[1])
 
+    def test_os_path_string_slicing(self):
+        "os.path functions that slice should see a string"
+        p = Path('/tmp/some/my.file')
+        self.assertEqual('my.file', os.path.basename(p))
+        self.assertEqual('/tmp/some', os.path.dirname(p))
+        self.assertEqual(('/tmp/some/my', '.file'), os.path.splitext(p))
+        self.assertEqual('/tmp/some', p[:2])
+
 
 
 
@@ -0,0 +1,112 @@
+"""
+Unittests for the ffs.sniff module
+"""
+from __future__ import with_statement
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import nix, sniff
+
+class SniffTestCase(unittest.TestCase):
+    def test_signatures(self):
+        "Signatures win over the name"
+        cases = [
+            (b'\x89PNG\r\n\x1a\n\x00\x00', 'image/png'),
+            (b'\xff\xd8\xff\xe0', 'image/jpeg'),
+            (b'GIF89a', 'image/gif'),
+            (b'RIFF\x00\x00\x00\x00WEBPVP8 ', 'image/webp'),
+            (b'%PDF-1.4\n', 'application/pdf'),
+            (b'\x1f\x8b\x08\x00', 'application/gzip'),
+            (b'(\xb5/\xfd', 'application/zstd'),
+            (b'\x00' * 257 + b'ustar\x0000', 'application/x-tar'),
+            (b'\x7fELF\x02\x01', 'application/x-executable'),
+            (b'\x00\x00\x00\x18ftypmp42', 'video/mp4'),
+        ]
+        for data, mime in cases:
+            self.assertEqual(mime, sniff.sniff(data, 'upload.txt'))
+
+    def test_html(self):
+        "Any case, after whitespace"
+        self.assertEqual('text/html', sniff.sniff(b'\n  <!DOCTYPE HTML>\n<html>'))
+        self.assertEqual('text/html', sniff.sniff(b'<Html><body>'))
+
+    def test_refinements(self):
+        "The name can say what a container holds"
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('word/document.xml', '<w:document/>')
+        data = archive.getvalue()
+        self.assertEqual('application/zip', sniff.sniff(data))
+        self.assertEqual('application/zip', sniff.sniff(data, 'photo.jpg'))
+        self.assertEqual(
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            sniff.sniff(data, 'report.docx'))
+        self.assertEqual('image/svg+xml', sniff.sniff(b'<?xml version="1.0"?>', 'icon.svg'))
+
+    def test_name(self):
+        "Fall back to the name"
+        self.assertEqual('text/csv', sniff.sniff(b'a,b,c', 'wat.csv'))
+        self.assertEqual('application/json', sniff.sniff(b'', 'empty.json'))
+
+    def test_text_or_binary(self):
+        "Failing that, tell text from binary"
+        self.assertEqual('text/plain', sniff.sniff(b'Hello Beautiful\n', 'README'))
+        self.assertEqual('text/plain', sniff.sniff(u'caf\u00e9'.encode('utf-8')[:-1]))
+        self.assertEqual('text/plain', sniff.sniff(b'\xff\xfeh\x00i\x00'))
+        self.assertEqual('application/octet-stream', sniff.sniff(b'\x00\x01\x02\x03'))
+        self.assertEqual('application/octet-stream', sniff.sniff(b'\xc3\x28 latin'))
+        self.assertEqual(None, sniff.sniff(b''))
+
+class MimetypeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def write(self, name, data):
+        path = os.path.join(self.tdir, name)
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        return path
+
+    def test_mimetype(self):
+        "Only read the start"
+        path = self.write('upload', b'%PDF-1.4\n' + b'x' * 10000)
+        with patch.object(sniff, 'sniff', side_effect=sniff.sniff) as psniff:
+            self.assertEqual('application/pdf', sniff.mimetype(path, size=16))
+            self.assertEqual(b'%PDF-1.4\n' + b'x' * 7, psniff.call_args[0][0])
+
+    def test_mimetype_special(self):
+        "Only read regular files"
+        if not hasattr(os, 'mkfifo'):
+            self.skipTest("No FIFOs here")
+        fifo = os.path.join(self.tdir, 'pipe')
+        os.mkfifo(fifo)
+        for path in [fifo, os.devnull, self.tdir]:
+            with self.assertRaises(IOError):
+                sniff.mimetype(path)
+        self.assertEqual({fifo: None, os.devnull: None}, sniff.classify([fifo, os.devnull]))
+
+    def test_classify(self):
+        "Unreadable paths are None"
+        png = self.write('a', b'\x89PNG\r\n\x1a\n')
+        text = self.write('b', b'hello')
+        missing = os.path.join(self.tdir, 'missing')
+        self.assertEqual({png: 'image/png', text: 'text/plain', missing: None, self.tdir: None},
+                         sniff.classify([png, text, missing, self.tdir], workers=2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unittests for the ffs.streams module
+"""
+from __future__ import with_statement
+
+import io
+import sys
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import streams
+
+class ChunksTestCase(unittest.TestCase):
+
+    def test_chunks(self):
+        "Should generate blocks of the file"
+        chunks = [c.tobytes() for c in streams.chunks(io.BytesIO(b'abcdefg'), 3)]
+        self.assertEqual([b'abc', b'def', b'g'], chunks)
+
+    def test_chunks_reuse(self):
+        "Should read into the same buffer each time"
+        chunks = list(streams.chunks(io.BytesIO(b'abcdef'), 3))
+        self.assertEqual(b'def', chunks[0].tobytes())
+
+    def test_chunks_read(self):
+        "Should cope without readinto"
+        class Reader(object):
+            def __init__(self):
+                self.fh = io.BytesIO(b'abcdefg')
+
+            def read(self, size):
+                return self.fh.read(size)
+
+        self.assertEqual([b'abcd', b'efg'], list(streams.chunks(Reader(), 4)))
+
+    def test_chunks_empty(self):
+        "Should generate nothing"
+        self.assertEqual([], list(streams.chunks(io.BytesIO(b''))))
+
+class LinesTestCase(unittest.TestCase):
+
+    def test_lines(self):
+        "Should split lines across blocks"
+        data = b'one\ntwo\n\nthree is longer than a block\nfour'
+        for size in [1, 2, 5, 100]:
+            lines = list(streams.lines(io.BytesIO(data), size))
+            self.assertEqual(io.BytesIO(data).readlines(), lines)
+
+    def test_lines_carriage_returns(self):
+        "Should only split on newlines"
+        data = b'one\r\ntwo\rstill two\nthree'
+        self.assertEqual([b'one\r\n', b'two\rstill two\n', b'three'],
+                         list(streams.lines(io.BytesIO(data), 7)))
+
+    def test_lines_trailing_newline(self):
+        "Shouldn't invent an empty last line"
+        self.assertEqual([b'one\n', b'two\n'], list(streams.lines(io.BytesIO(b'one\ntwo\n'), 3)))
+
+    def test_lines_encoding(self):
+        "Should decode characters split between blocks"
+        data = u'caf\xe9\nna\xefve\n'.encode('utf-8')
+        self.assertEqual([u'caf\xe9\n', u'na\xefve\n'],
+                         list(streams.lines(io.BytesIO(data), 4, 'utf-8')))
+
+    def test_lines_text_breaks(self):
+        "Should only split text on newlines"
+        data = u'one\u2028still one\x0c\ntwo'.encode('utf-8')
+        self.assertEqual([u'one\u2028still one\x0c\n', u'two'],
+                         list(streams.lines(io.BytesIO(data), 5, 'utf-8')))
+
+    def test_lines_bad_encoding(self):
+        "Should raise straight away"
+        with self.assertRaises(LookupError):
+            streams.lines(io.BytesIO(b''), encoding='nonsense')
+
+class ReverseTestCase(unittest.TestCase):
+    data = b'one\ntwo\n\nthree is longer than a block\nfour'
+
+    def test_tail(self):
+        "Should find the last lines from any block size"
+        for size in [1, 2, 5, 100]:
+            self.assertEqual(b'three is longer than a block\nfour',
+                             streams.tail(io.BytesIO(self.data), 2, size))
+            self.assertEqual(self.data, streams.tail(io.BytesIO(self.data), 5, size))
+            self.assertEqual(b'', streams.tail(io.BytesIO(self.data), 0, size))
+
+    def test_tail_reads_backwards(self):
+        "Should only read the blocks it needs"
+        fh = io.BytesIO(b'x' * 10000 + b'\nlast\n')
+        with patch.object(fh, 'read', side_effect=fh.read) as pread:
+            self.assertEqual(b'last\n', streams.tail(fh, 1, 100))
+        self.assertEqual(2, pread.call_count)
+
+    def test_reversed_lines(self):
+        "Should generate lines last first"
+        for data in [self.data, self.data + b'\n', b'\n\n', b'']:
+            expected = io.BytesIO(data).readlines()[::-1]
+            for size in [1, 2, 5, 100]:
+                self.assertEqual(expected, list(streams.reversed_lines(io.BytesIO(data), size)))
+
+
+if __name__ == '__main__':
+    unittest.main()
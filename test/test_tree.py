@@ -0,0 +1,205 @@
+"""
+Unittests for the ffs.tree module
+"""
+from __future__ import with_statement
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from ffs import nix, tree
+
+class WalkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        for d in ['a/b/c', 'a/.git/objects', 'd']:
+            nix.mkdir_p(os.path.join(self.tdir, d))
+        for f in ['top.txt', 'a/one.txt', 'a/b/two.txt', 'a/b/c/three.txt',
+                  'a/.git/HEAD']:
+            nix.touch(os.path.join(self.tdir, f))
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def rel(self, dirpath):
+        return os.path.relpath(dirpath, self.tdir)
+
+    def names(self, walk):
+        return dict((self.rel(d), (sorted(e.name for e in dirs),
+                                   sorted(e.name for e in files)))
+                    for d, dirs, files in walk)
+
+    def test_walk(self):
+        "Should walk everything"
+        found = self.names(tree.walk(self.tdir))
+        self.assertEqual((['a', 'd'], ['top.txt']), found['.'])
+        self.assertEqual((['.git', 'b'], ['one.txt']), found['a'])
+        self.assertEqual(([], ['three.txt']), found['a/b/c'])
+        self.assertEqual(7, len(found))
+
+    def test_walk_matches_os_walk(self):
+        "Should find what os.walk finds"
+        ours = dict((d, (sorted(e.name for e in ds), sorted(e.name for e in fs)))
+                    for d, ds, fs in tree.walk(self.tdir))
+        theirs = dict((d, (sorted(ds), sorted(fs)))
+                      for d, ds, fs in os.walk(self.tdir))
+        self.assertEqual(theirs, ours)
+
+    def test_walk_topdown(self):
+        "Parents come before children"
+        order = [self.rel(d) for d, _, _ in tree.walk(self.tdir)]
+        self.assertEqual('.', order[0])
+        self.assertTrue(order.index('a') < order.index('a/b') < order.index('a/b/c'))
+
+    def test_walk_bottomup(self):
+        "Children come before parents"
+        order = [self.rel(d) for d, _, _ in tree.walk(self.tdir, topdown=False)]
+        self.assertEqual('.', order[-1])
+        self.assertTrue(order.index('a/b/c') < order.index('a/b') < order.index('a'))
+
+    def test_walk_remove_dirs(self):
+        "Removing from dirs stops us descending"
+        found = []
+        for d, dirs, files in tree.walk(self.tdir):
+            found.append(self.rel(d))
+            dirs[:] = [e for e in dirs if e.name != 'a']
+        self.assertEqual(['.', 'd'], found)
+
+    def test_walk_maxdepth(self):
+        "Should stop listing at maxdepth"
+        self.assertEqual(['.'], list(self.names(tree.walk(self.tdir, maxdepth=1))))
+        found = self.names(tree.walk(self.tdir, maxdepth=2))
+        self.assertEqual(['.', 'a', 'd'], sorted(found))
+        self.assertEqual([], list(tree.walk(self.tdir, maxdepth=0)))
+
+    def test_walk_prune(self):
+        "Should skip pruned subtrees without reading them"
+        pruned = []
+
+        def prune(path):
+            if os.path.basename(path) == '.git':
+                pruned.append(path)
+                return True
+            return False
+
+        found = self.names(tree.walk(self.tdir, prune=prune))
+        self.assertEqual([os.path.join(self.tdir, 'a', '.git')], pruned)
+        self.assertNotIn('a/.git', found)
+        self.assertNotIn('a/.git/objects', found)
+        self.assertIn('a/b/c', found)
+
+    def test_walk_entries_stat(self):
+        "Entries should carry their stat"
+        for d, dirs, files in tree.walk(self.tdir):
+            for entry in files:
+                self.assertEqual(0, entry.stat().st_size)
+
+    def test_walk_symlink_not_followed(self):
+        "Symlinks to dirs are listed but not walked"
+        os.symlink(os.path.join(self.tdir, 'a'), os.path.join(self.tdir, 'd', 'link'))
+        found = self.names(tree.walk(self.tdir))
+        self.assertEqual((['link'], []), found['d'])
+        self.assertNotIn('d/link', found)
+
+    def test_walk_symlink_followed(self):
+        "Should follow symlinks to dirs"
+        os.symlink(os.path.join(self.tdir, 'a', 'b'), os.path.join(self.tdir, 'd', 'link'))
+        found = self.names(tree.walk(self.tdir, followlinks=True))
+        self.assertEqual(([], ['three.txt']), found['d/link/c'])
+
+    def test_walk_symlink_cycle(self):
+        "Shouldn't go round in circles"
+        os.symlink(self.tdir, os.path.join(self.tdir, 'a', 'b', 'loop'))
+        found = self.names(tree.walk(self.tdir, followlinks=True))
+        self.assertEqual((['c', 'loop'], ['two.txt']), found['a/b'])
+        self.assertNotIn('a/b/loop', found)
+        self.assertEqual(7, len(found))
+
+    def test_walk_parallel(self):
+        "Should find the same things with workers"
+        ours = self.names(tree.walk(self.tdir))
+        for ordered in [False, True]:
+            theirs = self.names(tree.walk(self.tdir, workers=4, ordered=ordered))
+            self.assertEqual(ours, theirs)
+
+    def test_walk_parallel_ordered(self):
+        "Should come in the same order as a sequential walk"
+        for i in range(20):
+            nix.mkdir_p(os.path.join(self.tdir, 'd', str(i), 'x'))
+        ours = [d for d, _, _ in tree.walk(self.tdir)]
+        theirs = [d for d, _, _ in tree.walk(self.tdir, workers=8, ordered=True)]
+        self.assertEqual(ours, theirs)
+
+    def test_walk_parallel_bounded(self):
+        "Shouldn't read more than a few directories per worker ahead of us"
+        for i in range(100):
+            nix.mkdir_p(os.path.join(self.tdir, 'd', str(i), 'x'))
+        for ordered in [False, True]:
+            scanned = []
+            def scan(path):
+                scanned.append(path)
+                return tree.scandir(path)
+            walker = tree._walk(self.tdir, scan=scan, workers=2, ordered=ordered)
+            for _ in range(3):
+                next(walker)
+            for _ in range(20):
+                seen = len(scanned)
+                time.sleep(0.02)
+                if len(scanned) == seen:
+                    break
+            window = 2 * 4 * (2 if ordered else 1)
+            self.assertTrue(3 < len(scanned) <= 3 + window + 1, len(scanned))
+            self.assertEqual(207, len(list(walker)) + 3)
+
+    def test_walk_parallel_options(self):
+        "Should prune, stop and follow links in parallel too"
+        os.symlink(self.tdir, os.path.join(self.tdir, 'a', 'b', 'loop'))
+        for ordered in [False, True]:
+            found = self.names(tree.walk(
+                self.tdir, workers=3, ordered=ordered, followlinks=True, maxdepth=3,
+                prune=lambda p: os.path.basename(p) == '.git'))
+            self.assertEqual(['.', 'a', 'a/b', 'd'], sorted(found))
+
+    def test_walk_parallel_onerror(self):
+        "Should report errors from the workers"
+        errors = []
+        nopath = os.path.join(self.tdir, 'nope')
+        for ordered in [False, True]:
+            walker = tree.walk(nopath, workers=2, ordered=ordered, onerror=errors.append)
+            self.assertEqual([], list(walker))
+        self.assertEqual(2, len(errors))
+
+    def test_walk_parallel_raises(self):
+        "Exceptions in the workers should reach us"
+        def prune(path):
+            raise KeyError(path)
+
+        for ordered in [False, True]:
+            with self.assertRaises(KeyError):
+                list(tree.walk(self.tdir, workers=2, ordered=ordered, prune=prune))
+
+    def test_walk_parallel_bad(self):
+        "Should raise"
+        with self.assertRaises(ValueError):
+            tree.walk(self.tdir, workers=0)
+        with self.assertRaises(ValueError):
+            tree.walk(self.tdir, workers=2, topdown=False)
+
+    def test_walk_onerror(self):
+        "Should report directories we can't read"
+        errors = []
+        nopath = os.path.join(self.tdir, 'nope')
+        self.assertEqual([], list(tree.walk(nopath, onerror=errors.append)))
+        self.assertEqual(1, len(errors))
+        self.assertIsInstance(errors[0], OSError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Unittests for the ffs.usage module
+"""
+from __future__ import with_statement
+
+import os
+import sys
+import tempfile
+import unittest
+
+if sys.version_info <  (2, 7):
+    import unittest2 as unittest
+if sys.version.startswith('3.1'):
+    from ffs import _unittest31 as unittest
+
+from mock import patch
+
+from ffs import nix, usage
+
+class DuTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        for name, size in [('a/b/big.log', 5000), ('a/notes.txt', 300), ('c/small.TXT', 3)]:
+            path = os.path.join(self.tdir, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as fh:
+                fh.write(b'x' * size)
+
+    def tearDown(self):
+        nix.rm_r(self.tdir)
+
+    def path(self, *parts):
+        return os.path.join(self.tdir, *parts)
+
+    def dirsize(self, *parts):
+        return os.lstat(self.path(*parts)).st_size
+
+    def test_apparent(self):
+        "Sum sizes, subtotals and all"
+        report = usage.du(self.tdir, apparent=True)
+        dirs = sum(self.dirsize(*d) for d in [(), ('a',), ('a', 'b'), ('c',)])
+        self.assertEqual(5303 + dirs, report.total)
+        self.assertEqual(5000 + self.dirsize('a', 'b'), report.dirs[self.path('a', 'b')])
+        self.assertEqual(5300 + self.dirsize('a') + self.dirsize('a', 'b'),
+                         report.dirs[self.path('a')])
+        self.assertEqual(report.total, report.dirs[self.tdir])
+        self.assertEqual(3, report.files)
+        self.assertEqual({'.log': 5000, '.txt': 303}, report.extensions)
+
+    def test_blocks(self):
+        "By default we count what's allocated"
+        report = usage.du(self.tdir)
+        st = os.lstat(self.path('a', 'notes.txt'))
+        self.assertEqual(st.st_blocks * 512, report.extensions['.txt'] -
+                         os.lstat(self.path('c', 'small.TXT')).st_blocks * 512)
+
+    def test_largest(self):
+        "Keep the TOP largest"
+        report = usage.du(self.tdir, apparent=True, top=2)
+        self.assertEqual([(5000, self.path('a', 'b', 'big.log')),
+                          (300, self.path('a', 'notes.txt'))], report.largest)
+        self.assertEqual([], usage.du(self.tdir, top=0).largest)
+
+    def test_hardlinks(self):
+        "Count hard links once"
+        os.link(self.path('a', 'b', 'big.log'), self.path('c', 'big.log'))
+        report = usage.du(self.tdir, apparent=True)
+        self.assertEqual(3, report.files)
+        self.assertEqual(5000, report.extensions['.log'])
+
+    def test_symlinks(self):
+        "Symlinks count for themselves"
+        os.symlink(self.path('a'), self.path('c', 'link'))
+        report = usage.du(self.tdir, apparent=True)
+        self.assertEqual(4, report.files)
+        self.assertNotIn(self.path('c', 'link'), report.dirs)
+        self.assertEqual(len(self.path('a')), report.extensions[''])
+
+    def test_parallel(self):
+        "Workers give the same report"
+        serial = usage.du(self.tdir)
+        parallel = usage.du(self.tdir, workers=4)
+        self.assertEqual(serial.dirs, parallel.dirs)
+        self.assertEqual(serial.largest, parallel.largest)
+
+    def test_stats_in_workers(self):
+        "Entries are stat()ed as their directory is listed"
+        with patch.object(usage, '_statscan', side_effect=usage._statscan) as pscan:
+            usage.du(self.tdir, workers=2)
+            self.assertEqual(4, pscan.call_count)
+
+    def test_file(self):
+        "A file is a tree of one"
+        report = usage.du(self.path('a', 'notes.txt'), apparent=True)
+        self.assertEqual((300, 1), (report.total, report.files))
+        self.assertEqual([(300, self.path('a', 'notes.txt'))], report.largest)
+
+    def test_trailing_slash(self):
+        report = usage.du(self.tdir + os.sep)
+        self.assertEqual(report.total, report.dirs[self.tdir])
+
+    def test_nonexistant(self):
+        with self.assertRaises(OSError):
+            usage.du(self.path('missing'))
+
+if __name__ == '__main__':
+    unittest.main()